@@ -1,77 +1,585 @@
 from fastapi import FastAPI
+import asyncio
+import base64
+import codecs
+import csv
+import hashlib
+import io
+import json
+import logging
 import os
 import smtplib
-from datetime import datetime, timezone
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager, suppress
+from datetime import date, datetime, timedelta, timezone
 from email.mime.text import MIMEText
-from typing import Literal
-
-from fastapi import Depends, FastAPI, HTTPException, Query, status
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
-from sqlalchemy import JSON, Boolean, DateTime, Float, Integer, String, create_engine, select
+from email.utils import format_datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Literal
+
+import orjson
+from fastapi import Body, Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBasic, HTTPBasicCredentials, HTTPBearer
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, ValidationError
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    Index,
+    Integer,
+    SmallInteger,
+    String,
+    Text,
+    and_,
+    case,
+    cast,
+    create_engine,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError, OperationalError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, sessionmaker
 
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy.pool import QueuePool
+
+from micks_common.admission import AdmissionCollector, AdmissionGate, AdmissionMiddleware, RouteLimit, TokenBuckets
+from micks_common.auth_tokens import TokenSigner, credentials_match, secret_keys
+from micks_common.metrics import LATENCY_BUCKETS, LatencyMiddleware, metrics_response
+from micks_common.sse import SSE_HEADERS, format_event, offer, stream_queue
+
+from plans import (
+    DEVICE_KEYS,
+    DEVICE_WEIGHTS,
+    GAMER_MULTIPLIER,
+    PLAN_SPEEDS,
+    PLANS,
+    WEIGHT_DECIMALS,
+    PlanResult,
+    calculate_counts,
+)
+
 
 class Base(DeclarativeBase):
     pass
 
 
 class Sale(Base):
+    # No PostgreSQL a tabela é particionada por mês em created_at, com chave (id, created_at) (revisão 0005).
     __tablename__ = "sales"
+    __table_args__ = (
+        Index("ix_sales_created_at_id", "created_at", "id"),
+        Index("ix_sales_name_id", "name", text("id DESC")),
+        Index(
+            "ix_sales_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(120), nullable=False)
     email: Mapped[str] = mapped_column(String(255), nullable=False)
     phone: Mapped[str] = mapped_column(String(40), nullable=False)
-    devices: Mapped[dict] = mapped_column(JSON, nullable=False)
+    cellphones: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0, server_default="0")
+    computers: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0, server_default="0")
+    smart_tvs: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0, server_default="0")
+    tv_boxes: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0, server_default="0")
+    others: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=0, server_default="0")
     gamer: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
-    device_weights: Mapped[dict] = mapped_column(JSON, nullable=False)
     total_weight: Mapped[float] = mapped_column(Float, nullable=False)
-    plan_name: Mapped[str] = mapped_column(String(50), nullable=False)
-    plan_speed: Mapped[str] = mapped_column(String(50), nullable=False)
+    plan_name: Mapped[str] = mapped_column(Enum("Prata", "Bronze", "Ouro", "Diamante", name="sale_plan"), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
+    # Pesos individuais e velocidade não são gravados: saem das contagens e do plano.
+    @property
+    def devices(self) -> dict[str, int]:
+        return {key: getattr(self, key) for key in DEVICE_KEYS}
+
+    @property
+    def device_weights(self) -> dict[str, float]:
+        return calculate_counts(tuple(getattr(self, key) for key in DEVICE_KEYS), False).device_weights
+
+    @property
+    def plan_speed(self) -> str:
+        return PLAN_SPEEDS[self.plan_name]
 
+
+class SalesDailyStat(Base):
+    """Rollup por dia (UTC) e plano, atualizado na mesma transação de cada escrita em sales."""
+
+    __tablename__ = "sales_daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    plan_name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    sales_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    gamer_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    weight_centis: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    sale_id: Mapped[int | None] = mapped_column(Integer, nullable=True, index=True)
+    to_email: Mapped[str] = mapped_column(String(255), nullable=False)
+    subject: Mapped[str] = mapped_column(String(255), nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending", index=True)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+BASE_DIR = Path(__file__).resolve().parent
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sales.db")
-engine = create_engine(DATABASE_URL, future=True)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# O engine síncrono atende uma tarefa por vez (outbox, migrações, CLI): não precisa do pool das rotas.
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", "1"))
+DB_SYNC_MAX_OVERFLOW = int(os.getenv("DB_SYNC_MAX_OVERFLOW", "1"))
+
+
+def async_database_url(url: str) -> str:
+    # psycopg 3 atende os dois modos com o mesmo URL; SQLite precisa do driver aiosqlite.
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url.removeprefix("sqlite:")
+    if url.startswith(("postgresql:", "postgres:")):
+        return "postgresql+psycopg:" + url.split(":", 1)[1]
+    return url
+
+
+def pool_options(url: str, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW) -> dict[str, Any]:
+    # SQLite (dev) fica com o pool padrão do driver; o ajuste vale para o PostgreSQL.
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+# Engine síncrono: migrações, outbox_worker e comandos de linha de comando.
+engine = create_engine(DATABASE_URL, future=True, **pool_options(DATABASE_URL, DB_SYNC_POOL_SIZE, DB_SYNC_MAX_OVERFLOW))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Micks Calculadora API")
-security = HTTPBasic()
+# Engine assíncrono: todas as rotas que acessam o banco.
+async_engine = create_async_engine(async_database_url(DATABASE_URL), **pool_options(DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Réplica opcional para as leituras administrativas (mesmo esquema; o PostgreSQL em streaming replication).
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+DATABASE_READ_MAX_LAG = float(os.getenv("DATABASE_READ_MAX_LAG", "5"))
+DATABASE_READ_CHECK_INTERVAL = float(os.getenv("DATABASE_READ_CHECK_INTERVAL", "1"))
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaSession(Session):
+    """Sessão das leituras na réplica.
+
+    Se a consulta falha com OperationalError (réplica fora do ar desde a última verificação,
+    leitura cancelada por conflito de recuperação), a réplica sai da rota e a mesma leitura
+    é repetida no primário, sem erro para o cliente.
+    """
+
+    def _with_fallback(self, run: Callable[[], Any]) -> Any:
+        try:
+            return run()
+        except OperationalError as exc:
+            if self.bind is async_engine.sync_engine:
+                raise
+            replica.mark_down(exc)
+            self.rollback()
+            self.bind = async_engine.sync_engine
+            DB_SESSIONS.labels("primary").inc()
+            return run()
 
-DEVICE_WEIGHTS = {
-    "cellphones": 0.8,
-    "computers": 0.5,
-    "smart_tvs": 0.4,
-    "tv_boxes": 0.6,
-    "others": 0.1,
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return self._with_fallback(partial(super().execute, *args, **kwargs))
+
+    def scalar(self, *args: Any, **kwargs: Any) -> Any:
+        return self._with_fallback(partial(super().scalar, *args, **kwargs))
+
+    def get(self, *args: Any, **kwargs: Any) -> Any:
+        return self._with_fallback(partial(super().get, *args, **kwargs))
+
+
+class ReplicaRouter:
+    """Decide se uma leitura pode ir para a réplica.
+
+    O atraso é medido a cada DATABASE_READ_CHECK_INTERVAL; com a réplica fora do ar,
+    atrasada além de DATABASE_READ_MAX_LAG ou logo após uma escrita administrativa,
+    a leitura fica no primário.
+    """
+
+    def __init__(self, url: str, max_lag: float, check_interval: float) -> None:
+        self.engine = create_async_engine(async_database_url(url), **pool_options(url))
+        self.sessionmaker = async_sessionmaker(
+            bind=self.engine, sync_session_class=ReplicaSession, autoflush=False, expire_on_commit=False
+        )
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.up: bool | None = None  # None: ainda não verificada
+        self.lag = 0.0
+        self.synced_at = 0.0  # a réplica tem tudo o que foi confirmado até este instante
+        self.primary_until = 0.0
+
+    async def check(self) -> None:
+        query = REPLICA_LAG_QUERY if self.engine.dialect.name == "postgresql" else text("SELECT 0")
+        try:
+            async with self.engine.connect() as connection:
+                lag = float(await connection.scalar(query))
+        except (SQLAlchemyError, OSError) as exc:
+            self.mark_down(exc)
+            return
+        if not self.up:
+            logger.info("réplica de leitura disponível (atraso %.2fs)", lag)
+        self.up = True
+        self.lag = lag
+        self.synced_at = time.time() - lag
+
+    async def monitor(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    def mark_down(self, exc: Exception) -> None:
+        if self.up is not False:
+            logger.warning("réplica de leitura indisponível, lendo do primário: %s", exc)
+        self.up = False
+
+    def note_write(self) -> float:
+        # Passado esse prazo, uma réplica dentro do limite de atraso já tem a escrita.
+        self.primary_until = time.time() + self.max_lag + self.check_interval
+        return self.primary_until
+
+    def available(self, primary_until: float = 0.0) -> bool:
+        if not self.up or self.lag > self.max_lag:
+            return False
+        return time.time() >= max(self.primary_until, primary_until)
+
+
+replica = (
+    ReplicaRouter(DATABASE_READ_URL, DATABASE_READ_MAX_LAG, DATABASE_READ_CHECK_INTERVAL) if DATABASE_READ_URL else None
+)
+
+
+# Chave do advisory lock que serializa as migrações no PostgreSQL (workers, manage.py migrate).
+MIGRATIONS_LOCK_KEY = 20260917
+
+
+def run_migrations(bind: Engine | None = None) -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BASE_DIR / "migrations"))
+    with (bind or engine).begin() as connection:
+        if connection.dialect.name == "postgresql":
+            # Quem chega depois espera aqui e, ao entrar, o Alembic já lê a versão gravada pelo primeiro.
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+
+logger = logging.getLogger("micks.api")
+
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "5"))
+OUTBOX_ENABLED = os.getenv("OUTBOX_ENABLED", "1") == "1"
+# Em produção as migrações rodam uma vez antes de subir a API (`python manage.py migrate`).
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "1") == "1"
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", "30"))
+SALES_EVENTS_BACKEND = os.getenv("SALES_EVENTS_BACKEND", "memory")
+SALES_EVENTS_KEEPALIVE = float(os.getenv("SALES_EVENTS_KEEPALIVE", "15"))
+SALES_EVENTS_QUEUE = int(os.getenv("SALES_EVENTS_QUEUE", "100"))
+SALES_EVENTS_CHANNEL = "micks_sales"
+
+# Enviado quando um assinante pode ter perdido eventos: quem recebe recarrega a listagem.
+REFRESH_EVENT = format_event("refresh", b"{}")
+
+
+class SalesBroadcaster:
+    """Repassa os eventos de vendas (created, updated, deleted, refresh) aos streams abertos neste processo."""
+
+    def __init__(self, queue_size: int) -> None:
+        self.subscribers: set[asyncio.Queue[bytes]] = set()
+        self.queue_size = queue_size
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue[bytes]]:
+        queue: asyncio.Queue[bytes] = asyncio.Queue(self.queue_size)
+        self.subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self.subscribers.discard(queue)
+
+    def fan_out(self, message: bytes) -> None:
+        for queue in self.subscribers:
+            offer(queue, message, REFRESH_EVENT)
+
+    async def publish(self, event: str, payload: dict[str, Any]) -> None:
+        self.fan_out(format_event(event, orjson.dumps(payload, option=ORJSON_OPTIONS)))
+
+
+class PostgresBroadcaster(SalesBroadcaster):
+    # NOTIFY chega a todos os workers e instâncias da API, inclusive a este: o repasse local sai do LISTEN.
+    def __init__(self, url: str, queue_size: int) -> None:
+        super().__init__(queue_size)
+        self.conninfo = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+    async def publish(self, event: str, payload: dict[str, Any]) -> None:
+        message = event + "\n" + orjson.dumps(payload, option=ORJSON_OPTIONS).decode()
+        try:
+            async with async_engine.begin() as connection:
+                await connection.execute(
+                    text("SELECT pg_notify(:channel, :message)"), {"channel": SALES_EVENTS_CHANNEL, "message": message}
+                )
+        except SQLAlchemyError as exc:
+            # A escrita já foi confirmada; sem o evento, os painéis só veem a mudança ao recarregar.
+            logger.warning("falha ao publicar o evento de vendas %s: %s", event, exc)
+
+    async def listen(self) -> None:
+        import psycopg
+
+        connected_before = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as connection:
+                    await connection.execute(f"LISTEN {SALES_EVENTS_CHANNEL}")
+                    if connected_before:
+                        self.fan_out(REFRESH_EVENT)
+                    connected_before = True
+                    async for notify in connection.notifies():
+                        event, _, data = notify.payload.partition("\n")
+                        self.fan_out(format_event(event, data.encode()))
+            except (psycopg.Error, OSError) as exc:
+                logger.warning("LISTEN %s interrompido, reconectando: %s", SALES_EVENTS_CHANNEL, exc)
+            await asyncio.sleep(1)
+
+
+def build_sales_events() -> SalesBroadcaster:
+    if SALES_EVENTS_BACKEND == "postgres":
+        if engine.dialect.name == "postgresql":
+            return PostgresBroadcaster(DATABASE_URL, SALES_EVENTS_QUEUE)
+        logger.warning("SALES_EVENTS_BACKEND=postgres exige DATABASE_URL do PostgreSQL; usando memory")
+    elif WEB_CONCURRENCY > 1:
+        logger.warning(
+            "SALES_EVENTS_BACKEND=memory com %s workers: cada stream só recebe as escritas do próprio worker; use postgres",
+            WEB_CONCURRENCY,
+        )
+    return SalesBroadcaster(SALES_EVENTS_QUEUE)
+
+
+sales_events = build_sales_events()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    if MIGRATE_ON_STARTUP:
+        if WEB_CONCURRENCY > 1 and engine.dialect.name != "postgresql":
+            # Cada worker roda o lifespan: sem o advisory lock do PostgreSQL as migrações disputariam o banco.
+            raise RuntimeError(
+                "MIGRATE_ON_STARTUP=1 com WEB_CONCURRENCY > 1: rode `python manage.py migrate` antes "
+                "e suba os workers com MIGRATE_ON_STARTUP=0"
+            )
+        await asyncio.to_thread(run_migrations)
+    worker = asyncio.create_task(outbox_worker()) if OUTBOX_ENABLED else None
+    replica_monitor = asyncio.create_task(replica.monitor()) if replica else None
+    events_listener = asyncio.create_task(sales_events.listen()) if isinstance(sales_events, PostgresBroadcaster) else None
+    app.state.startup_seconds = time.perf_counter() - started
+    yield
+    for task in (worker, replica_monitor, events_listener):
+        if task:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await async_engine.dispose()
+    if replica:
+        await replica.engine.dispose()
+
+
+app = FastAPI(title="Micks Calculadora API", lifespan=lifespan)
+security = HTTPBasic(auto_error=False)
+bearer = HTTPBearer(auto_error=False)
+
+# Lidos uma vez: require_admin roda em toda rota administrativa.
+ADMIN_USER = os.getenv("ADMIN_USER", "admin")
+ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "desafio")
+# Mesma chave do web; várias separadas por vírgula permitem rotação (a primeira assina).
+AUTH_SECRET_KEYS = secret_keys(os.getenv("AUTH_SECRET_KEY"))
+AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", "28800"))
+token_signer = TokenSigner(AUTH_SECRET_KEYS, AUTH_TOKEN_TTL)
+
+REQUEST_LATENCY = Histogram(
+    "micks_api_request_duration_seconds",
+    "Latência das requisições por rota",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "micks_api_stage_duration_seconds",
+    "Duração das etapas internas (commit, refresh, envio de e-mail, serialização)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_SESSIONS = Counter("micks_api_db_sessions_total", "Sessões abertas pelas rotas, por banco", ["target"])
+ADMISSION_SHED = Counter(
+    "micks_api_admission_shed_total", "Requisições recusadas pelo controle de admissão", ["route", "reason"]
+)
+
+# Controle de admissão de /api/contract e /api/calculate, por worker: as duas dividem ADMISSION_CONCURRENCY
+# vagas, o cálculo usa no máximo ADMISSION_CALCULATE_CONCURRENCY delas e, na fila, a contratação passa antes.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_CONCURRENCY = int(os.getenv("ADMISSION_CONCURRENCY", "32"))
+ADMISSION_QUEUE = int(os.getenv("ADMISSION_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+ADMISSION_CALCULATE_CONCURRENCY = int(os.getenv("ADMISSION_CALCULATE_CONCURRENCY", "24"))
+ADMISSION_CALCULATE_RATE = float(os.getenv("ADMISSION_CALCULATE_RATE", "20"))
+ADMISSION_CALCULATE_BURST = int(os.getenv("ADMISSION_CALCULATE_BURST", "40"))
+ADMISSION_CONTRACT_RATE = float(os.getenv("ADMISSION_CONTRACT_RATE", "1"))
+ADMISSION_CONTRACT_BURST = int(os.getenv("ADMISSION_CONTRACT_BURST", "5"))
+
+contract_limit = RouteLimit(
+    "contract", 0, ADMISSION_CONCURRENCY, ADMISSION_QUEUE, ADMISSION_CONTRACT_RATE, ADMISSION_CONTRACT_BURST
+)
+calculate_limit = RouteLimit(
+    "calculate",
+    1,
+    ADMISSION_CALCULATE_CONCURRENCY,
+    ADMISSION_QUEUE,
+    ADMISSION_CALCULATE_RATE,
+    ADMISSION_CALCULATE_BURST,
+)
+admission_limits = {
+    "/api/contract": contract_limit,
+    "/api/calculate": calculate_limit,
+    "/api/calculate/batch": calculate_limit,
 }
+if ADMISSION_ENABLED:
+    # Adicionado antes do LatencyMiddleware, fica por dentro dele: a espera na fila entra na latência medida.
+    app.add_middleware(
+        AdmissionMiddleware,
+        limits=admission_limits,
+        gate=AdmissionGate(ADMISSION_CONCURRENCY, ADMISSION_QUEUE_TIMEOUT),
+        buckets=TokenBuckets(ADMISSION_MAX_CLIENTS),
+        shed=ADMISSION_SHED,
+        reject_body=lambda message: orjson.dumps({"detail": message}),
+    )
+admission_collector = AdmissionCollector("micks_api_admission_requests", admission_limits)
+REGISTRY.register(admission_collector)
+app.add_middleware(LatencyMiddleware, histogram=REQUEST_LATENCY)
+
 
-PLANS = [
-    ("Prata", "100 Mb", lambda w: w < 1.0),
-    ("Bronze", "300 Mb", lambda w: 1.0 <= w <= 2.0),
-    ("Ouro", "500 Mb", lambda w: 2.0 < w < 3.0),
-    ("Diamante", "800 Mb", lambda w: w >= 3.0),
+def timed(stage: str):
+    return STAGE_LATENCY.labels(stage).time()
+
+
+class PoolCollector:
+    # Lido só no scrape do /metrics; nada é contado no caminho das requisições.
+    def collect(self):
+        connections = GaugeMetricFamily(
+            "micks_api_db_pool_connections", "Conexões do pool do SQLAlchemy por estado", labels=["engine", "state"]
+        )
+        size = GaugeMetricFamily("micks_api_db_pool_size", "Tamanho configurado do pool", labels=["engine"])
+        pools = [("async", async_engine.sync_engine.pool), ("sync", engine.pool)]
+        if replica:
+            pools.append(("read", replica.engine.sync_engine.pool))
+            lag = GaugeMetricFamily("micks_api_replica_lag_seconds", "Atraso da réplica de leitura (-1: fora do ar)")
+            lag.add_metric([], replica.lag if replica.up else -1)
+            yield lag
+        streams = GaugeMetricFamily("micks_api_sales_event_streams", "Streams SSE de vendas abertos neste worker")
+        streams.add_metric([], len(sales_events.subscribers))
+        yield streams
+        for label, pool in pools:
+            if not isinstance(pool, QueuePool):
+                continue
+            connections.add_metric([label, "checked_out"], pool.checkedout())
+            connections.add_metric([label, "idle"], pool.checkedin())
+            connections.add_metric([label, "overflow"], max(pool.overflow(), 0))
+            size.add_metric([label], pool.size())
+        yield connections
+        yield size
+
+
+pool_collector = PoolCollector()
+REGISTRY.register(pool_collector)
+
+# Contagens gravadas em SMALLINT.
+DEVICE_COUNT_MAX = 32767
+CALC_BATCH_MAX = int(os.getenv("CALC_BATCH_MAX", "5000"))
+RULES_MAX_AGE = int(os.getenv("RULES_MAX_AGE", "300"))
+SALES_PAGE_DEFAULT = int(os.getenv("SALES_PAGE_DEFAULT", "50"))
+SALES_PAGE_MAX = int(os.getenv("SALES_PAGE_MAX", "500"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+SALES_BULK_MAX = int(os.getenv("SALES_BULK_MAX", "1000"))
+SALES_CACHE_BACKEND = os.getenv("SALES_CACHE_BACKEND", "memory")
+SALES_CACHE_TTL = int(os.getenv("SALES_CACHE_TTL", "300"))
+SALES_CACHE_MAX_ENTRIES = int(os.getenv("SALES_CACHE_MAX_ENTRIES", "512"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+EXPORT_HEADER = [
+    "Data",
+    "Nome",
+    "E-mail",
+    "Telefone",
+    "Celulares",
+    "Computadores",
+    "Smart TVs",
+    "TV Box",
+    "Outros",
+    "Peso total",
+    "Plano",
+    "Velocidade",
 ]
 
 
 class DeviceInput(BaseModel):
-    cellphones: int = Field(0, ge=0)
-    computers: int = Field(0, ge=0)
-    smart_tvs: int = Field(0, ge=0)
-    tv_boxes: int = Field(0, ge=0)
-    others: int = Field(0, ge=0)
+    cellphones: int = Field(0, ge=0, le=DEVICE_COUNT_MAX)
+    computers: int = Field(0, ge=0, le=DEVICE_COUNT_MAX)
+    smart_tvs: int = Field(0, ge=0, le=DEVICE_COUNT_MAX)
+    tv_boxes: int = Field(0, ge=0, le=DEVICE_COUNT_MAX)
+    others: int = Field(0, ge=0, le=DEVICE_COUNT_MAX)
     gamer: bool = False
 
 
-class PlanResult(BaseModel):
-    device_weights: dict[str, float]
-    total_weight: float
-    plan_name: Literal["Prata", "Bronze", "Ouro", "Diamante"]
-    plan_speed: str
-
-
 class ContractInput(BaseModel):
     name: str = Field(min_length=2, max_length=120)
     email: EmailStr
@@ -102,51 +610,177 @@ class SaleResponse(BaseModel):
     created_at: datetime
 
 
+class SaleIdsInput(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=SALES_BULK_MAX)
+
+
+class DevicePatch(BaseModel):
+    cellphones: int | None = Field(None, ge=0, le=DEVICE_COUNT_MAX)
+    computers: int | None = Field(None, ge=0, le=DEVICE_COUNT_MAX)
+    smart_tvs: int | None = Field(None, ge=0, le=DEVICE_COUNT_MAX)
+    tv_boxes: int | None = Field(None, ge=0, le=DEVICE_COUNT_MAX)
+    others: int | None = Field(None, ge=0, le=DEVICE_COUNT_MAX)
+    gamer: bool | None = None
+
+
+class SalesBulkPatch(SaleIdsInput):
+    # Só os campos informados mudam; o restante de cada venda é mantido.
+    devices: DevicePatch
+
+
+class SalesPage(BaseModel):
+    items: list[SaleResponse]
+    next_cursor: str | None = None
+
+
 class ContractResponse(BaseModel):
     message: str
     sale: SaleResponse
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+class PlanStats(BaseModel):
+    plan_name: str
+    plan_speed: str
+    sales: int
+    share: float
+
+
+class DayStats(BaseModel):
+    day: date
+    sales: int
+    average_weight: float
+    gamer_share: float
+
+
+class SalesStatsResponse(BaseModel):
+    total_sales: int
+    average_weight: float
+    gamer_share: float
+    by_plan: list[PlanStats]
+    by_day: list[DayStats]
+
+
+class BulkRowResult(BaseModel):
+    line: int
+    ok: bool
+    id: int | None = None
+    plan_name: str | None = None
+    errors: list[str] = []
+
+
+class BulkContractResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkRowResult]
+
+
+class BulkDeleteResponse(BaseModel):
+    deleted: list[int]
+    not_found: list[int]
+
+
+class BulkUpdateResponse(BaseModel):
+    updated: list[SaleResponse]
+    not_found: list[int]
+
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+
+class EmailStatusResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    to_email: str
+    subject: str
+    status: Literal["pending", "sent", "failed"]
+    attempts: int
+    last_error: str | None
+    next_attempt_at: datetime
+    created_at: datetime
+    sent_at: datetime | None
+
+
+class OutboxStatusResponse(BaseModel):
+    pending: int = 0
+    sent: int = 0
+    failed: int = 0
+
+
+async def read_sessionmaker(request: Request) -> async_sessionmaker:
+    """GET/HEAD vão para a réplica quando ela está em dia; escritas e o fallback ficam no primário."""
+    target, sessionmaker = "primary", AsyncSessionLocal
+    if replica and request.method in ("GET", "HEAD"):
+        try:
+            primary_until = float(request.headers.get(READ_PRIMARY_HEADER, "0"))
+        except ValueError:
+            primary_until = 0.0
+        # Só o estado do monitor decide: se a réplica caiu desde a última verificação, o ReplicaSession
+        # repete a leitura no primário.
+        if replica.available(primary_until):
+            target, sessionmaker = "replica", replica.sessionmaker
+    request.state.db_target = target
+    DB_SESSIONS.labels(target).inc()
+    return sessionmaker
+
+
+async def get_db(request: Request):
+    sessionmaker = await read_sessionmaker(request)
+    async with sessionmaker() as db:
+        try:
+            yield db
+        except DBAPIError as exc:
+            # Conexão perdida com a réplica no meio da leitura: as próximas já vão ao primário.
+            if exc.connection_invalidated and sessionmaker is not AsyncSessionLocal:
+                replica.mark_down(exc)
+            raise
+
+
+def read_your_writes(response: Response) -> None:
+    # Depois de uma escrita administrativa, quem a fez volta a ler do primário até a réplica alcançá-la.
+    # O cabeçalho vale entre workers: o web o guarda em cookie e o reenvia nas leituras seguintes.
+    if replica:
+        response.headers[READ_PRIMARY_HEADER] = f"{replica.note_write():.3f}"
 
 
 def calculate_plan(devices: DeviceInput) -> PlanResult:
-    weighted = {
-        key: round(getattr(devices, key) * weight, 2)
-        for key, weight in DEVICE_WEIGHTS.items()
+    return calculate_counts(tuple(getattr(devices, key) for key in DEVICE_KEYS), devices.gamer)
+
+
+def build_rules_manifest() -> tuple[str, bytes]:
+    # Gerado das mesmas constantes do calculate_counts; a calculadora do web reproduz a conta no navegador.
+    rules = {
+        "device_order": list(DEVICE_KEYS),
+        "device_weights": DEVICE_WEIGHTS,
+        "gamer_multiplier": GAMER_MULTIPLIER,
+        "rounding": {"decimals": WEIGHT_DECIMALS, "mode": "half_even"},
+        "plans": [
+            {"name": name, "speed": speed, "min_weight": lower, "inclusive": inclusive}
+            for name, speed, lower, inclusive in PLANS
+        ],
     }
-    total_weight = round(sum(weighted.values()), 2)
-    if devices.gamer:
-        total_weight = round(total_weight * 2, 2)
-
-    plan_name = "Diamante"
-    plan_speed = "800 Mb"
-    for name, speed, rule in PLANS:
-        if rule(total_weight):
-            plan_name = name
-            plan_speed = speed
-            break
-
-    return PlanResult(
-        device_weights=weighted,
-        total_weight=total_weight,
-        plan_name=plan_name,
-        plan_speed=plan_speed,
-    )
+    canonical = json.dumps(rules, sort_keys=True, separators=(",", ":"))
+    version = hashlib.blake2b(canonical.encode(), digest_size=8).hexdigest()
+    return version, json.dumps({"version": version, **rules}, separators=(",", ":")).encode()
+
+
+RULES_VERSION, RULES_MANIFEST = build_rules_manifest()
 
 
 def normalize_name(name: str) -> str:
     return name.strip().upper()
 
 
-def send_email(to_email: str, subject: str, body: str) -> None:
+def smtp_connection() -> smtplib.SMTP:
     host = os.getenv("MAILHOG_SMTP_HOST", "mail")
     port = int(os.getenv("MAILHOG_SMTP_PORT", "1025"))
+    return smtplib.SMTP(host, port, timeout=SMTP_TIMEOUT)
+
+
+def send_email(smtp: smtplib.SMTP, to_email: str, subject: str, body: str) -> None:
     sender = os.getenv("SMTP_FROM", "noreply@micks.com.br")
 
     msg = MIMEText(body, "plain", "utf-8")
@@ -154,10 +788,96 @@ def send_email(to_email: str, subject: str, body: str) -> None:
     msg["From"] = sender
     msg["To"] = to_email
 
-    with smtplib.SMTP(host, port, timeout=5) as smtp:
+    with timed("send_email"):
         smtp.sendmail(sender, [to_email], msg.as_string())
 
 
+def outbox_values(sale_id: int | None, to_email: str, subject: str, body: str, now: datetime) -> dict[str, Any]:
+    return {
+        "sale_id": sale_id,
+        "to_email": to_email,
+        "subject": subject,
+        "body": body,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+    }
+
+
+def schedule_retry(message: EmailOutbox, error: Exception, now: datetime) -> None:
+    message.attempts += 1
+    message.last_error = f"{type(error).__name__}: {error}"[:1000]
+    if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+        message.status = "failed"
+        return
+    message.next_attempt_at = now + timedelta(seconds=OUTBOX_RETRY_BASE * 2 ** (message.attempts - 1))
+
+
+def deliver_outbox_batch(db: Session, limit: int = OUTBOX_BATCH_SIZE) -> int:
+    now = datetime.now(timezone.utc)
+    query = (
+        select(EmailOutbox)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    messages = list(db.scalars(query).all())
+    if not messages:
+        return 0
+
+    try:
+        smtp = smtp_connection()
+    except OSError as exc:
+        for message in messages:
+            schedule_retry(message, exc, now)
+        db.commit()
+        return len(messages)
+
+    # Uma única conexão SMTP atende o lote inteiro.
+    try:
+        for message in messages:
+            try:
+                send_email(smtp, message.to_email, message.subject, message.body)
+            except (OSError, smtplib.SMTPException) as exc:
+                schedule_retry(message, exc, now)
+            else:
+                message.attempts += 1
+                message.status = "sent"
+                message.last_error = None
+                message.sent_at = datetime.now(timezone.utc)
+        # Status gravado antes do QUIT: uma falha ao encerrar a conexão não reenvia o que já saiu.
+        db.commit()
+    finally:
+        close_smtp(smtp)
+    return len(messages)
+
+
+def close_smtp(smtp: smtplib.SMTP) -> None:
+    try:
+        smtp.quit()
+    except (OSError, smtplib.SMTPException) as exc:
+        logger.warning("falha ao encerrar a conexão SMTP: %s", exc)
+        smtp.close()
+
+
+def run_outbox_once() -> int:
+    with SessionLocal() as db:
+        return deliver_outbox_batch(db)
+
+
+async def outbox_worker() -> None:
+    while True:
+        try:
+            processed = await asyncio.to_thread(run_outbox_once)
+        except Exception:
+            logger.exception("Falha ao processar a fila de e-mails")
+            processed = 0
+        if processed < OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(OUTBOX_POLL_INTERVAL)
+
+
 def build_contract_email(name: str, phone: str, devices: DeviceInput, result: PlanResult) -> str:
     return (
         f"Cliente: {name}\n"
@@ -174,15 +894,323 @@ def build_contract_email(name: str, phone: str, devices: DeviceInput, result: Pl
     )
 
 
-def require_admin(credentials: HTTPBasicCredentials = Depends(security)) -> None:
-    correct_user = os.getenv("ADMIN_USER", "admin")
-    correct_pass = os.getenv("ADMIN_PASSWORD", "desafio")
-    if credentials.username != correct_user or credentials.password != correct_pass:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Credenciais inválidas",
-            headers={"WWW-Authenticate": "Basic"},
-        )
+def contract_values(payload: ContractInput, result: PlanResult, now: datetime) -> dict[str, Any]:
+    return {
+        "name": normalize_name(payload.name),
+        "email": payload.email,
+        "phone": payload.phone,
+        **payload.devices.model_dump(),
+        "total_weight": result.total_weight,
+        "plan_name": result.plan_name,
+        "created_at": now,
+    }
+
+
+def contract_emails(sale_id: int, payload: ContractInput, result: PlanResult, now: datetime) -> list[dict[str, Any]]:
+    name = normalize_name(payload.name)
+    email_body = build_contract_email(name, payload.phone, payload.devices, result)
+    ops_email = os.getenv("OPERATIONS_EMAIL", "operacoes@micks.com.br")
+    return [
+        outbox_values(sale_id, payload.email, "Confirmação da contratação - Micks", email_body, now),
+        outbox_values(sale_id, ops_email, f"Nova venda - {name}", email_body, now),
+    ]
+
+
+StatsDeltas = dict[tuple[date, str], tuple[int, int, int]]
+
+
+def add_stats(deltas: StatsDeltas, created_at: datetime, plan_name: str, gamer: bool, total_weight: float, sign: int = 1) -> None:
+    # O SQLite devolve datetimes sem fuso, já em UTC; no PostgreSQL convertemos antes de pegar a data.
+    day = (created_at.astimezone(timezone.utc) if created_at.tzinfo else created_at).date()
+    count, gamers, centis = deltas.get((day, plan_name), (0, 0, 0))
+    deltas[(day, plan_name)] = (count + sign, gamers + sign * int(gamer), centis + sign * round(total_weight * 100))
+
+
+async def apply_stats(db: AsyncSession, deltas: StatsDeltas) -> None:
+    # Ordem fixa das chaves: transações concorrentes travam as linhas na mesma sequência.
+    rows = [
+        {"day": day, "plan_name": plan_name, "sales_count": count, "gamer_count": gamers, "weight_centis": centis}
+        for (day, plan_name), (count, gamers, centis) in sorted(deltas.items())
+        if (count, gamers, centis) != (0, 0, 0)
+    ]
+    if not rows:
+        return
+    dialect_insert = postgresql.insert if async_engine.dialect.name == "postgresql" else sqlite.insert
+    statement = dialect_insert(SalesDailyStat).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[SalesDailyStat.day, SalesDailyStat.plan_name],
+        set_={
+            column: getattr(SalesDailyStat, column) + statement.excluded[column]
+            for column in ("sales_count", "gamer_count", "weight_centis")
+        },
+    )
+    await db.execute(statement)
+
+
+def rebuild_sales_stats(connection, keep_archived: bool = True) -> int:
+    """Recalcula sales_daily_stats a partir de sales (comando rebuild-stats do manage.py).
+
+    Com keep_archived, os dias anteriores à venda mais antiga ainda em sales (meses
+    arquivados pelo `manage.py archive`) ficam como estão.
+    """
+    if connection.dialect.name == "postgresql":
+        day = cast(func.timezone("UTC", Sale.created_at), Date)
+    else:
+        day = func.date(Sale.created_at)
+    query = select(
+        day,
+        Sale.plan_name,
+        func.count(),
+        func.sum(cast(Sale.gamer, Integer)),
+        func.sum(cast(func.round(Sale.total_weight * 100), BigInteger)),
+    ).group_by(day, Sale.plan_name)
+
+    if keep_archived:
+        first_day = connection.scalar(select(func.min(day)))
+        if first_day is None:
+            return connection.scalar(select(func.count()).select_from(SalesDailyStat))
+        # func.date do SQLite devolve texto.
+        first_day = date.fromisoformat(first_day) if isinstance(first_day, str) else first_day
+        connection.execute(delete(SalesDailyStat).where(SalesDailyStat.day >= first_day))
+    else:
+        connection.execute(delete(SalesDailyStat))
+    columns = ["day", "plan_name", "sales_count", "gamer_count", "weight_centis"]
+    connection.execute(SalesDailyStat.__table__.insert().from_select(columns, query))
+    return connection.scalar(select(func.count()).select_from(SalesDailyStat))
+
+
+# Colunas do SaleResponse, lidas como tuplas (sem instanciar Sale) nas listagens.
+SALE_COLUMNS = (
+    Sale.id,
+    Sale.name,
+    Sale.email,
+    Sale.phone,
+    *(getattr(Sale, key) for key in DEVICE_KEYS),
+    Sale.gamer,
+    Sale.total_weight,
+    Sale.plan_name,
+    Sale.created_at,
+)
+# UTC com "Z", como o model_dump_json do Pydantic.
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def sale_row(row: Any) -> dict[str, Any]:
+    """Monta o dicionário no formato do SaleResponse a partir de uma linha de SALE_COLUMNS."""
+    sale_id, name, email, phone, *counts, gamer, total_weight, plan_name, created_at = row
+    counts = tuple(counts)
+    return {
+        "id": sale_id,
+        "name": name,
+        "email": email,
+        "phone": phone,
+        "devices": dict(zip(DEVICE_KEYS, counts)),
+        "gamer": gamer,
+        "device_weights": calculate_counts(counts, False).device_weights,
+        "total_weight": total_weight,
+        "plan_name": plan_name,
+        "plan_speed": PLAN_SPEEDS[plan_name],
+        "created_at": created_at,
+    }
+
+
+def sale_payload(sale: Sale) -> dict[str, Any]:
+    return sale_row(tuple(getattr(sale, column.key) for column in SALE_COLUMNS))
+
+
+def encode_cursor(sort_by: str, sale: Any) -> str:
+    key = sale.name if sort_by == "name" else sale.created_at.isoformat()
+    raw = json.dumps([sort_by, key, sale.id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(sort_by: str, cursor: str) -> tuple[str | datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, key, sale_id = json.loads(raw)
+        if cursor_sort != sort_by or not isinstance(key, str) or not isinstance(sale_id, int):
+            raise ValueError(cursor)
+        return (key if sort_by == "name" else datetime.fromisoformat(key)), sale_id
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido") from None
+
+
+def day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def filter_sales(query, name: str | None, date_from: date | None = None, date_to: date | None = None):
+    if name:
+        # Nomes são gravados já normalizados; LIKE sobre o termo normalizado usa o índice trigram.
+        query = query.where(Sale.name.contains(normalize_name(name), autoescape=True))
+    # Dias em UTC, como as partições mensais: no PostgreSQL só os meses do intervalo são lidos.
+    if date_from:
+        query = query.where(Sale.created_at >= day_start(date_from))
+    if date_to:
+        query = query.where(Sale.created_at < day_start(date_to + timedelta(days=1)))
+    return query
+
+
+def sales_order_by(sort_by: str) -> tuple:
+    if sort_by == "name":
+        return Sale.name.asc(), Sale.id.desc()
+    return Sale.created_at.desc(), Sale.id.desc()
+
+
+def sales_after(sort_by: str, key: str | datetime, sale_id: int):
+    # Keyset: continua exatamente após a última linha da página anterior, sem OFFSET.
+    if sort_by == "name":
+        return or_(Sale.name > key, and_(Sale.name == key, Sale.id < sale_id))
+    # O limite created_at <= key fora do OR permite descartar as partições dos meses seguintes.
+    return and_(Sale.created_at <= key, or_(Sale.created_at < key, Sale.id < sale_id))
+
+
+def sales_page_query(
+    name: str | None, sort_by: str, date_from: date | None, date_to: date | None, limit: int, cursor: str | None
+):
+    # Uma linha a mais que o limite indica se existe próxima página.
+    query = filter_sales(select(*SALE_COLUMNS), name, date_from, date_to)
+    if cursor:
+        query = query.where(sales_after(sort_by, *decode_cursor(sort_by, cursor)))
+    return query.order_by(*sales_order_by(sort_by)).limit(limit + 1)
+
+
+class MemoryCache:
+    # Cache por processo; com vários workers use o backend redis para invalidar todos juntos.
+    def __init__(self, max_entries: int, ttl: int) -> None:
+        self._entries: OrderedDict[str, tuple[float, str, bytes]] = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._version = 0
+        self._last_modified = datetime.now(timezone.utc)
+
+    async def state(self) -> tuple[int, datetime]:
+        return self._version, self._last_modified
+
+    async def get(self, key: str) -> tuple[str, bytes] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, etag, body = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return etag, body
+
+    async def set(self, key: str, etag: str, body: bytes) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl, etag, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def invalidate(self) -> None:
+        self._version += 1
+        self._last_modified = datetime.now(timezone.utc)
+        self._entries.clear()
+
+
+class RedisCache:
+    # As chaves levam a versão atual; invalidar é só um INCR e o restante expira pelo TTL.
+    def __init__(self, url: str, ttl: int) -> None:
+        import redis.asyncio as redis
+
+        self._client = redis.Redis.from_url(url)
+        self._ttl = ttl
+
+    async def state(self) -> tuple[int, datetime]:
+        version, last_modified = await self._client.mget("micks:sales:version", "micks:sales:last_modified")
+        if last_modified is None:
+            return int(version or 0), datetime.fromtimestamp(0, timezone.utc)
+        return int(version or 0), datetime.fromtimestamp(float(last_modified), timezone.utc)
+
+    async def get(self, key: str) -> tuple[str, bytes] | None:
+        value = await self._client.get(f"micks:sales:{key}")
+        if value is None:
+            return None
+        etag, _, body = value.partition(b"\n")
+        return etag.decode(), body
+
+    async def set(self, key: str, etag: str, body: bytes) -> None:
+        await self._client.set(f"micks:sales:{key}", etag.encode() + b"\n" + body, ex=self._ttl)
+
+    async def invalidate(self) -> None:
+        async with self._client.pipeline() as pipe:
+            pipe.incr("micks:sales:version")
+            pipe.set("micks:sales:last_modified", time.time())
+            await pipe.execute()
+
+
+class NullCache:
+    async def state(self) -> tuple[int, datetime]:
+        return 0, datetime.now(timezone.utc)
+
+    async def get(self, key: str) -> tuple[str, bytes] | None:
+        return None
+
+    async def set(self, key: str, etag: str, body: bytes) -> None:
+        pass
+
+    async def invalidate(self) -> None:
+        pass
+
+
+def build_sales_cache() -> MemoryCache | RedisCache | NullCache:
+    if SALES_CACHE_BACKEND == "redis":
+        return RedisCache(REDIS_URL, SALES_CACHE_TTL)
+    if SALES_CACHE_BACKEND == "none":
+        return NullCache()
+    if WEB_CONCURRENCY > 1:
+        # Cada worker teria o próprio cache, e uma edição só invalidaria o do processo que a recebeu.
+        logger.warning("SALES_CACHE_BACKEND=memory com %s workers: cache de vendas desativado; use redis", WEB_CONCURRENCY)
+        return NullCache()
+    return MemoryCache(SALES_CACHE_MAX_ENTRIES, SALES_CACHE_TTL)
+
+
+sales_cache = build_sales_cache()
+
+
+async def cached_json(request: Request, key: str, build: Callable[[], Awaitable[bytes]]) -> Response:
+    version, last_modified = await sales_cache.state()
+    cache_key = f"{version}:{key}"
+    cached = await sales_cache.get(cache_key)
+    if cached is None:
+        body = await build()
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        # Lido da réplica antes de ela alcançar a última escrita: não fica no cache da versão nova.
+        if request.state.db_target == "primary" or last_modified.timestamp() <= replica.synced_at:
+            await sales_cache.set(cache_key, etag, body)
+    else:
+        etag, body = cached
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+        "Cache-Control": "private, no-cache",
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def require_admin(
+    token: HTTPAuthorizationCredentials | None = Depends(bearer),
+    credentials: HTTPBasicCredentials | None = Depends(security),
+) -> str:
+    # Token assinado (sessão do web ou /api/auth/token); Basic Auth segue aceito para scripts.
+    if token is not None:
+        user = token_signer.verify(token.credentials)
+        if user:
+            return user
+    elif credentials is not None and credentials_match(
+        credentials.username, credentials.password, ADMIN_USER, ADMIN_PASSWORD
+    ):
+        return credentials.username
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Credenciais inválidas",
+        headers={"WWW-Authenticate": "Basic"},
+    )
 
 
 @app.get("/health")
@@ -195,104 +1223,543 @@ def health():
             "host": os.getenv("MAILHOG_SMTP_HOST", "mail"),
             "port": int(os.getenv("MAILHOG_SMTP_PORT", "1025")),
         },
+        "calculate_cache": calculate_counts.cache_info()._asdict(),
+        "startup_seconds": round(getattr(app.state, "startup_seconds", 0.0), 4),
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response(pool_collector, admission_collector)
+
+
+@app.post("/api/auth/token", response_model=TokenResponse)
+async def api_auth_token(user: str = Depends(require_admin)):
+    return TokenResponse(access_token=token_signer.issue(user), expires_in=AUTH_TOKEN_TTL)
+
+
+@app.get("/api/rules")
+def api_rules(request: Request):
+    headers = {"ETag": f'"{RULES_VERSION}"', "Cache-Control": f"public, max-age={RULES_MAX_AGE}"}
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=RULES_MANIFEST, media_type="application/json", headers=headers)
+
+
 @app.post("/api/calculate", response_model=PlanResult)
 def api_calculate(payload: DeviceInput):
     return calculate_plan(payload)
 
 
+@app.post("/api/calculate/batch", response_model=list[PlanResult])
+def api_calculate_batch(payload: list[DeviceInput] = Body(max_length=CALC_BATCH_MAX)):
+    return [calculate_plan(devices) for devices in payload]
+
+
 @app.post("/api/contract", response_model=ContractResponse, status_code=status.HTTP_201_CREATED)
-def api_contract(payload: ContractInput, db: Session = Depends(get_db)):
+async def api_contract(payload: ContractInput, db: AsyncSession = Depends(get_db)):
     result = calculate_plan(payload.devices)
     now = datetime.now(timezone.utc)
-    normalized_name = normalize_name(payload.name)
-
-    sale = Sale(
-        name=normalized_name,
-        email=payload.email,
-        phone=payload.phone,
-        devices=payload.devices.model_dump(exclude={"gamer"}),
-        gamer=payload.devices.gamer,
-        device_weights=result.device_weights,
-        total_weight=result.total_weight,
-        plan_name=result.plan_name,
-        plan_speed=result.plan_speed,
-        created_at=now,
-    )
+
+    sale = Sale(**contract_values(payload, result, now))
     db.add(sale)
-    db.commit()
-    db.refresh(sale)
+    await db.flush()
 
-    email_body = build_contract_email(normalized_name, payload.phone, payload.devices, result)
-    ops_email = os.getenv("OPERATIONS_EMAIL", "operacoes@micks.com.br")
+    # Os e-mails entram na mesma transação da venda e são enviados pelo outbox_worker.
+    db.add_all(EmailOutbox(**message) for message in contract_emails(sale.id, payload, result, now))
 
-    try:
-        send_email(payload.email, "Confirmação da contratação - Micks", email_body)
-        send_email(ops_email, f"Nova venda - {normalized_name}", email_body)
-    except OSError:
-        # Não impede a venda quando SMTP estiver indisponível em desenvolvimento.
-        pass
+    deltas: StatsDeltas = {}
+    add_stats(deltas, now, result.plan_name, payload.devices.gamer, result.total_weight)
+    await apply_stats(db, deltas)
+
+    with timed("db_commit"):
+        await db.commit()
+    await sales_cache.invalidate()
+    with timed("db_refresh"):
+        await db.refresh(sale)
+    await sales_events.publish("created", sale_payload(sale))
 
     return ContractResponse(message="Contratação registrada com sucesso", sale=sale)
 
 
-@app.get("/api/sales", response_model=list[SaleResponse], dependencies=[Depends(require_admin)])
-def api_sales(
-    db: Session = Depends(get_db),
+async def iter_request_lines(request: Request) -> AsyncIterator[str]:
+    # utf-8-sig descarta o BOM que o Excel grava no início dos CSVs.
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+
+def validation_messages(exc: ValidationError) -> list[str]:
+    return [f"{'.'.join(str(part) for part in error['loc']) or 'linha'}: {error['msg']}" for error in exc.errors()]
+
+
+def parse_csv_contract(header: list[str], line: str) -> ContractInput:
+    # Uma linha por registro: campos com quebra de linha entre aspas não são aceitos.
+    values = next(csv.reader([line]))
+    if len(values) != len(header):
+        raise ValueError(f"esperadas {len(header)} colunas, recebidas {len(values)}")
+    row = dict(zip(header, values))
+    devices = {key: row.get(key) or 0 for key in DEVICE_KEYS}
+    devices["gamer"] = row.get("gamer") or False
+    return ContractInput.model_validate(
+        {"name": row.get("name"), "email": row.get("email"), "phone": row.get("phone"), "devices": devices}
+    )
+
+
+async def copy_rows(db: AsyncSession, table: str, rows: list[dict[str, Any]]) -> None:
+    # COPY do psycopg pela mesma conexão (e transação) da sessão.
+    columns = list(rows[0])
+    connection = await (await db.connection()).get_raw_connection()
+    async with connection.driver_connection.cursor() as cursor:
+        async with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+            for row in rows:
+                await copy.write_row(list(row.values()))
+
+
+async def insert_sales(db: AsyncSession, values: list[dict[str, Any]]) -> list[int]:
+    if async_engine.dialect.name == "postgresql":
+        # Reserva os ids na sequence e grava tudo com COPY, bem mais rápido que INSERT em lote.
+        query = text("SELECT nextval(pg_get_serial_sequence('sales', 'id')) FROM generate_series(1, :count)")
+        sale_ids = list((await db.scalars(query, {"count": len(values)})).all())
+        await copy_rows(db, "sales", [{"id": sale_id, **row} for sale_id, row in zip(sale_ids, values)])
+        return sale_ids
+
+    # SQLite: um escritor por vez, então os ids do INSERT multi-linha saem crescentes na ordem das linhas.
+    return sorted((await db.scalars(insert(Sale).returning(Sale.id), values)).all())
+
+
+async def insert_contract_chunk(db: AsyncSession, chunk: list[tuple[int, ContractInput]]) -> list[BulkRowResult]:
+    now = datetime.now(timezone.utc)
+    plans = [calculate_plan(payload.devices) for _, payload in chunk]
+    values = [contract_values(payload, result, now) for (_, payload), result in zip(chunk, plans)]
+
+    try:
+        sale_ids = await insert_sales(db, values)
+        emails = [
+            message
+            for sale_id, (_, payload), result in zip(sale_ids, chunk, plans)
+            for message in contract_emails(sale_id, payload, result, now)
+        ]
+        if async_engine.dialect.name == "postgresql":
+            await copy_rows(db, "email_outbox", emails)
+        else:
+            await db.execute(insert(EmailOutbox), emails)
+
+        deltas: StatsDeltas = {}
+        for (_, payload), result in zip(chunk, plans):
+            add_stats(deltas, now, result.plan_name, payload.devices.gamer, result.total_weight)
+        await apply_stats(db, deltas)
+        with timed("db_commit"):
+            await db.commit()
+    except Exception as exc:
+        await db.rollback()
+        logger.exception("Falha ao gravar lote de contratações")
+        return [BulkRowResult(line=line, ok=False, errors=[f"erro ao gravar no banco: {type(exc).__name__}"]) for line, _ in chunk]
+
+    return [
+        BulkRowResult(line=line, ok=True, id=sale_id, plan_name=result.plan_name)
+        for sale_id, (line, _), result in zip(sale_ids, chunk, plans)
+    ]
+
+
+@app.post("/api/contracts/bulk", response_model=BulkContractResponse, dependencies=[Depends(require_admin)])
+async def api_contracts_bulk(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        kind = "csv"
+    elif any(name in content_type for name in ("ndjson", "jsonl", "json")):
+        kind = "ndjson"
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Envie application/x-ndjson (uma contratação JSON por linha) ou text/csv",
+        )
+
+    results: list[BulkRowResult] = []
+    chunk: list[tuple[int, ContractInput]] = []
+    header: list[str] | None = None
+    line_number = 0
+    try:
+        async for line in iter_request_lines(request):
+            line_number += 1
+            if not line.strip():
+                continue
+            if kind == "csv" and header is None:
+                header = [column.strip().lower() for column in next(csv.reader([line]))]
+                continue
+            try:
+                if kind == "csv":
+                    payload = parse_csv_contract(header, line)
+                else:
+                    payload = ContractInput.model_validate_json(line)
+            except ValidationError as exc:
+                results.append(BulkRowResult(line=line_number, ok=False, errors=validation_messages(exc)))
+                continue
+            except (ValueError, csv.Error) as exc:
+                results.append(BulkRowResult(line=line_number, ok=False, errors=[str(exc)]))
+                continue
+
+            chunk.append((line_number, payload))
+            if len(chunk) >= BULK_CHUNK_SIZE:
+                results.extend(await insert_contract_chunk(db, chunk))
+                chunk = []
+    except UnicodeDecodeError:
+        results.append(BulkRowResult(line=line_number + 1, ok=False, errors=["arquivo não está em UTF-8"]))
+
+    if chunk:
+        results.extend(await insert_contract_chunk(db, chunk))
+
+    results.sort(key=lambda row: row.line)
+    created = sum(1 for row in results if row.ok)
+    if created:
+        await sales_cache.invalidate()
+        read_your_writes(response)
+        # Um evento por lote: os painéis recarregam a listagem em vez de receber milhares de linhas.
+        await sales_events.publish("refresh", {"created": created})
+    return BulkContractResponse(created=created, failed=len(results) - created, results=results)
+
+
+@app.get("/api/sales", response_model=SalesPage, dependencies=[Depends(require_admin)])
+async def api_sales(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    name: str | None = Query(default=None),
+    sort_by: Literal["date", "name"] = Query(default="date"),
+    date_from: date | None = Query(default=None),
+    date_to: date | None = Query(default=None),
+    limit: int = Query(default=SALES_PAGE_DEFAULT, ge=1, le=SALES_PAGE_MAX),
+    cursor: str | None = Query(default=None),
+):
+    async def build() -> bytes:
+        rows = (await db.execute(sales_page_query(name, sort_by, date_from, date_to, limit, cursor))).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort_by, rows[-1])
+        with timed("serialize_sales"):
+            page = {"items": [sale_row(row) for row in rows], "next_cursor": next_cursor}
+            return orjson.dumps(page, option=ORJSON_OPTIONS)
+
+    key = json.dumps(["list", name, sort_by, str(date_from), str(date_to), limit, cursor])
+    return await cached_json(request, key, build)
+
+
+async def stream_partitions(query, sessionmaker: async_sessionmaker) -> AsyncIterator[list[Any]]:
+    # Sessão própria: a do get_db é fechada antes de o StreamingResponse começar a enviar.
+    async with sessionmaker() as db:
+        result = await db.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield partition
+
+
+async def iter_export_rows(
+    sessionmaker: async_sessionmaker,
+    name: str | None,
+    sort_by: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> AsyncIterator[list[list[Any]]]:
+    query = filter_sales(
+        select(
+            Sale.created_at,
+            Sale.name,
+            Sale.email,
+            Sale.phone,
+            *(getattr(Sale, key) for key in DEVICE_KEYS),
+            Sale.total_weight,
+            Sale.plan_name,
+        ),
+        name,
+        date_from,
+        date_to,
+    ).order_by(*sales_order_by(sort_by))
+
+    async for partition in stream_partitions(query, sessionmaker):
+        yield [[row[0].isoformat(), *row[1:], PLAN_SPEEDS[row[-1]]] for row in partition]
+
+
+async def stream_ndjson(
+    sessionmaker: async_sessionmaker,
+    name: str | None,
+    sort_by: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> AsyncIterator[bytes]:
+    query = filter_sales(select(*SALE_COLUMNS), name, date_from, date_to).order_by(*sales_order_by(sort_by))
+    options = ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE
+    async for partition in stream_partitions(query, sessionmaker):
+        yield b"".join(orjson.dumps(sale_row(row), option=options) for row in partition)
+
+
+async def stream_csv(batches: AsyncIterator[list[list[Any]]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADER)
+    async for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+async def with_export_header(batches: AsyncIterator[list[list[Any]]]) -> AsyncIterator[list[list[Any]]]:
+    yield [EXPORT_HEADER]
+    async for batch in batches:
+        yield batch
+
+
+@app.get("/api/sales/export", dependencies=[Depends(require_admin)])
+async def api_sales_export(
+    request: Request,
+    format: Literal["csv", "xlsx", "ndjson"] = Query(default="csv"),
     name: str | None = Query(default=None),
     sort_by: Literal["date", "name"] = Query(default="date"),
+    date_from: date | None = Query(default=None),
+    date_to: date | None = Query(default=None),
 ):
-    query = select(Sale)
+    sessionmaker = await read_sessionmaker(request)
+    if format == "ndjson":
+        # Uma venda por linha, no mesmo formato do /api/sales, enviada à medida que sai do banco.
+        content = stream_ndjson(sessionmaker, name, sort_by, date_from, date_to)
+        return StreamingResponse(content, media_type="application/x-ndjson")
+
+    batches = iter_export_rows(sessionmaker, name, sort_by, date_from, date_to)
+    if format == "xlsx":
+        from micks_common.xlsx import stream_xlsx  # só esta rota usa o gerador de planilhas
+
+        content = stream_xlsx(with_export_header(batches))
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        content = stream_csv(batches)
+        media_type = "text/csv; charset=utf-8"
 
-    if name:
-        query = query.where(Sale.name.ilike(f"%{name}%"))
+    headers = {"Content-Disposition": f'attachment; filename="vendas_micks.{format}"'}
+    return StreamingResponse(content, media_type=media_type, headers=headers)
 
-    if sort_by == "name":
-        query = query.order_by(Sale.name.asc(), Sale.created_at.desc())
-    else:
-        query = query.order_by(Sale.created_at.desc())
 
-    return list(db.scalars(query).all())
+@app.get("/api/sales/events", dependencies=[Depends(require_admin)])
+async def api_sales_events():
+    # Stream SSE com as vendas criadas, editadas e excluídas; o web mantém um por worker e repassa aos painéis.
+    async def stream() -> AsyncIterator[bytes]:
+        async with sales_events.subscribe() as queue:
+            async for chunk in stream_queue(queue, SALES_EVENTS_KEEPALIVE):
+                yield chunk
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@app.get("/api/sales/stats", response_model=SalesStatsResponse, dependencies=[Depends(require_admin)])
+async def api_sales_stats(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    days: int = Query(default=30, ge=1, le=366),
+):
+    async def build() -> bytes:
+        # Só lê o rollup: o custo depende do número de dias e planos, não do volume de vendas.
+        totals = func.sum(SalesDailyStat.sales_count)
+        gamers = func.sum(SalesDailyStat.gamer_count)
+        centis = func.sum(SalesDailyStat.weight_centis)
+        per_plan = {
+            plan_name: (count or 0, gamer or 0, weight or 0)
+            for plan_name, count, gamer, weight in await db.execute(
+                select(SalesDailyStat.plan_name, totals, gamers, centis).group_by(SalesDailyStat.plan_name)
+            )
+        }
+        since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+        per_day = await db.execute(
+            select(SalesDailyStat.day, totals, gamers, centis)
+            .where(SalesDailyStat.day >= since)
+            .group_by(SalesDailyStat.day)
+            .having(totals > 0)
+            .order_by(SalesDailyStat.day)
+        )
+
+        total_sales = sum(count for count, _, _ in per_plan.values())
+        total_gamers = sum(gamer for _, gamer, _ in per_plan.values())
+        total_centis = sum(weight for _, _, weight in per_plan.values())
+        return SalesStatsResponse(
+            total_sales=total_sales,
+            average_weight=round(total_centis / 100 / total_sales, 2) if total_sales else 0.0,
+            gamer_share=round(total_gamers / total_sales, 4) if total_sales else 0.0,
+            by_plan=[
+                PlanStats(
+                    plan_name=name,
+                    plan_speed=speed,
+                    sales=per_plan.get(name, (0, 0, 0))[0],
+                    share=round(per_plan.get(name, (0, 0, 0))[0] / total_sales, 4) if total_sales else 0.0,
+                )
+                for name, speed, _, _ in PLANS
+            ],
+            by_day=[
+                DayStats(
+                    day=day,
+                    sales=count,
+                    average_weight=round(weight / 100 / count, 2),
+                    gamer_share=round(gamer / count, 4),
+                )
+                for day, count, gamer, weight in per_day
+            ],
+        ).model_dump_json().encode()
+
+    return await cached_json(request, f"stats:{days}", build)
 
 
 @app.get("/api/sales/{sale_id}", response_model=SaleResponse, dependencies=[Depends(require_admin)])
-def api_sale_by_id(sale_id: int, db: Session = Depends(get_db)):
-    sale = db.get(Sale, sale_id)
-    if not sale:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Venda não encontrada")
-    return sale
+async def api_sale_by_id(request: Request, sale_id: int, db: AsyncSession = Depends(get_db)):
+    async def build() -> bytes:
+        sale = await db.get(Sale, sale_id)
+        if not sale:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Venda não encontrada")
+        return SaleResponse.model_validate(sale).model_dump_json().encode()
+
+    return await cached_json(request, f"sale:{sale_id}", build)
 
 
 @app.put("/api/sales/{sale_id}", response_model=SaleResponse, dependencies=[Depends(require_admin)])
-def api_update_sale(sale_id: int, payload: SaleUpdateInput, db: Session = Depends(get_db)):
-    sale = db.get(Sale, sale_id)
+async def api_update_sale(
+    sale_id: int, payload: SaleUpdateInput, response: Response, db: AsyncSession = Depends(get_db)
+):
+    sale = await db.get(Sale, sale_id, with_for_update=True)
     if not sale:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Venda não encontrada")
 
     result = calculate_plan(payload.devices)
+    deltas: StatsDeltas = {}
+    add_stats(deltas, sale.created_at, sale.plan_name, sale.gamer, sale.total_weight, sign=-1)
+    add_stats(deltas, sale.created_at, result.plan_name, payload.devices.gamer, result.total_weight)
+    await apply_stats(db, deltas)
+
     sale.name = normalize_name(payload.name)
     sale.email = payload.email
     sale.phone = payload.phone
-    sale.devices = payload.devices.model_dump(exclude={"gamer"})
-    sale.gamer = payload.devices.gamer
-    sale.device_weights = result.device_weights
+    for column, value in payload.devices.model_dump().items():
+        setattr(sale, column, value)
     sale.total_weight = result.total_weight
     sale.plan_name = result.plan_name
-    sale.plan_speed = result.plan_speed
 
     db.add(sale)
-    db.commit()
-    db.refresh(sale)
+    with timed("db_commit"):
+        await db.commit()
+    await sales_cache.invalidate()
+    read_your_writes(response)
+    with timed("db_refresh"):
+        await db.refresh(sale)
+    await sales_events.publish("updated", sale_payload(sale))
     return sale
 
 
 @app.delete("/api/sales/{sale_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_admin)])
-def api_delete_sale(sale_id: int, db: Session = Depends(get_db)):
-    sale = db.get(Sale, sale_id)
+async def api_delete_sale(sale_id: int, response: Response, db: AsyncSession = Depends(get_db)):
+    sale = await db.get(Sale, sale_id, with_for_update=True)
     if not sale:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Venda não encontrada")
 
-    db.delete(sale)
-    db.commit()
+    deltas: StatsDeltas = {}
+    add_stats(deltas, sale.created_at, sale.plan_name, sale.gamer, sale.total_weight, sign=-1)
+    await apply_stats(db, deltas)
+    await db.delete(sale)
+    with timed("db_commit"):
+        await db.commit()
+    await sales_cache.invalidate()
+    read_your_writes(response)
+    await sales_events.publish("deleted", {"id": sale_id})
+
+
+@app.post("/api/sales/bulk-delete", response_model=BulkDeleteResponse, dependencies=[Depends(require_admin)])
+async def api_sales_bulk_delete(payload: SaleIdsInput, response: Response, db: AsyncSession = Depends(get_db)):
+    ids = sorted(set(payload.ids))
+    # Um único DELETE; o RETURNING traz o necessário para descontar as vendas do rollup.
+    statement = (
+        delete(Sale)
+        .where(Sale.id.in_(ids))
+        .returning(Sale.id, Sale.created_at, Sale.plan_name, Sale.gamer, Sale.total_weight)
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await db.execute(statement)).all()
+
+    deltas: StatsDeltas = {}
+    for _, created_at, plan_name, gamer, total_weight in rows:
+        add_stats(deltas, created_at, plan_name, gamer, total_weight, sign=-1)
+    await apply_stats(db, deltas)
+    with timed("db_commit"):
+        await db.commit()
+
+    deleted = sorted(row.id for row in rows)
+    if deleted:
+        await sales_cache.invalidate()
+        read_your_writes(response)
+        await sales_events.publish("refresh", {"deleted": len(deleted)})
+    return BulkDeleteResponse(deleted=deleted, not_found=sorted(set(ids) - set(deleted)))
+
+
+@app.patch("/api/sales/bulk", response_model=BulkUpdateResponse, dependencies=[Depends(require_admin)])
+async def api_sales_bulk_update(payload: SalesBulkPatch, response: Response, db: AsyncSession = Depends(get_db)):
+    changes = payload.devices.model_dump(exclude_none=True)
+    if not changes:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Informe ao menos um campo em devices")
+    ids = sorted(set(payload.ids))
+
+    # Trava as vendas em ordem de id e lê os valores atuais: o plano novo depende das contagens
+    # que não mudam, e o rollup precisa do plano e do peso antigos.
+    current = select(
+        Sale.id, *(getattr(Sale, key) for key in DEVICE_KEYS), Sale.gamer, Sale.total_weight, Sale.plan_name, Sale.created_at
+    )
+    rows = (await db.execute(current.where(Sale.id.in_(ids)).order_by(Sale.id).with_for_update())).all()
+    if not rows:
+        return BulkUpdateResponse(updated=[], not_found=ids)
+
+    deltas: StatsDeltas = {}
+    weights: dict[int, float] = {}
+    plans: dict[int, str] = {}
+    for sale_id, *counts, gamer, total_weight, plan_name, created_at in rows:
+        new_counts = tuple(changes.get(key, count) for key, count in zip(DEVICE_KEYS, counts))
+        new_gamer = changes.get("gamer", gamer)
+        # calculate_counts fica em cache: vendas com as mesmas contagens calculam uma vez só.
+        result = calculate_counts(new_counts, new_gamer)
+        add_stats(deltas, created_at, plan_name, gamer, total_weight, sign=-1)
+        add_stats(deltas, created_at, result.plan_name, new_gamer, result.total_weight)
+        weights[sale_id] = result.total_weight
+        plans[sale_id] = result.plan_name
+    await apply_stats(db, deltas)
+
+    statement = (
+        update(Sale)
+        .where(Sale.id.in_(list(weights)))
+        .values(
+            **changes,
+            total_weight=case(weights, value=Sale.id),
+            plan_name=cast(case(plans, value=Sale.id), Sale.plan_name.type),
+        )
+        .returning(*SALE_COLUMNS)
+        .execution_options(synchronize_session=False)
+    )
+    updated = [sale_row(row) for row in (await db.execute(statement)).all()]
+    with timed("db_commit"):
+        await db.commit()
+
+    await sales_cache.invalidate()
+    read_your_writes(response)
+    await sales_events.publish("refresh", {"updated": len(updated)})
+    updated.sort(key=lambda sale: sale["id"])
+    return BulkUpdateResponse(updated=updated, not_found=sorted(set(ids) - set(weights)))
+
+
+@app.get("/api/sales/{sale_id}/emails", response_model=list[EmailStatusResponse], dependencies=[Depends(require_admin)])
+async def api_sale_emails(sale_id: int, db: AsyncSession = Depends(get_db)):
+    query = select(EmailOutbox).where(EmailOutbox.sale_id == sale_id).order_by(EmailOutbox.id)
+    return list((await db.scalars(query)).all())
+
+
+@app.get("/api/outbox", response_model=OutboxStatusResponse, dependencies=[Depends(require_admin)])
+async def api_outbox_status(db: AsyncSession = Depends(get_db)):
+    query = select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+    return OutboxStatusResponse(**{row_status: count for row_status, count in await db.execute(query)})
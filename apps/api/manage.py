@@ -0,0 +1,71 @@
+import argparse
+import os
+from pathlib import Path
+
+from main import Sale, engine, rebuild_sales_stats, run_migrations
+from partitions import archive_sales, ensure_partitions
+
+SALES_PARTITIONS_AHEAD = int(os.getenv("SALES_PARTITIONS_AHEAD", "3"))
+SALES_ARCHIVE_DIR = os.getenv("SALES_ARCHIVE_DIR", "archive")
+
+
+def migrate(args: argparse.Namespace) -> None:
+    run_migrations()
+    print("migrações aplicadas")
+    # Roda a cada deploy: garante as partições dos próximos meses mesmo sem o agendamento do `partitions`.
+    for name in ensure_partitions(engine, SALES_PARTITIONS_AHEAD):
+        print(f"partição criada: {name}")
+
+
+def partitions(args: argparse.Namespace) -> None:
+    if engine.dialect.name != "postgresql":
+        print("SQLite: sales não é particionada; use `archive` para remover meses antigos")
+        return
+    created = ensure_partitions(engine, args.ahead)
+    for name in created:
+        print(f"partição criada: {name}")
+    print(f"{len(created)} partições criadas (até {args.ahead} meses à frente)")
+
+
+def archive(args: argparse.Namespace) -> None:
+    if args.keep_months < 1:
+        raise SystemExit("--keep-months deve ser pelo menos 1")
+    archived = archive_sales(engine, Sale.__table__, args.keep_months, Path(args.dir))
+    for path, rows in archived:
+        print(f"{path}: {rows} vendas")
+    print(f"{sum(rows for _, rows in archived)} vendas arquivadas; mantidos os últimos {args.keep_months} meses")
+
+
+def rebuild_stats(args: argparse.Namespace) -> None:
+    with engine.begin() as connection:
+        rows = rebuild_sales_stats(connection, keep_archived=not args.all)
+    print(f"sales_daily_stats recalculada: {rows} linhas (dia x plano)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tarefas administrativas da API.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("migrate", help="aplica as migrações pendentes (alembic upgrade head)").set_defaults(
+        handler=migrate
+    )
+
+    partitions_parser = commands.add_parser("partitions", help="cria as partições mensais dos próximos meses")
+    partitions_parser.add_argument("--ahead", type=int, default=SALES_PARTITIONS_AHEAD, help="meses à frente")
+    partitions_parser.set_defaults(handler=partitions)
+
+    archive_parser = commands.add_parser("archive", help="move os meses antigos de sales para CSV compactado")
+    archive_parser.add_argument("--keep-months", type=int, required=True, help="meses mantidos, contando o atual")
+    archive_parser.add_argument("--dir", default=SALES_ARCHIVE_DIR, help="diretório dos arquivos .csv.gz")
+    archive_parser.set_defaults(handler=archive)
+
+    stats_parser = commands.add_parser("rebuild-stats", help="recalcula o rollup sales_daily_stats a partir de sales")
+    stats_parser.add_argument("--all", action="store_true", help="refaz também os dias já arquivados")
+    stats_parser.set_defaults(handler=rebuild_stats)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
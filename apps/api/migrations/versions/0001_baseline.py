@@ -0,0 +1,63 @@
+"""baseline: sales e email_outbox
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 10:00:00
+
+Bancos criados antes das migrações (via create_all) já têm essas tabelas;
+nesse caso a revisão só registra a versão.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "sales" not in tables:
+        op.create_table(
+            "sales",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(120), nullable=False),
+            sa.Column("email", sa.String(255), nullable=False),
+            sa.Column("phone", sa.String(40), nullable=False),
+            sa.Column("devices", sa.JSON(), nullable=False),
+            sa.Column("gamer", sa.Boolean(), nullable=False),
+            sa.Column("device_weights", sa.JSON(), nullable=False),
+            sa.Column("total_weight", sa.Float(), nullable=False),
+            sa.Column("plan_name", sa.String(50), nullable=False),
+            sa.Column("plan_speed", sa.String(50), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        )
+
+    if "email_outbox" not in tables:
+        op.create_table(
+            "email_outbox",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("sale_id", sa.Integer(), nullable=True),
+            sa.Column("to_email", sa.String(255), nullable=False),
+            sa.Column("subject", sa.String(255), nullable=False),
+            sa.Column("body", sa.Text(), nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("next_attempt_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_email_outbox_sale_id", "email_outbox", ["sale_id"])
+        op.create_index("ix_email_outbox_status", "email_outbox", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_table("email_outbox")
+    op.drop_table("sales")
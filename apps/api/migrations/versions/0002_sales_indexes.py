@@ -0,0 +1,51 @@
+"""índices de listagem e busca por nome em sales
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:30:00
+
+No PostgreSQL a busca por trecho do nome usa um índice GIN com pg_trgm;
+no SQLite (dev) ficam só os índices B-tree.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def has_pg_trgm() -> bool:
+    # Instalações sem os módulos contrib ficam só com os índices B-tree.
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    query = sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    return bind.execute(query).scalar() is not None
+
+
+def upgrade() -> None:
+    op.create_index("ix_sales_created_at_id", "sales", ["created_at", "id"])
+    op.create_index("ix_sales_name_created_at", "sales", ["name", "created_at"])
+
+    if has_pg_trgm():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index(
+            "ix_sales_name_trgm",
+            "sales",
+            ["name"],
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_sales_name_trgm")
+    op.drop_index("ix_sales_name_created_at", table_name="sales")
+    op.drop_index("ix_sales_created_at_id", table_name="sales")
@@ -0,0 +1,54 @@
+"""rollup diário de vendas por plano (sales_daily_stats)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 13:20:00
+
+Mantido de forma incremental pela API; aqui a tabela é criada e preenchida
+a partir das vendas já existentes. O peso é somado em centésimos (inteiro)
+para que somas e subtrações sucessivas não acumulem erro de ponto flutuante.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sales_daily_stats",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("plan_name", sa.String(50), primary_key=True),
+        sa.Column("sales_count", sa.Integer(), nullable=False),
+        sa.Column("gamer_count", sa.Integer(), nullable=False),
+        sa.Column("weight_centis", sa.BigInteger(), nullable=False),
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        day = "(created_at AT TIME ZONE 'UTC')::date"
+        gamer = "gamer::int"
+        centis = "round(total_weight * 100)::bigint"
+    else:
+        day = "date(created_at)"
+        gamer = "gamer"
+        centis = "CAST(round(total_weight * 100) AS INTEGER)"
+
+    op.execute(
+        f"""
+        INSERT INTO sales_daily_stats (day, plan_name, sales_count, gamer_count, weight_centis)
+        SELECT {day}, plan_name, count(*), sum({gamer}), sum({centis})
+        FROM sales
+        GROUP BY {day}, plan_name
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sales_daily_stats")
@@ -0,0 +1,94 @@
+"""sales compacta: contagens em SMALLINT e plano como enum
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 14:10:00
+
+Os JSON devices/device_weights davam cada linha com as cinco chaves repetidas;
+as contagens passam a colunas SMALLINT, os pesos individuais e a velocidade
+deixam de ser gravados (a API deriva dos valores atuais de DEVICE_WEIGHTS e
+PLANS) e plan_name vira o enum sale_plan. O peso total continua gravado.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Congelados aqui: o downgrade recompõe o JSON com as regras desta revisão.
+DEVICE_WEIGHTS = {"cellphones": 0.8, "computers": 0.5, "smart_tvs": 0.4, "tv_boxes": 0.6, "others": 0.1}
+PLAN_SPEEDS = {"Prata": "100 Mb", "Bronze": "300 Mb", "Ouro": "500 Mb", "Diamante": "800 Mb"}
+
+sale_plan = sa.Enum(*PLAN_SPEEDS, name="sale_plan")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    sale_plan.create(bind, checkfirst=True)
+
+    with op.batch_alter_table("sales") as batch:
+        for key in DEVICE_WEIGHTS:
+            batch.add_column(sa.Column(key, sa.SmallInteger(), nullable=False, server_default="0"))
+
+    if bind.dialect.name == "postgresql":
+        extract = "COALESCE((devices->>'{key}')::smallint, 0)"
+    else:
+        extract = "COALESCE(json_extract(devices, '$.{key}'), 0)"
+    op.execute("UPDATE sales SET " + ", ".join(f"{key} = {extract.format(key=key)}" for key in DEVICE_WEIGHTS))
+
+    with op.batch_alter_table("sales") as batch:
+        batch.drop_column("devices")
+        batch.drop_column("device_weights")
+        batch.drop_column("plan_speed")
+        batch.alter_column(
+            "plan_name",
+            type_=sale_plan,
+            existing_type=sa.String(50),
+            existing_nullable=False,
+            postgresql_using="plan_name::sale_plan",
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    postgres = bind.dialect.name == "postgresql"
+
+    with op.batch_alter_table("sales") as batch:
+        batch.add_column(sa.Column("devices", sa.JSON(), nullable=True))
+        batch.add_column(sa.Column("device_weights", sa.JSON(), nullable=True))
+        batch.add_column(sa.Column("plan_speed", sa.String(50), nullable=True))
+
+    json_object = "json_build_object" if postgres else "json_object"
+    devices = ", ".join(f"'{key}', {key}" for key in DEVICE_WEIGHTS)
+    weights = ", ".join(f"'{key}', round({key} * {weight}, 2)" for key, weight in DEVICE_WEIGHTS.items())
+    speed = " ".join(f"WHEN '{name}' THEN '{value}'" for name, value in PLAN_SPEEDS.items())
+    op.execute(
+        f"""
+        UPDATE sales SET
+            devices = {json_object}({devices}),
+            device_weights = {json_object}({weights}),
+            plan_speed = CASE plan_name {speed} END
+        """
+    )
+
+    with op.batch_alter_table("sales") as batch:
+        batch.alter_column("devices", existing_type=sa.JSON(), nullable=False)
+        batch.alter_column("device_weights", existing_type=sa.JSON(), nullable=False)
+        batch.alter_column("plan_speed", existing_type=sa.String(50), nullable=False)
+        batch.alter_column(
+            "plan_name",
+            type_=sa.String(50),
+            existing_type=sale_plan,
+            existing_nullable=False,
+            postgresql_using="plan_name::text",
+        )
+        for key in DEVICE_WEIGHTS:
+            batch.drop_column(key)
+
+    sale_plan.drop(bind, checkfirst=True)
@@ -0,0 +1,108 @@
+"""sales particionada por mês em created_at (PostgreSQL)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 16:40:00
+
+A tabela é recriada como PARTITION BY RANGE (created_at), com uma partição
+por mês (UTC) desde a venda mais antiga até alguns meses à frente, e a
+partição sales_default para o que cair fora delas. A chave primária passa a
+(id, created_at), exigência do particionamento; a sequence dos ids é mantida.
+As partições seguintes são criadas pelo `manage.py partitions`. No SQLite a
+revisão não faz nada.
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 3
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def has_trgm_index(bind) -> bool:
+    query = sa.text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_sales_name_trgm'")
+    return bind.execute(query).scalar() is not None
+
+
+def create_indexes(trgm: bool) -> None:
+    op.create_index("ix_sales_created_at_id", "sales", ["created_at", "id"])
+    op.create_index("ix_sales_name_created_at", "sales", ["name", "created_at"])
+    if trgm:
+        op.create_index(
+            "ix_sales_name_trgm",
+            "sales",
+            ["name"],
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        )
+
+
+def replace_sales(table_options: str, primary_key: str) -> bool:
+    """Renomeia sales para sales_previous e cria a nova sales vazia, com a mesma sequence de ids."""
+    bind = op.get_bind()
+    trgm = has_trgm_index(bind)
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('sales', 'id')")).scalar()
+
+    op.execute("ALTER TABLE sales RENAME TO sales_previous")
+    op.execute("ALTER TABLE sales_previous RENAME CONSTRAINT sales_pkey TO sales_previous_pkey")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    for index in ("ix_sales_created_at_id", "ix_sales_name_created_at", "ix_sales_name_trgm"):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+
+    op.execute(
+        f"CREATE TABLE sales (LIKE sales_previous INCLUDING DEFAULTS, "
+        f"CONSTRAINT sales_pkey PRIMARY KEY ({primary_key})) {table_options}"
+    )
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY sales.id")
+    return trgm
+
+
+def copy_from_previous(trgm: bool) -> None:
+    op.execute("INSERT INTO sales SELECT * FROM sales_previous")
+    op.execute("DROP TABLE sales_previous CASCADE")
+    create_indexes(trgm)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    first, newest = bind.execute(sa.text("SELECT min(created_at), max(created_at) FROM sales")).one()
+    today = datetime.now(timezone.utc).date()
+    month = (first.astimezone(timezone.utc).date() if first else today).replace(day=1)
+    last = add_months(today.replace(day=1), MONTHS_AHEAD)
+    if newest:
+        last = max(last, newest.astimezone(timezone.utc).date().replace(day=1))
+
+    trgm = replace_sales("PARTITION BY RANGE (created_at)", "id, created_at")
+    op.execute("CREATE TABLE sales_default PARTITION OF sales DEFAULT")
+    while month <= last:
+        upper = add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE sales_{month:%Y_%m} PARTITION OF sales "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+        )
+        month = upper
+    copy_from_previous(trgm)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    trgm = replace_sales("", "id")
+    copy_from_previous(trgm)
@@ -0,0 +1,32 @@
+"""índice (name, id DESC) para a listagem ordenada por nome
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 09:00:00
+
+A ordenação por nome é name ASC, id DESC (o desempate do cursor); com o índice
+(name, created_at) o banco ainda ordenava o id à parte. O novo índice cobre a
+ordem inteira e o predicado do cursor. No PostgreSQL particionado ele é criado
+em cada partição.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_sales_name_id", "sales", ["name", sa.text("id DESC")])
+    op.drop_index("ix_sales_name_created_at", table_name="sales")
+
+
+def downgrade() -> None:
+    op.create_index("ix_sales_name_created_at", "sales", ["name", "created_at"])
+    op.drop_index("ix_sales_name_id", table_name="sales")
@@ -0,0 +1,194 @@
+"""Partições mensais de sales e arquivamento dos meses antigos (comandos do manage.py).
+
+No PostgreSQL cada mês (UTC) é uma partição sales_AAAA_MM (revisão 0005): arquivar
+é desanexar a partição, copiá-la para um CSV compactado e apagá-la. No SQLite, e
+para linhas antigas que tenham caído na sales_default, os meses são copiados com
+SELECT e removidos com DELETE.
+"""
+import csv
+import gzip
+import io
+import re
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import Connection, Engine, Table, delete, func, select, text
+
+PARTITION_NAME = re.compile(r"^sales_(\d{4})_(\d{2})$")
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month: date) -> tuple[datetime, datetime]:
+    lower = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    upper = add_months(month, 1)
+    return lower, datetime(upper.year, upper.month, 1, tzinfo=timezone.utc)
+
+
+def current_month(today: date | None = None) -> date:
+    return (today or datetime.now(timezone.utc).date()).replace(day=1)
+
+
+def is_partitioned(connection: Connection) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return connection.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('sales')")) == "p"
+
+
+def list_partitions(connection: Connection) -> dict[date, str]:
+    """Partições mensais anexadas a sales, pelo primeiro dia do mês (sem a sales_default)."""
+    query = text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'sales'::regclass"
+    )
+    partitions = {}
+    for name in connection.scalars(query):
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return dict(sorted(partitions.items()))
+
+
+def ensure_partitions(engine: Engine, months_ahead: int, today: date | None = None) -> list[str]:
+    """Cria as partições do mês atual até months_ahead meses à frente; devolve as que criou."""
+    created = []
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            return created
+        existing = list_partitions(connection)
+        for offset in range(months_ahead + 1):
+            month = add_months(current_month(today), offset)
+            if month in existing:
+                continue
+            name = f"sales_{month:%Y_%m}"
+            lower, upper = month_bounds(month)
+            # Vendas desse mês que caíram na sales_default passam para a tabela nova antes do ATTACH,
+            # que falharia com linhas do intervalo ainda na partição padrão.
+            connection.execute(text(f"CREATE TABLE {name} (LIKE sales INCLUDING DEFAULTS)"))
+            connection.execute(
+                text(
+                    "WITH moved AS (DELETE FROM sales_default WHERE created_at >= :lower AND created_at < :upper "
+                    f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+                ),
+                {"lower": lower, "upper": upper},
+            )
+            connection.execute(
+                text(
+                    f"ALTER TABLE sales ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+                )
+            )
+            created.append(name)
+    return created
+
+
+def archive_path(directory: Path, name: str) -> Path:
+    # Nunca sobrescreve um arquivo já gerado: um segundo lote do mesmo mês ganha sufixo.
+    path = directory / f"{name}.csv.gz"
+    suffix = 2
+    while path.exists():
+        path = directory / f"{name}-{suffix}.csv.gz"
+        suffix += 1
+    return path
+
+
+@contextmanager
+def discard_on_error(path: Path) -> Iterator[None]:
+    # Se a transação não confirmar, as linhas continuam no banco e o arquivo não deve ficar.
+    try:
+        yield
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+
+def write_archive(path: Path, chunks: Iterable[bytes]) -> None:
+    partial = path.with_name(path.name + ".part")
+    with gzip.open(partial, "wb") as output:
+        for chunk in chunks:
+            output.write(chunk)
+    partial.rename(path)
+
+
+def copy_partition(connection: Connection, name: str, columns: list[str], path: Path) -> int:
+    cursor = connection.connection.driver_connection.cursor()
+    with cursor:
+        with cursor.copy(f"COPY {name} ({', '.join(columns)}) TO STDOUT (FORMAT csv, HEADER)") as copy:
+            write_archive(path, (bytes(data) for data in copy))
+        return cursor.rowcount
+
+
+def csv_chunks(columns: list[str], rows: Iterable[Any], batch_size: int = 5000) -> Iterable[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for index, row in enumerate(rows, 1):
+        writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+        if index % batch_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def archive_month(connection: Connection, table: Table, month: date, path: Path) -> int:
+    lower, upper = month_bounds(month)
+    in_month = (table.c.created_at >= lower, table.c.created_at < upper)
+    count = connection.scalar(select(func.count()).select_from(table).where(*in_month))
+    if not count:
+        return 0
+    rows = connection.execute(
+        select(table).where(*in_month).order_by(table.c.created_at, table.c.id).execution_options(yield_per=5000)
+    )
+    write_archive(path, csv_chunks(list(table.c.keys()), rows))
+    connection.execute(delete(table).where(*in_month))
+    return count
+
+
+def archive_sales(
+    engine: Engine, table: Table, keep_months: int, directory: Path, today: date | None = None
+) -> list[tuple[Path, int]]:
+    """Arquiva e remove as vendas anteriores aos keep_months meses mais recentes (o atual incluso).
+
+    Cada mês vira um CSV compactado em directory, gravado na mesma transação que
+    remove as linhas: se algo falhar, o mês continua no banco.
+    """
+    if keep_months < 1:
+        raise ValueError("keep_months deve ser pelo menos 1")
+    directory.mkdir(parents=True, exist_ok=True)
+    cutoff = add_months(current_month(today), 1 - keep_months)
+    archived = []
+
+    with engine.connect() as connection:
+        old_partitions = []
+        if is_partitioned(connection):
+            old_partitions = [(month, name) for month, name in list_partitions(connection).items() if month < cutoff]
+    for month, name in old_partitions:
+        path = archive_path(directory, name)
+        with discard_on_error(path), engine.begin() as connection:
+            connection.execute(text(f"ALTER TABLE sales DETACH PARTITION {name}"))
+            count = copy_partition(connection, name, list(table.c.keys()), path)
+            connection.execute(text(f"DROP TABLE {name}"))
+        archived.append((path, count))
+
+    # SQLite, ou vendas antigas que ficaram na sales_default: mês a mês com SELECT/DELETE.
+    with engine.connect() as connection:
+        first = connection.scalar(
+            select(func.min(table.c.created_at)).where(table.c.created_at < month_bounds(cutoff)[0])
+        )
+    if first is None:
+        return archived
+    month = (first.astimezone(timezone.utc) if first.tzinfo else first).date().replace(day=1)
+    while month < cutoff:
+        path = archive_path(directory, f"sales_{month:%Y_%m}")
+        with discard_on_error(path), engine.begin() as connection:
+            count = archive_month(connection, table, month, path)
+        if count:
+            archived.append((path, count))
+        month = add_months(month, 1)
+    return archived
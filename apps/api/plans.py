@@ -0,0 +1,64 @@
+import os
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
+
+# Regras de cálculo sem FastAPI nem banco: usadas pela API (main.py) e pelo scoring.py.
+DEVICE_WEIGHTS = {
+    "cellphones": 0.8,
+    "computers": 0.5,
+    "smart_tvs": 0.4,
+    "tv_boxes": 0.6,
+    "others": 0.1,
+}
+
+# Peso mínimo de cada plano e se esse limite é inclusivo (>=) ou exclusivo (>).
+PLANS = [
+    ("Prata", "100 Mb", 0.0, True),
+    ("Bronze", "300 Mb", 1.0, True),
+    ("Ouro", "500 Mb", 2.0, False),
+    ("Diamante", "800 Mb", 3.0, True),
+]
+
+GAMER_MULTIPLIER = 2
+WEIGHT_DECIMALS = 2
+
+DEVICE_KEYS = tuple(DEVICE_WEIGHTS)
+PLAN_SPEEDS = {name: speed for name, speed, _, _ in PLANS}
+# Limites como (peso, 0 inclusivo | 1 exclusivo): bisect_right((peso, 0)) devolve o índice do plano.
+PLAN_THRESHOLDS = [(lower, 0 if inclusive else 1) for _, _, lower, inclusive in PLANS[1:]]
+CALC_CACHE_SIZE = int(os.getenv("CALC_CACHE_SIZE", "4096"))
+
+
+class PlanResult(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
+    device_weights: dict[str, float]
+    total_weight: float
+    plan_name: Literal["Prata", "Bronze", "Ouro", "Diamante"]
+    plan_speed: str
+
+
+def plan_index(total_weight: float) -> int:
+    return bisect_right(PLAN_THRESHOLDS, (total_weight, 0))
+
+
+@lru_cache(maxsize=CALC_CACHE_SIZE)
+def calculate_counts(counts: tuple[int, ...], gamer: bool) -> PlanResult:
+    weighted = {
+        key: round(count * weight, WEIGHT_DECIMALS)
+        for key, count, weight in zip(DEVICE_KEYS, counts, DEVICE_WEIGHTS.values())
+    }
+    total_weight = round(sum(weighted.values()), WEIGHT_DECIMALS)
+    if gamer:
+        total_weight = round(total_weight * GAMER_MULTIPLIER, WEIGHT_DECIMALS)
+
+    plan_name, plan_speed, _, _ = PLANS[plan_index(total_weight)]
+    return PlanResult(
+        device_weights=weighted,
+        total_weight=total_weight,
+        plan_name=plan_name,
+        plan_speed=plan_speed,
+    )
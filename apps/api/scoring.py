@@ -0,0 +1,119 @@
+import argparse
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from plans import DEVICE_KEYS, DEVICE_WEIGHTS, GAMER_MULTIPLIER, PLANS, PLAN_THRESHOLDS
+
+WEIGHT_VECTOR = np.array([DEVICE_WEIGHTS[key] for key in DEVICE_KEYS], dtype=np.float64)
+PLAN_NAMES = [name for name, _, _, _ in PLANS]
+PLAN_SPEEDS = [speed for _, speed, _, _ in PLANS]
+RESULT_COLUMNS = [f"{key}_weight" for key in DEVICE_KEYS] + ["total_weight", "plan_name", "plan_speed"]
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+
+def round2(values: np.ndarray) -> np.ndarray:
+    # np.round só diverge do round() do Python perto de empates (x.xx5); esses valores usam o round nativo.
+    scaled = values * 100
+    rounded = np.round(values, 2)
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded[near_tie] = [round(float(value), 2) for value in values[near_tie]]
+    return rounded
+
+
+def score_devices(counts: np.ndarray, gamer: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Versão vetorizada de calculate_plan para uma matriz N×5 de contagens."""
+    weights = round2(np.asarray(counts, dtype=np.float64) * WEIGHT_VECTOR)
+
+    # Soma na mesma ordem do sum() escalar para manter o arredondamento idêntico.
+    totals = weights[:, 0].copy()
+    for column in range(1, weights.shape[1]):
+        totals += weights[:, column]
+    totals = round2(totals)
+    totals = np.where(np.asarray(gamer, dtype=bool), round2(totals * GAMER_MULTIPLIER), totals)
+
+    plans = np.zeros(len(totals), dtype=np.int8)
+    for lower, exclusive in PLAN_THRESHOLDS:
+        plans += (totals > lower) if exclusive else (totals >= lower)
+    return weights, totals, plans
+
+
+def _iter_batches(path: Path, chunk_size: int) -> Iterator["pa.RecordBatch"]:
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    if path.suffix == ".parquet":
+        yield from pq.ParquetFile(path).iter_batches(batch_size=chunk_size)
+        return
+
+    # block_size aproxima chunk_size linhas de ~20 bytes cada.
+    read_options = pacsv.ReadOptions(block_size=max(chunk_size * 20, 1 << 20))
+    yield from pacsv.open_csv(path, read_options=read_options)
+
+
+def score_batch(batch: "pa.RecordBatch") -> "pa.Table":
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = pa.Table.from_batches([batch])
+    counts = np.column_stack(
+        [
+            pc.fill_null(table[key], 0).to_numpy() if key in table.column_names else np.zeros(len(table), dtype=np.int64)
+            for key in DEVICE_KEYS
+        ]
+    )
+    if "gamer" in table.column_names:
+        gamer = pc.fill_null(table["gamer"].cast(pa.bool_()), False).to_numpy(zero_copy_only=False)
+    else:
+        gamer = np.zeros(len(table), dtype=bool)
+
+    weights, totals, plans = score_devices(counts, gamer)
+    table = table.drop_columns([column for column in RESULT_COLUMNS if column in table.column_names])
+    for index, key in enumerate(DEVICE_KEYS):
+        table = table.append_column(f"{key}_weight", pa.array(weights[:, index]))
+    table = table.append_column("total_weight", pa.array(totals))
+    table = table.append_column("plan_name", pa.DictionaryArray.from_arrays(pa.array(plans), pa.array(PLAN_NAMES)))
+    table = table.append_column("plan_speed", pa.DictionaryArray.from_arrays(pa.array(plans), pa.array(PLAN_SPEEDS)))
+    return table
+
+
+def score_file(source: Path, destination: Path, chunk_size: int = 100_000) -> int:
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    writer = None
+    rows = 0
+    try:
+        for batch in _iter_batches(source, chunk_size):
+            table = score_batch(batch)
+            if writer is None:
+                if destination.suffix == ".parquet":
+                    writer = pq.ParquetWriter(destination, table.schema)
+                else:
+                    writer = pacsv.CSVWriter(destination, table.schema)
+            writer.write_table(table)
+            rows += len(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recalcula pesos e planos de um arquivo CSV/Parquet de dispositivos.")
+    parser.add_argument("source", type=Path, help="arquivo .csv ou .parquet com as colunas de dispositivos e gamer")
+    parser.add_argument("destination", type=Path, help="arquivo de saída (.csv ou .parquet)")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="linhas processadas por lote")
+    args = parser.parse_args()
+
+    rows = score_file(args.source, args.destination, args.chunk_size)
+    print(f"{rows} linhas processadas -> {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, select, text
+
+DATA_DIR = Path(tempfile.mkdtemp(prefix="micks-api-tests-"))
+
+# main lê a configuração ao importar: o ambiente dos testes precisa vir antes de qualquer import dele.
+os.environ.update(
+    {
+        "DATABASE_URL": f"sqlite:///{DATA_DIR / 'sales.db'}",
+        # Réplica só entra na rota depois de uma verificação (test_read_replica.py); antes tudo lê do primário.
+        "DATABASE_READ_URL": f"sqlite:///{DATA_DIR / 'replica.db'}",
+        "SALES_CACHE_BACKEND": "none",
+        "AUTH_SECRET_KEY": "chave-dos-testes",
+        "MIGRATE_ON_STARTUP": "0",
+        "OUTBOX_ENABLED": "0",
+        "ADMISSION_ENABLED": "0",
+    }
+)
+
+
+# PostgreSQL opcional: um banco descartável (os testes que o usam recriam o schema public).
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+
+@pytest.fixture(scope="session")
+def api():
+    import main
+
+    main.run_migrations()
+    return main
+
+
+
+@pytest.fixture
+def run(api):
+    """Roda um cenário assíncrono com um cliente da API autenticado como admin."""
+
+    def run_scenario(scenario):
+        async def main():
+            transport = httpx.ASGITransport(app=api.app)
+            client = httpx.AsyncClient(transport=transport, base_url="http://api", auth=("admin", "desafio"))
+            try:
+                async with client:
+                    return await scenario(client)
+            finally:
+                # As conexões do aiosqlite ficam presas ao loop que as abriu.
+                await api.async_engine.dispose()
+
+        return asyncio.run(main())
+
+    return run_scenario
+
+
+@pytest.fixture
+def rollup(api):
+    """Confere sales_daily_stats contra o que o rebuild_sales_stats gravaria, sem alterar a tabela."""
+    stat = api.SalesDailyStat
+    columns = select(stat.day, stat.plan_name, stat.sales_count, stat.gamer_count, stat.weight_centis)
+
+    def rows(connection) -> dict:
+        # Exclusões deixam linhas zeradas no rollup incremental; o rebuild simplesmente não as cria.
+        return {(day, plan): tuple(values) for day, plan, *values in connection.execute(columns) if any(values)}
+
+    def check() -> dict:
+        with api.engine.connect() as connection:
+            incremental = rows(connection)
+            api.rebuild_sales_stats(connection, keep_archived=False)
+            rebuilt = rows(connection)
+            connection.rollback()
+        assert incremental == rebuilt
+        return incremental
+
+    return check
+
+
+@pytest.fixture
+def empty_postgres():
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL não definida")
+    engine = create_engine(POSTGRES_URL)
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+    yield engine
+    engine.dispose()
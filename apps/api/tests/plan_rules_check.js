@@ -0,0 +1,20 @@
+// Confere o plan_rules.js do web contra uma tabela de casos gerada pela API.
+// Uso: node plan_rules_check.js rules.json [casos.json]  (padrão: plan_cases.json ao lado)
+const fs = require("fs");
+const path = require("path");
+const { calculatePlan } = require("../../web/static/plan_rules.js");
+
+const readJson = (file) => JSON.parse(fs.readFileSync(file, "utf8"));
+const rules = readJson(process.argv[2]);
+const cases = readJson(process.argv[3] || path.join(__dirname, "plan_cases.json"));
+
+let failures = 0;
+for (const { devices, expected } of cases) {
+  const result = JSON.stringify(calculatePlan(rules, devices));
+  if (result !== JSON.stringify(expected)) {
+    failures += 1;
+    if (failures <= 10) console.error(`${JSON.stringify(devices)}: ${result} != ${JSON.stringify(expected)}`);
+  }
+}
+console.log(`${cases.length - failures}/${cases.length} casos iguais`);
+process.exit(failures ? 1 : 0);
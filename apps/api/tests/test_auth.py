@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+
+from micks_common.auth_tokens import TokenSigner
+
+
+def get_sales(api, **auth) -> httpx.Response:
+    async def scenario():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api", **auth) as client:
+            return await client.get("/api/sales", params={"limit": 1})
+
+    try:
+        return asyncio.run(scenario())
+    finally:
+        asyncio.run(api.async_engine.dispose())
+
+
+def bearer(token: str) -> dict:
+    return {"headers": {"Authorization": f"Bearer {token}"}}
+
+
+def test_bearer_token_from_auth_endpoint_is_accepted(api):
+    async def issue():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://api") as client:
+            return await client.post("/api/auth/token", auth=("admin", "desafio"))
+
+    response = asyncio.run(issue())
+    assert response.status_code == 200
+    assert get_sales(api, **bearer(response.json()["access_token"])).status_code == 200
+
+
+def test_basic_auth_is_accepted_without_bearer(api):
+    assert get_sales(api, auth=("admin", "desafio")).status_code == 200
+
+
+@pytest.mark.parametrize(
+    "auth",
+    [
+        {},
+        {"auth": ("admin", "errada")},
+        {"auth": ("outro", "desafio")},
+        bearer("nao.assinado"),
+        bearer(TokenSigner(["outra-chave"], 60).issue("admin")),
+    ],
+    ids=["sem-credenciais", "senha-errada", "usuario-errado", "token-invalido", "chave-desconhecida"],
+)
+def test_invalid_credentials_get_401(api, auth):
+    response = get_sales(api, **auth)
+
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Basic"
+
+
+def test_expired_bearer_token_gets_401(api):
+    expired = TokenSigner(api.AUTH_SECRET_KEYS, ttl=-1).issue("admin")
+
+    assert get_sales(api, **bearer(expired)).status_code == 401
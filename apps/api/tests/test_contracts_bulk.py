@@ -0,0 +1,170 @@
+import json
+import uuid
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import func, select
+
+HEADER = "name,email,phone,cellphones,computers,smart_tvs,tv_boxes,others,gamer"
+
+
+def post_bulk(client, body, content_type: str):
+    return client.post("/api/contracts/bulk", content=body, headers={"Content-Type": content_type})
+
+
+def ndjson_line(name: str, phone: str = "11999990000", **devices) -> str:
+    return json.dumps({"name": name, "email": "cliente@x.com", "phone": phone, "devices": devices})
+
+
+def stored(api, prefix: str) -> tuple[dict[int, str], dict[int, int]]:
+    """Vendas gravadas com o prefixo no nome (id -> plano) e quantos e-mails cada uma tem no outbox."""
+    with api.engine.connect() as connection:
+        query = select(api.Sale.id, api.Sale.plan_name).where(api.Sale.name.startswith(prefix))
+        sales = dict(connection.execute(query).all())
+        emails = dict(
+            connection.execute(
+                select(api.EmailOutbox.sale_id, func.count())
+                .where(api.EmailOutbox.sale_id.in_(list(sales)))
+                .group_by(api.EmailOutbox.sale_id)
+            ).all()
+        )
+    return sales, emails
+
+
+@pytest.fixture
+def prefix() -> str:
+    return f"LOTE {uuid.uuid4().hex[:8].upper()}"
+
+
+def test_parse_csv_contract_fills_missing_devices(api):
+    header = HEADER.split(",")
+
+    payload = api.parse_csv_contract(header, 'Ana Souza,ana@x.com,11999990000,2,,1,,,true')
+    devices = payload.devices.model_dump()
+    assert devices == {"cellphones": 2, "computers": 0, "smart_tvs": 1, "tv_boxes": 0, "others": 0, "gamer": True}
+    # Vírgula dentro de aspas não separa colunas.
+    assert api.parse_csv_contract(header, '"Souza, Ana",ana@x.com,11999990000,,,,,,').name == "Souza, Ana"
+
+    with pytest.raises(ValueError, match="esperadas 9 colunas, recebidas 3"):
+        api.parse_csv_contract(header, "Ana,ana@x.com,11999990000")
+    with pytest.raises(ValidationError):
+        api.parse_csv_contract(header, "Ana,sem-arroba,11999990000,1,,,,,")
+
+
+def test_csv_reports_errors_per_line_and_writes_valid_rows(api, run, rollup, prefix):
+    body = "\r\n".join(
+        [
+            HEADER,
+            f"{prefix} Prata,ana@x.com,11999990000,1,,,,,",
+            f"{prefix} Email,sem-arroba,11999990000,1,,,,,",
+            "",
+            f"{prefix} Colunas,ana@x.com",
+            f"{prefix} Diamante,bia@x.com,11999990000,,7,,1,,true",
+            f"{prefix} Aparelhos,ana@x.com,11999990000,-1,,,,,",
+        ]
+    )
+
+    async def scenario(client):
+        # O BOM que o Excel grava no início não entra no nome da primeira coluna.
+        response = await post_bulk(client, "\ufeff" + body, "text/csv; charset=utf-8")
+        assert response.status_code == 200
+        return response.json()
+
+    result = run(scenario)
+    assert (result["created"], result["failed"]) == (2, 3)
+    rows = {row["line"]: row for row in result["results"]}
+    assert sorted(rows) == [2, 3, 5, 6, 7]
+    assert (rows[2]["ok"], rows[2]["plan_name"]) == (True, "Prata")
+    assert (rows[6]["ok"], rows[6]["plan_name"]) == (True, "Diamante")
+    assert rows[3]["errors"][0].startswith("email:")
+    assert rows[5]["errors"] == ["esperadas 9 colunas, recebidas 2"]
+    assert rows[7]["errors"][0].startswith("devices.cellphones:")
+
+    sales, emails = stored(api, prefix)
+    assert sales == {rows[2]["id"]: "Prata", rows[6]["id"]: "Diamante"}
+    # Confirmação para o cliente e aviso para operações, na mesma transação da venda.
+    assert emails == {sale_id: 2 for sale_id in sales}
+    rollup()
+
+
+def test_ndjson_reports_bad_lines_and_increments_rollup(api, run, rollup, prefix):
+    body = "\n".join(
+        [
+            ndjson_line(f"{prefix} Ouro", cellphones=1, smart_tvs=1, gamer=True),
+            "{nem json",
+            ndjson_line(f"{prefix} Telefone curto", phone="1"),
+            "",
+            ndjson_line(f"{prefix} Bronze", cellphones=1, smart_tvs=1),
+        ]
+    )
+
+    async def scenario(client):
+        before = (await client.get("/api/sales/stats")).json()
+        response = await post_bulk(client, body, "application/x-ndjson")
+        after = (await client.get("/api/sales/stats")).json()
+        return before, response.json(), after
+
+    before, result, after = run(scenario)
+    assert (result["created"], result["failed"]) == (2, 2)
+    rows = [(row["line"], row["ok"], row["plan_name"]) for row in result["results"]]
+    assert rows == [(1, True, "Ouro"), (2, False, None), (3, False, None), (5, True, "Bronze")]
+    assert result["results"][2]["errors"][0].startswith("phone:")
+
+    sales, emails = stored(api, prefix)
+    assert sorted(sales.values()) == ["Bronze", "Ouro"]
+    assert emails == {sale_id: 2 for sale_id in sales}
+    assert after["total_sales"] == before["total_sales"] + 2
+    added = {plan["plan_name"]: plan["sales"] for plan in after["by_plan"]}
+    for plan in before["by_plan"]:
+        added[plan["plan_name"]] -= plan["sales"]
+    assert added == {"Prata": 0, "Bronze": 1, "Ouro": 1, "Diamante": 0}
+    rollup()
+
+
+def test_failed_chunk_is_rolled_back_and_other_chunks_are_kept(api, run, rollup, prefix, monkeypatch):
+    monkeypatch.setattr(api, "BULK_CHUNK_SIZE", 2)
+    contract_emails = api.contract_emails
+
+    def failing_emails(sale_id, payload, result, now):
+        # Falha depois de as vendas do lote já terem sido inseridas na transação.
+        if "FALHA" in payload.name.upper():
+            raise RuntimeError("outbox indisponível")
+        return contract_emails(sale_id, payload, result, now)
+
+    monkeypatch.setattr(api, "contract_emails", failing_emails)
+    names = [f"{prefix} Um", f"{prefix} Dois", f"{prefix} Tres", f"{prefix} Falha", f"{prefix} Cinco"]
+    body = "\n".join(ndjson_line(name, cellphones=1) for name in names)
+
+    async def scenario(client):
+        return (await post_bulk(client, body, "application/x-ndjson")).json()
+
+    result = run(scenario)
+    assert (result["created"], result["failed"]) == (3, 2)
+    assert [row["ok"] for row in result["results"]] == [True, True, False, False, True]
+    assert result["results"][2]["errors"] == ["erro ao gravar no banco: RuntimeError"]
+
+    sales, emails = stored(api, prefix)
+    assert sorted(sales) == sorted(row["id"] for row in result["results"] if row["ok"])
+    assert emails == {sale_id: 2 for sale_id in sales}
+    rollup()
+
+
+def test_invalid_utf8_stops_with_an_error_row(api, run, prefix):
+    async def body():
+        # Em pedaços, como chega um upload grande: as linhas do primeiro já foram lidas.
+        yield (ndjson_line(f"{prefix} Antes", cellphones=1) + "\n").encode()
+        yield b'{"name": "\xff\xfe"}\n'
+
+    async def scenario(client):
+        return (await post_bulk(client, body(), "application/x-ndjson")).json()
+
+    result = run(scenario)
+    assert (result["created"], result["failed"]) == (1, 1)
+    assert (result["results"][1]["line"], result["results"][1]["errors"]) == (2, ["arquivo não está em UTF-8"])
+
+
+def test_unknown_content_type_is_rejected(api, run):
+    async def scenario(client):
+        return await post_bulk(client, "<contratos/>", "application/xml")
+
+    assert run(scenario).status_code == 415
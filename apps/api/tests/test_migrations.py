@@ -0,0 +1,147 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+API_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_concurrent_postgres_migrations_run_once(empty_postgres):
+    # Como os workers de `docker run -e WEB_CONCURRENCY=4` com MIGRATE_ON_STARTUP=1: processos
+    # separados (o Alembic guarda o contexto em globais do módulo) que migram ao mesmo tempo.
+    start_at = time.time() + 3
+    migrate = (
+        "import time; from sqlalchemy import create_engine; import main; "
+        f"time.sleep(max(0, {start_at} - time.time())); main.run_migrations(create_engine({POSTGRES_URL!r}))"
+    )
+    workers = [
+        subprocess.Popen([sys.executable, "-c", migrate], cwd=API_DIR, stderr=subprocess.PIPE, text=True)
+        for _ in range(4)
+    ]
+    errors = []
+    for worker in workers:
+        _, stderr = worker.communicate(timeout=120)
+        if worker.returncode:
+            errors.append(stderr)
+
+    assert errors == []
+    with empty_postgres.connect() as connection:
+        assert connection.execute(text("SELECT version_num FROM alembic_version")).scalars().all() == [head_revision()]
+
+
+def head_revision() -> str:
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config()
+    config.set_main_option("script_location", str(API_DIR / "migrations"))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def migrate(engine, action: str, revision: str) -> None:
+    # Mesmo caminho do run_migrations (conexão repassada ao env.py), mas para qualquer revisão.
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(API_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(API_DIR / "migrations"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        getattr(command, action)(config, revision)
+
+
+INSERT_SALE = text(
+    "INSERT INTO sales (name, email, phone, cellphones, computers, gamer, total_weight, plan_name, created_at) "
+    "VALUES (:name, 'cliente@x.com', '11999990000', :cellphones, :computers, :gamer, :total_weight, :plan_name, "
+    ":created_at)"
+)
+COMPACT_COLUMNS = "name, cellphones, computers, smart_tvs, tv_boxes, others, gamer, total_weight, plan_name"
+
+
+def insert_sales(connection, *created_at) -> None:
+    for index, moment in enumerate(created_at):
+        connection.execute(
+            INSERT_SALE,
+            {
+                "name": f"CLIENTE {index}",
+                "cellphones": 2,
+                "computers": index,
+                "gamer": index % 2 == 1,
+                "total_weight": round((1.6 + 0.5 * index) * (2 if index % 2 else 1), 2),
+                "plan_name": "Diamante",
+                "created_at": moment,
+            },
+        )
+
+
+def compact_rows(engine) -> list:
+    with engine.connect() as connection:
+        return connection.execute(text(f"SELECT id, {COMPACT_COLUMNS} FROM sales ORDER BY id")).all()
+
+
+def test_sqlite_migrations_round_trip(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sales.db'}")
+    migrate(engine, "upgrade", "head")
+    with engine.begin() as connection:
+        insert_sales(connection, datetime(2026, 1, 15, 12), datetime(2026, 2, 1, 9))
+    before = compact_rows(engine)
+
+    # Volta ao formato anterior à 0004: contagens e pesos em JSON, velocidade gravada.
+    migrate(engine, "downgrade", "0003")
+    with engine.connect() as connection:
+        old = connection.execute(text("SELECT devices, device_weights, plan_speed FROM sales ORDER BY id")).all()
+    assert [(json.loads(devices), json.loads(weights), speed) for devices, weights, speed in old] == [
+        (
+            {"cellphones": 2, "computers": index, "smart_tvs": 0, "tv_boxes": 0, "others": 0},
+            {"cellphones": 1.6, "computers": 0.5 * index, "smart_tvs": 0, "tv_boxes": 0, "others": 0},
+            "800 Mb",
+        )
+        for index in range(2)
+    ]
+
+    migrate(engine, "upgrade", "head")
+    assert compact_rows(engine) == before
+
+    migrate(engine, "downgrade", "base")
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars().all() == [
+            "alembic_version"
+        ]
+    migrate(engine, "upgrade", "head")
+    engine.dispose()
+
+
+def test_postgres_partitioning_round_trip(empty_postgres):
+    migrate(empty_postgres, "upgrade", "0004")
+    today = datetime.now(timezone.utc)
+    months = [today.replace(day=1) - timedelta(days=day) for day in (70, 35, 0)]
+    with empty_postgres.begin() as connection:
+        insert_sales(connection, *months)
+    before = compact_rows(empty_postgres)
+
+    migrate(empty_postgres, "upgrade", "head")
+    assert compact_rows(empty_postgres) == before
+    with empty_postgres.connect() as connection:
+        partitions = connection.execute(
+            text("SELECT id, tableoid::regclass::text FROM sales ORDER BY id")
+        ).all()
+        # Cada venda na partição do próprio mês (UTC), desde a mais antiga até três meses à frente.
+        assert [name for _, name in partitions] == [f"sales_{moment:%Y_%m}" for moment in months]
+        assert connection.scalar(text("SELECT count(*) FROM pg_inherits WHERE inhparent = 'sales'::regclass")) >= 7
+
+    migrate(empty_postgres, "downgrade", "0004")
+    assert compact_rows(empty_postgres) == before
+    with empty_postgres.begin() as connection:
+        assert connection.scalar(text("SELECT relkind FROM pg_class WHERE oid = 'sales'::regclass")) == "r"
+        # A sequence dos ids sobrevive às duas trocas de tabela.
+        insert_sales(connection, today)
+        assert connection.scalar(text("SELECT max(id) FROM sales")) == before[-1].id + 1
+
+    migrate(empty_postgres, "upgrade", "head")
+    assert len(compact_rows(empty_postgres)) == len(before) + 1
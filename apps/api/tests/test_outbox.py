@@ -0,0 +1,139 @@
+import smtplib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, select, update
+
+
+class FakeSMTP:
+    """Servidor SMTP de mentira: guarda os envios e falha para os destinatários em `refuse`."""
+
+    connections = 0
+
+    def __init__(self, refuse: set[str] = frozenset(), quit_error: Exception | None = None) -> None:
+        FakeSMTP.connections += 1
+        self.refuse = refuse
+        self.quit_error = quit_error
+        self.sent: list[str] = []
+        self.closed = False
+
+    def sendmail(self, sender: str, to: list[str], message: str) -> None:
+        if to[0] in self.refuse:
+            raise smtplib.SMTPRecipientsRefused({to[0]: (550, b"recusado")})
+        self.sent.append(to[0])
+
+    def quit(self):
+        if self.quit_error:
+            raise self.quit_error
+        self.closed = True
+        return 221, b"tchau"
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def outbox(api, monkeypatch):
+    FakeSMTP.connections = 0
+    with api.SessionLocal() as db:
+        db.execute(delete(api.EmailOutbox))
+        db.commit()
+
+    def enqueue(*emails: str) -> None:
+        now = datetime.now(timezone.utc)
+        with api.SessionLocal() as db:
+            rows = [api.outbox_values(None, email, "Assunto", "Corpo", now) for email in emails]
+            db.execute(api.EmailOutbox.__table__.insert(), rows)
+            db.commit()
+
+    return enqueue
+
+
+def deliver(api, monkeypatch, smtp: FakeSMTP | None = None) -> FakeSMTP:
+    smtp = smtp or FakeSMTP()
+    monkeypatch.setattr(api, "smtp_connection", lambda: smtp)
+    with api.SessionLocal() as db:
+        api.deliver_outbox_batch(db)
+    return smtp
+
+
+def messages(api) -> dict[str, object]:
+    with api.SessionLocal() as db:
+        return {message.to_email: message for message in db.scalars(select(api.EmailOutbox))}
+
+
+def make_due(api) -> None:
+    with api.SessionLocal() as db:
+        db.execute(update(api.EmailOutbox).values(next_attempt_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+        db.commit()
+
+
+def test_batch_uses_one_smtp_connection(api, outbox, monkeypatch):
+    outbox("a@x.com", "b@x.com", "c@x.com")
+
+    smtp = deliver(api, monkeypatch)
+
+    assert FakeSMTP.connections == 1
+    assert smtp.sent == ["a@x.com", "b@x.com", "c@x.com"] and smtp.closed
+    assert {message.status for message in messages(api).values()} == {"sent"}
+
+
+def test_failed_send_is_retried_with_backoff(api, outbox, monkeypatch):
+    monkeypatch.setattr(api, "OUTBOX_RETRY_BASE", 30)
+    outbox("ok@x.com", "ruim@x.com")
+    smtp = FakeSMTP(refuse={"ruim@x.com"})
+
+    for attempt, backoff in ((1, 30), (2, 60)):
+        started = datetime.now(timezone.utc)
+        deliver(api, monkeypatch, smtp)
+        failed = messages(api)["ruim@x.com"]
+        assert (failed.status, failed.attempts) == ("pending", attempt)
+        assert "SMTPRecipientsRefused" in failed.last_error
+        wait = failed.next_attempt_at.replace(tzinfo=timezone.utc) - started
+        assert timedelta(seconds=backoff) <= wait < timedelta(seconds=backoff + 5)
+        # Antes do prazo a mensagem não volta ao lote.
+        deliver(api, monkeypatch, smtp)
+        assert messages(api)["ruim@x.com"].attempts == attempt
+        make_due(api)
+
+    assert smtp.sent == ["ok@x.com"]
+    assert messages(api)["ok@x.com"].attempts == 1
+
+
+def test_message_fails_after_max_attempts(api, outbox, monkeypatch):
+    monkeypatch.setattr(api, "OUTBOX_MAX_ATTEMPTS", 2)
+    outbox("ruim@x.com")
+    smtp = FakeSMTP(refuse={"ruim@x.com"})
+
+    deliver(api, monkeypatch, smtp)
+    make_due(api)
+    deliver(api, monkeypatch, smtp)
+    make_due(api)
+    deliver(api, monkeypatch, smtp)
+
+    failed = messages(api)["ruim@x.com"]
+    assert (failed.status, failed.attempts) == ("failed", 2)
+
+
+def test_unreachable_smtp_schedules_whole_batch(api, outbox, monkeypatch):
+    outbox("a@x.com", "b@x.com")
+
+    def refused():
+        raise ConnectionRefusedError("sem servidor")
+
+    monkeypatch.setattr(api, "smtp_connection", refused)
+    with api.SessionLocal() as db:
+        assert api.deliver_outbox_batch(db) == 2
+
+    assert {(message.status, message.attempts) for message in messages(api).values()} == {("pending", 1)}
+
+
+def test_quit_error_keeps_sent_status(api, outbox, monkeypatch):
+    # QUIT com resposta diferente de 221 depois do envio: o lote não pode voltar a pending e ser reenviado.
+    outbox("a@x.com", "b@x.com")
+    smtp = deliver(api, monkeypatch, FakeSMTP(quit_error=smtplib.SMTPServerDisconnected("caiu no QUIT")))
+
+    assert smtp.closed
+    assert {message.status for message in messages(api).values()} == {"sent"}
+    make_due(api)
+    assert deliver(api, monkeypatch).sent == []
@@ -0,0 +1,172 @@
+import csv
+import gzip
+from datetime import date, datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, select, text
+
+import partitions
+
+
+@pytest.fixture
+def sqlite_sales(api, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sales.db'}")
+    api.run_migrations(engine)
+    yield engine
+    engine.dispose()
+
+
+def add_sales(api, engine, *created_at) -> None:
+    rows = [
+        {
+            "name": f"CLIENTE {moment:%Y-%m-%d %H:%M}",
+            "email": "cliente@x.com",
+            "phone": "11999990000",
+            "cellphones": 1,
+            "gamer": False,
+            "total_weight": 0.8,
+            "plan_name": "Prata",
+            "created_at": moment,
+        }
+        for moment in created_at
+    ]
+    with engine.begin() as connection:
+        connection.execute(api.Sale.__table__.insert(), rows)
+
+
+def sale_months(api, engine) -> list[str]:
+    with engine.connect() as connection:
+        created_at = connection.scalars(select(api.Sale.created_at).order_by(api.Sale.created_at)).all()
+    return [f"{moment:%Y-%m}" for moment in created_at]
+
+
+def read_archive(path) -> list[dict[str, str]]:
+    with gzip.open(path, "rt", newline="") as archive:
+        return list(csv.DictReader(archive))
+
+
+def test_add_months_and_bounds_cross_the_year():
+    assert partitions.add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert partitions.add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partitions.month_bounds(date(2026, 12, 1)) == (
+        datetime(2026, 12, 1, tzinfo=timezone.utc),
+        datetime(2027, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+def test_ensure_partitions_does_nothing_on_sqlite(api, sqlite_sales):
+    assert partitions.ensure_partitions(sqlite_sales, 3) == []
+    with sqlite_sales.connect() as connection:
+        assert not partitions.is_partitioned(connection)
+        tables = connection.execute(text("SELECT name FROM sqlite_master WHERE name LIKE 'sales_2%'")).all()
+    assert tables == []
+
+
+def test_archive_sales_on_sqlite_moves_old_months_to_csv(api, sqlite_sales, tmp_path):
+    add_sales(
+        api,
+        sqlite_sales,
+        datetime(2026, 1, 15, 12),
+        datetime(2026, 1, 31, 23, 59),
+        datetime(2026, 2, 28, 23, 59, 59),
+        datetime(2026, 3, 1),
+        datetime(2026, 4, 9),
+    )
+    directory = tmp_path / "archive"
+    table = api.Sale.__table__
+
+    archived = partitions.archive_sales(sqlite_sales, table, 2, directory, today=date(2026, 4, 10))
+
+    assert [(path.name, count) for path, count in archived] == [
+        ("sales_2026_01.csv.gz", 2),
+        ("sales_2026_02.csv.gz", 1),
+    ]
+    january = read_archive(directory / "sales_2026_01.csv.gz")
+    assert list(january[0]) == list(table.c.keys())
+    assert [row["name"] for row in january] == ["CLIENTE 2026-01-15 12:00", "CLIENTE 2026-01-31 23:59"]
+    assert sale_months(api, sqlite_sales) == ["2026-03", "2026-04"]
+    assert not list(directory.glob("*.part"))
+
+    # Um segundo lote do mesmo mês não sobrescreve o arquivo anterior.
+    add_sales(api, sqlite_sales, datetime(2026, 1, 20))
+    archived = partitions.archive_sales(sqlite_sales, table, 2, directory, today=date(2026, 4, 10))
+    assert [(path.name, count) for path, count in archived] == [("sales_2026_01-2.csv.gz", 1)]
+    assert partitions.archive_sales(sqlite_sales, table, 2, directory, today=date(2026, 4, 10)) == []
+
+
+def test_failed_archive_keeps_rows_and_removes_file(api, sqlite_sales, tmp_path, monkeypatch):
+    add_sales(api, sqlite_sales, datetime(2026, 1, 15), datetime(2026, 4, 1))
+
+    def failing_delete(table):
+        raise RuntimeError("banco indisponível")
+
+    monkeypatch.setattr(partitions, "delete", failing_delete)
+    with pytest.raises(RuntimeError):
+        partitions.archive_sales(sqlite_sales, api.Sale.__table__, 1, tmp_path, today=date(2026, 4, 10))
+
+    assert sale_months(api, sqlite_sales) == ["2026-01", "2026-04"]
+    assert list(tmp_path.glob("sales_*")) == []
+
+
+def test_archive_sales_requires_a_month(api, sqlite_sales, tmp_path):
+    with pytest.raises(ValueError):
+        partitions.archive_sales(sqlite_sales, api.Sale.__table__, 0, tmp_path)
+
+
+def partition_of_each_sale(engine) -> list[tuple[str, str]]:
+    query = text(
+        "SELECT to_char(created_at AT TIME ZONE 'UTC', 'YYYY-MM'), tableoid::regclass::text FROM sales ORDER BY 1"
+    )
+    with engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(query)]
+
+
+@pytest.fixture
+def partitioned_sales(api, empty_postgres):
+    api.run_migrations(empty_postgres)
+    return empty_postgres
+
+
+def test_ensure_partitions_attaches_months_and_moves_default_rows(api, partitioned_sales):
+    today = partitions.current_month()
+    old = partitions.add_months(today, -14)
+    add_sales(api, partitioned_sales, datetime(old.year, old.month, 10, tzinfo=timezone.utc))
+    # Sem partição para o mês, a venda cai na sales_default.
+    assert partition_of_each_sale(partitioned_sales) == [(f"{old:%Y-%m}", "sales_default")]
+
+    created = partitions.ensure_partitions(partitioned_sales, 1, today=old)
+
+    assert created == [f"sales_{old:%Y_%m}", f"sales_{partitions.add_months(old, 1):%Y_%m}"]
+    assert partition_of_each_sale(partitioned_sales) == [(f"{old:%Y-%m}", f"sales_{old:%Y_%m}")]
+    # Chamado de novo (o `migrate` roda a cada deploy), não cria nada.
+    assert partitions.ensure_partitions(partitioned_sales, 1, today=old) == []
+
+
+def test_archive_sales_detaches_copies_and_drops_old_partitions(api, partitioned_sales, tmp_path):
+    today = partitions.current_month()
+    old = partitions.add_months(today, -14)
+    older = partitions.add_months(today, -20)
+    partitions.ensure_partitions(partitioned_sales, 0, today=old)
+    add_sales(
+        api,
+        partitioned_sales,
+        datetime(older.year, older.month, 3, tzinfo=timezone.utc),
+        datetime(old.year, old.month, 10, tzinfo=timezone.utc),
+        datetime(old.year, old.month, 11, tzinfo=timezone.utc),
+        datetime(today.year, today.month, 1, tzinfo=timezone.utc),
+    )
+
+    archived = partitions.archive_sales(partitioned_sales, api.Sale.__table__, 1, tmp_path, today=today)
+
+    # A partição antiga sai com COPY; a venda que estava na sales_default, com SELECT/DELETE.
+    assert [(path.name, count) for path, count in archived] == [
+        (f"sales_{old:%Y_%m}.csv.gz", 2),
+        (f"sales_{older:%Y_%m}.csv.gz", 1),
+    ]
+    assert len(read_archive(tmp_path / f"sales_{old:%Y_%m}.csv.gz")) == 2
+    assert list(read_archive(tmp_path / f"sales_{old:%Y_%m}.csv.gz")[0]) == list(api.Sale.__table__.c.keys())
+    with partitioned_sales.connect() as connection:
+        remaining = partitions.list_partitions(connection)
+        assert connection.scalar(text(f"SELECT to_regclass('sales_{old:%Y_%m}')")) is None
+    assert min(remaining) == today
+    assert partition_of_each_sale(partitioned_sales) == [(f"{today:%Y-%m}", f"sales_{today:%Y_%m}")]
@@ -0,0 +1,87 @@
+import asyncio
+import shutil
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy.engine import make_url
+
+SALE = {"name": "Ana Souza", "email": "ana@x.com", "phone": "11999990000", "devices": {"cellphones": 1}}
+
+
+@pytest.fixture
+def replica(api):
+    # A réplica é uma cópia do arquivo do primário, como no README (cp sales.db replica.db).
+    replica_path = Path(make_url(api.DATABASE_READ_URL).database)
+    shutil.copy(make_url(api.DATABASE_URL).database, replica_path)
+    # Escritas de outros testes deixam o prazo do read-your-writes aberto por alguns segundos.
+    api.replica.primary_until = 0.0
+    asyncio.run(check_replica(api))
+    yield replica_path
+    api.replica.up, api.replica.primary_until = None, 0.0
+
+
+async def check_replica(api) -> None:
+    await api.replica.check()
+    await api.replica.engine.dispose()
+
+
+def run(api, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            # As conexões do aiosqlite ficam presas ao loop que as abriu.
+            await api.async_engine.dispose()
+            await api.replica.engine.dispose()
+
+    return asyncio.run(main())
+
+
+def api_client(api) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://api", auth=("admin", "desafio"))
+
+
+def sale_names(response: httpx.Response) -> set[str]:
+    assert response.status_code == 200, response.text
+    return {sale["name"] for sale in response.json()["items"]}
+
+
+def test_reads_go_to_replica_and_fall_back_when_it_fails(api, replica):
+    async def scenario():
+        async with api_client(api) as client:
+            # Gravada só no primário: a réplica copiada antes não a tem.
+            assert (await client.post("/api/contract", json=SALE)).status_code == 201
+            assert "ANA SOUZA" not in sale_names(await client.get("/api/sales"))
+            await api.replica.engine.dispose()
+
+            # Réplica fora do ar desde a última verificação: a mesma leitura é repetida no primário.
+            replica.unlink()
+            replica.mkdir()
+            try:
+                assert "ANA SOUZA" in sale_names(await client.get("/api/sales"))
+                assert api.replica.up is False
+            finally:
+                replica.rmdir()
+
+    run(api, scenario)
+
+
+def test_read_primary_header_reads_own_write_from_primary(api, replica):
+    async def scenario():
+        async with api_client(api) as client:
+            created = (await client.post("/api/contract", json=SALE)).json()["sale"]
+            shutil.copy(make_url(api.DATABASE_URL).database, replica)
+            await check_replica(api)
+
+            response = await client.put(f"/api/sales/{created['id']}", json={**SALE, "name": "Ana Editada"})
+            assert response.status_code == 200
+            until = response.headers[api.READ_PRIMARY_HEADER]
+
+            # Outro worker da API não sabe da escrita: só o cabeçalho (o cookie do web) leva a leitura ao primário.
+            api.replica.primary_until = 0.0
+            assert "ANA EDITADA" in sale_names(await client.get("/api/sales", headers={api.READ_PRIMARY_HEADER: until}))
+            names = sale_names(await client.get("/api/sales"))
+            assert "ANA EDITADA" not in names and "ANA SOUZA" in names
+
+    run(api, scenario)
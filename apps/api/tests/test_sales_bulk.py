@@ -0,0 +1,118 @@
+import pytest
+
+MISSING = 9_999_999
+
+
+def contract(name: str, gamer: bool = False, **devices) -> dict:
+    return {"name": name, "email": "cliente@x.com", "phone": "11999990000", "devices": {**devices, "gamer": gamer}}
+
+
+async def create(client, *payloads) -> list[dict]:
+    sales = []
+    for payload in payloads:
+        response = await client.post("/api/contract", json=payload)
+        assert response.status_code == 201, response.text
+        sales.append(response.json()["sale"])
+    return sales
+
+
+async def assert_stats_match_rebuild(api, client, rollup) -> None:
+    # O /api/sales/stats lido do rollup incremental é o mesmo depois de recalculá-lo do zero.
+    rollup()
+    incremental = (await client.get("/api/sales/stats")).json()
+    with api.engine.begin() as connection:
+        api.rebuild_sales_stats(connection, keep_archived=False)
+    assert (await client.get("/api/sales/stats")).json() == incremental
+
+
+def test_bulk_delete_reports_missing_ids_and_discounts_found_ones(api, run, rollup):
+    async def scenario(client):
+        sales = await create(
+            client, contract("Lote Apaga A", others=2), contract("Lote Apaga B", gamer=True, computers=3)
+        )
+        ids = [sale["id"] for sale in sales]
+        before = (await client.get("/api/sales/stats")).json()["total_sales"]
+
+        response = await client.post("/api/sales/bulk-delete", json={"ids": [MISSING, *ids, ids[0]]})
+        assert response.status_code == 200
+        assert response.json() == {"deleted": sorted(ids), "not_found": [MISSING]}
+        assert (await client.get("/api/sales/stats")).json()["total_sales"] == before - 2
+        await assert_stats_match_rebuild(api, client, rollup)
+
+        # Já apagadas: nada muda e todas voltam em not_found.
+        response = await client.post("/api/sales/bulk-delete", json={"ids": ids})
+        assert response.json() == {"deleted": [], "not_found": sorted(ids)}
+        assert (await client.get(f"/api/sales/{ids[0]}")).status_code == 404
+
+    run(scenario)
+
+
+def test_bulk_gamer_patch_moves_sales_to_another_plan(api, run, rollup):
+    async def scenario(client):
+        # 1,2 sem gamer é Bronze; com gamer dobra para 2,4 (Ouro). 0,3 fica em Prata de qualquer jeito.
+        bronze, prata = await create(
+            client, contract("Lote Gamer A", cellphones=1, smart_tvs=1), contract("Lote Gamer B", others=3)
+        )
+
+        patch = {"ids": [bronze["id"], MISSING, prata["id"]], "devices": {"gamer": True}}
+        response = await client.patch("/api/sales/bulk", json=patch)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["not_found"] == [MISSING]
+        updated = {sale["id"]: sale for sale in body["updated"]}
+        assert [sale["id"] for sale in body["updated"]] == sorted(updated)
+        assert (updated[bronze["id"]]["plan_name"], updated[bronze["id"]]["total_weight"]) == ("Ouro", 2.4)
+        assert (updated[prata["id"]]["plan_name"], updated[prata["id"]]["total_weight"]) == ("Prata", 0.6)
+        assert all(sale["gamer"] for sale in updated.values())
+        # Os campos não informados ficam como estavam.
+        assert updated[bronze["id"]]["devices"] == bronze["devices"]
+        await assert_stats_match_rebuild(api, client, rollup)
+
+        stored = (await client.get(f"/api/sales/{bronze['id']}")).json()
+        assert (stored["plan_name"], stored["total_weight"], stored["gamer"]) == ("Ouro", 2.4, True)
+
+    run(scenario)
+
+
+def test_bulk_device_patch_recalculates_each_sale(api, run, rollup):
+    async def scenario(client):
+        sales = await create(
+            client,
+            contract("Lote Aparelhos A", cellphones=1),
+            contract("Lote Aparelhos B", gamer=True, cellphones=1, others=4),
+        )
+        ids = [sale["id"] for sale in sales]
+
+        response = await client.patch("/api/sales/bulk", json={"ids": ids, "devices": {"computers": 4, "others": 0}})
+        body = response.json()
+        assert body["not_found"] == []
+        # Cada venda parte das próprias contagens: 0,8 + 2,0 = 2,8 (Ouro); com gamer, 5,6 (Diamante).
+        plans = [(sale["plan_name"], sale["total_weight"]) for sale in body["updated"]]
+        assert plans == [("Ouro", 2.8), ("Diamante", 5.6)]
+        assert [sale["devices"]["cellphones"] for sale in body["updated"]] == [1, 1]
+        await assert_stats_match_rebuild(api, client, rollup)
+
+        # Desfaz a troca de plano e confere de novo o rollup dos dois lados.
+        response = await client.patch("/api/sales/bulk", json={"ids": ids, "devices": {"computers": 0}})
+        assert [sale["plan_name"] for sale in response.json()["updated"]] == ["Prata", "Bronze"]
+        await assert_stats_match_rebuild(api, client, rollup)
+
+    run(scenario)
+
+
+def test_bulk_patch_with_only_missing_ids_changes_nothing(api, run, rollup):
+    async def scenario(client):
+        patch = {"ids": [MISSING, MISSING - 1], "devices": {"gamer": True}}
+        response = await client.patch("/api/sales/bulk", json=patch)
+        assert response.json() == {"updated": [], "not_found": [MISSING - 1, MISSING]}
+        await assert_stats_match_rebuild(api, client, rollup)
+
+    run(scenario)
+
+
+@pytest.mark.parametrize("payload", [{"ids": [1], "devices": {}}, {"ids": [], "devices": {"gamer": True}}])
+def test_bulk_patch_rejects_empty_changes_or_ids(api, run, payload):
+    async def scenario(client):
+        assert (await client.patch("/api/sales/bulk", json=payload)).status_code == 422
+
+    run(scenario)
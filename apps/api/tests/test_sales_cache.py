@@ -0,0 +1,136 @@
+import json
+import uuid
+
+import pytest
+from sqlalchemy import update
+
+
+@pytest.fixture
+def cache(api, monkeypatch):
+    # Os testes rodam com SALES_CACHE_BACKEND=none; aqui o cache em memória entra só para este módulo.
+    monkeypatch.setattr(api, "SALES_CACHE_BACKEND", "memory")
+    sales_cache = api.build_sales_cache()
+    assert isinstance(sales_cache, api.MemoryCache)
+    monkeypatch.setattr(api, "sales_cache", sales_cache)
+    return sales_cache
+
+
+def contract(name: str, **devices) -> dict:
+    return {"name": name, "email": "cliente@x.com", "phone": "11999990000", "devices": {"cellphones": 1, **devices}}
+
+
+def listing(name: str) -> dict:
+    return {"name": name, "limit": 50}
+
+
+def names(response) -> list[tuple[str, int]]:
+    return [(sale["name"], sale["devices"]["computers"]) for sale in response.json()["items"]]
+
+
+def test_memory_backend_is_disabled_with_several_workers(api, monkeypatch):
+    monkeypatch.setattr(api, "SALES_CACHE_BACKEND", "memory")
+    monkeypatch.setattr(api, "WEB_CONCURRENCY", 2)
+
+    assert isinstance(api.build_sales_cache(), api.NullCache)
+
+
+def test_cached_sale_answers_304_until_a_write(api, cache, run):
+    async def scenario(client):
+        sale = (await client.post("/api/contract", json=contract("Cache Venda"))).json()["sale"]
+
+        first = await client.get(f"/api/sales/{sale['id']}")
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        not_modified = await client.get(f"/api/sales/{sale['id']}", headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+        assert not_modified.headers["last-modified"] == first.headers["last-modified"]
+
+        # Alterada por fora da API: a resposta segue vindo do cache, sem consultar o banco.
+        with api.engine.begin() as connection:
+            connection.execute(update(api.Sale).where(api.Sale.id == sale["id"]).values(name="ALTERADA POR FORA"))
+        cached = await client.get(f"/api/sales/{sale['id']}")
+        assert (cached.headers["etag"], cached.json()["name"]) == (etag, "CACHE VENDA")
+
+        response = await client.put(f"/api/sales/{sale['id']}", json=contract("Cache Editada"))
+        assert response.status_code == 200
+        fresh = await client.get(f"/api/sales/{sale['id']}", headers={"If-None-Match": etag})
+        assert fresh.status_code == 200
+        assert fresh.json()["name"] == "CACHE EDITADA"
+        assert fresh.headers["etag"] != etag
+
+    run(scenario)
+
+
+async def create(client, name: str) -> int:
+    response = await client.post("/api/contract", json=contract(name))
+    assert response.status_code == 201, response.text
+    return response.json()["sale"]["id"]
+
+
+async def write_contract(client, name, sale_id):
+    await create(client, f"{name} Nova")
+    return [(f"{name} NOVA", 0), (name, 0)]
+
+
+async def write_update(client, name, sale_id):
+    response = await client.put(f"/api/sales/{sale_id}", json=contract(f"{name} Editada", computers=3))
+    assert response.status_code == 200
+    return [(f"{name} EDITADA", 3)]
+
+
+async def write_delete(client, name, sale_id):
+    assert (await client.delete(f"/api/sales/{sale_id}")).status_code == 204
+    return []
+
+
+async def write_bulk_update(client, name, sale_id):
+    response = await client.patch("/api/sales/bulk", json={"ids": [sale_id], "devices": {"computers": 9}})
+    assert [sale["id"] for sale in response.json()["updated"]] == [sale_id]
+    return [(name, 9)]
+
+
+async def write_bulk_delete(client, name, sale_id):
+    response = await client.post("/api/sales/bulk-delete", json={"ids": [sale_id]})
+    assert response.json()["deleted"] == [sale_id]
+    return []
+
+
+async def write_bulk_contracts(client, name, sale_id):
+    body = json.dumps(contract(f"{name} Lote")) + "\n"
+    response = await client.post("/api/contracts/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.json()["created"] == 1
+    return [(f"{name} LOTE", 0), (name, 0)]
+
+
+@pytest.mark.parametrize(
+    "write",
+    [write_contract, write_update, write_delete, write_bulk_update, write_bulk_contracts, write_bulk_delete],
+    ids=lambda write: write.__name__.removeprefix("write_"),
+)
+def test_every_write_invalidates_cached_reads(api, cache, run, write):
+    async def scenario(client):
+        name = f"CACHE {uuid.uuid4().hex[:8].upper()}"
+        sale_id = await create(client, name)
+
+        cached = await client.get("/api/sales", params=listing(name))
+        assert names(cached) == [(name, 0)]
+        stats = await client.get("/api/sales/stats")
+        for response in (cached, stats):
+            etag = response.headers["etag"]
+            assert (await client.get(response.url, headers={"If-None-Match": etag})).status_code == 304
+
+        expected = await write(client, name, sale_id)
+
+        # A versão nova do cache não reaproveita o corpo nem o ETag de antes da escrita.
+        fresh = await client.get("/api/sales", params=listing(name), headers={"If-None-Match": cached.headers["etag"]})
+        assert fresh.status_code == 200
+        assert names(fresh) == expected
+        fresh_stats = await client.get("/api/sales/stats", headers={"If-None-Match": stats.headers["etag"]})
+        assert fresh_stats.status_code == 200
+        assert fresh_stats.json() != stats.json()
+
+    run(scenario)
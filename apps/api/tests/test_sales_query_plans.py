@@ -0,0 +1,88 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, text
+
+# PostgreSQL opcional: um banco descartável (as vendas de teste apagam o que houver em sales).
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+TODAY = datetime.now(timezone.utc).date()
+# (ordenação, filtro por nome, intervalo de datas)
+PAGES = [
+    ("date", None, None),
+    ("date", "ana", None),
+    ("date", None, (TODAY - timedelta(days=30), TODAY)),
+    ("name", None, None),
+    ("name", "ana", None),
+    ("name", None, (TODAY - timedelta(days=30), TODAY)),
+]
+INDEXES = {"date": "ix_sales_created_at_id", "name": "ix_sales_name_id"}
+
+
+def next_page_query(api, sort_by, name, dates):
+    # Segunda página: o predicado do cursor precisa ser atendido pelo mesmo índice da ordenação.
+    last = api.Sale(id=500, name="CLIENTE 250", created_at=datetime.now(timezone.utc) - timedelta(days=10))
+    date_from, date_to = dates or (None, None)
+    return api.sales_page_query(name, sort_by, date_from, date_to, 50, api.encode_cursor(sort_by, last))
+
+
+def explain(bind, prefix: str, query) -> list:
+    sql = str(query.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True}))
+    with bind.connect() as connection:
+        return connection.execute(text(f"{prefix} {sql}")).all()
+
+
+# Sem estatísticas, o SQLite lê o intervalo de datas pelo índice de created_at e ordena por nome só
+# as linhas dele; os demais casos seguem o índice da ordenação.
+@pytest.mark.parametrize("sort_by,name,dates", [page for page in PAGES if page[0] == "date" or page[2] is None])
+def test_sqlite_listing_searches_index_without_sort(api, sort_by, name, dates):
+    plan = [row[-1] for row in explain(api.engine, "EXPLAIN QUERY PLAN", next_page_query(api, sort_by, name, dates))]
+
+    assert plan == [step for step in plan if step.startswith(f"SEARCH sales USING INDEX {INDEXES[sort_by]} ")], plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+@pytest.fixture(scope="module")
+def postgres(api):
+    if not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL não definida")
+    engine = create_engine(POSTGRES_URL)
+    api.run_migrations(engine)
+    with engine.begin() as connection:
+        connection.execute(text("TRUNCATE sales"))
+        # ~90 dias de vendas, o bastante para o planejador preferir os índices.
+        connection.execute(
+            text(
+                "INSERT INTO sales (name, email, phone, gamer, total_weight, plan_name, created_at) "
+                "SELECT 'CLIENTE ' || (i % 5000), 'c@x.com', '11999990000', false, 0.8, 'Prata', "
+                "now() - i * interval '150 seconds' FROM generate_series(1, 50000) AS i"
+            )
+        )
+        connection.execute(text("ANALYZE sales"))
+    yield engine
+    with engine.begin() as connection:
+        connection.execute(text("TRUNCATE sales"))
+    engine.dispose()
+
+
+# Com o filtro por nome o PostgreSQL pode preferir o índice trigram e ordenar só o que casou.
+@pytest.mark.parametrize("sort_by,name,dates", [page for page in PAGES if page[1] is None])
+def test_postgres_listing_scans_index_without_sort(postgres, api, sort_by, name, dates):
+    (raw,) = explain(postgres, "EXPLAIN (FORMAT JSON)", next_page_query(api, sort_by, name, dates))[0]
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+    nodes = list(plan_nodes(plan[0]["Plan"]))
+    node_types = {node["Node Type"] for node in nodes}
+
+    assert not node_types & {"Seq Scan", "Sort", "Incremental Sort"}, node_types
+    index_names = {node.get("Index Name") for node in nodes if node["Node Type"].startswith("Index")}
+    suffix = INDEXES[sort_by].removeprefix("ix_sales_")
+    # Em sales particionada o índice de cada partição ganha o nome dela (sales_2026_10_created_at_id_idx).
+    assert index_names and all(suffix in index_name for index_name in index_names), index_names
@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+BRT = timezone(timedelta(hours=-3))
+
+
+def contract(name: str, gamer: bool = False, **devices) -> dict:
+    return {"name": name, "email": "cliente@x.com", "phone": "11999990000", "devices": {**devices, "gamer": gamer}}
+
+
+def test_add_stats_buckets_by_utc_day_and_rounds_to_cents(api):
+    deltas = {}
+    # 22:30 em Brasília já é o dia seguinte em UTC; datetimes sem fuso (SQLite) já estão em UTC.
+    api.add_stats(deltas, datetime(2026, 3, 1, 22, 30, tzinfo=BRT), "Ouro", True, 2.3)
+    api.add_stats(deltas, datetime(2026, 3, 1, 22, 30), "Ouro", False, 0.3)
+    api.add_stats(deltas, datetime(2026, 3, 2, 0, 0, tzinfo=timezone.utc), "Ouro", False, 0.1 + 0.2)
+
+    assert deltas == {(date(2026, 3, 2), "Ouro"): (2, 1, 260), (date(2026, 3, 1), "Ouro"): (1, 0, 30)}
+
+    # Desfazer com sign=-1 zera a linha, sem resto de arredondamento.
+    api.add_stats(deltas, datetime(2026, 3, 1, 22, 30, tzinfo=BRT), "Ouro", True, 2.3, sign=-1)
+    api.add_stats(deltas, datetime(2026, 3, 2, 0, 0, tzinfo=timezone.utc), "Ouro", False, 0.1 + 0.2, sign=-1)
+    assert deltas[(date(2026, 3, 2), "Ouro")] == (0, 0, 0)
+
+
+def test_contract_update_and_delete_keep_rollup_equal_to_rebuild(api, run, rollup):
+    async def scenario(client):
+        before = (await client.get("/api/sales/stats")).json()["total_sales"]
+        created = []
+        for payload in (
+            contract("Rollup Prata", others=3),
+            contract("Rollup Gamer", gamer=True, cellphones=1, smart_tvs=1),
+            contract("Rollup Diamante", computers=7, tv_boxes=1),
+        ):
+            response = await client.post("/api/contract", json=payload)
+            assert response.status_code == 201
+            created.append(response.json()["sale"])
+        rollup()
+
+        # Troca de plano e de gamer: sai do dia/plano antigo e entra no novo.
+        prata, gamer, diamante = created
+        response = await client.put(f"/api/sales/{prata['id']}", json=contract("Rollup Prata", gamer=True, computers=5))
+        assert response.json()["plan_name"] != prata["plan_name"]
+        response = await client.put(f"/api/sales/{gamer['id']}", json=contract("Rollup Gamer", others=1))
+        assert response.json()["plan_name"] == "Prata"
+        rollup()
+
+        assert (await client.delete(f"/api/sales/{diamante['id']}")).status_code == 204
+        rollup()
+
+        stats = (await client.get("/api/sales/stats")).json()
+        assert stats["total_sales"] == before + 2
+        assert stats["total_sales"] == sum(plan["sales"] for plan in stats["by_plan"])
+
+    run(scenario)
+
+
+def test_update_keeps_sale_in_its_original_utc_day(api, run, rollup):
+    # Venda de um segundo antes da meia-noite UTC de ontem, gravada como o SQLite a devolve (sem fuso).
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+    created_at = datetime.combine(yesterday, datetime.max.time()).replace(microsecond=0)
+    with api.engine.begin() as connection:
+        sale_id = connection.execute(
+            insert(api.Sale).returning(api.Sale.id),
+            {
+                "name": "ROLLUP MEIA-NOITE",
+                "email": "cliente@x.com",
+                "phone": "11999990000",
+                "cellphones": 1,
+                "total_weight": 0.8,
+                "plan_name": "Prata",
+                "created_at": created_at,
+            },
+        ).scalar_one()
+        api.rebuild_sales_stats(connection, keep_archived=False)
+
+    async def scenario(client):
+        response = await client.put(f"/api/sales/{sale_id}", json=contract("Rollup Meia-noite", computers=7))
+        assert response.json()["plan_name"] == "Diamante"
+        assert rollup()[(yesterday, "Diamante")][0] >= 1
+        assert (await client.delete(f"/api/sales/{sale_id}")).status_code == 204
+        rollup()
+
+    run(scenario)
@@ -0,0 +1,92 @@
+import itertools
+import json
+import random
+import shutil
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from plans import DEVICE_KEYS, calculate_counts
+from scoring import PLAN_NAMES, score_devices
+
+TESTS_DIR = Path(__file__).resolve().parent
+CASES = json.loads((TESTS_DIR / "plan_cases.json").read_text())
+DEVICE_COUNT_MAX = 32767
+
+
+def seeded_grid() -> list[tuple[tuple[int, ...], bool]]:
+    # Todas as combinações pequenas (onde ficam os limites dos planos) e contagens aleatórias até o SMALLINT.
+    grid = [(counts, gamer) for counts in itertools.product(range(5), repeat=len(DEVICE_KEYS)) for gamer in (False, True)]
+    rng = random.Random(13)
+    for _ in range(2000):
+        counts = tuple(rng.choice([rng.randint(0, 60), rng.randint(0, DEVICE_COUNT_MAX)]) for _ in DEVICE_KEYS)
+        grid.append((counts, rng.random() < 0.5))
+    return grid
+
+
+def expected_cases(grid: list[tuple[tuple[int, ...], bool]]) -> list[dict]:
+    return [
+        {
+            "devices": {**dict(zip(DEVICE_KEYS, counts)), "gamer": gamer},
+            "expected": calculate_counts(counts, gamer).model_dump(),
+        }
+        for counts, gamer in grid
+    ]
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: json.dumps(case["devices"], separators=(",", ":")))
+def test_cases_match_calculate_counts(case):
+    devices = case["devices"]
+    result = calculate_counts(tuple(devices[key] for key in DEVICE_KEYS), devices["gamer"])
+    assert result.model_dump() == case["expected"]
+
+
+def test_score_devices_matches_calculate_counts():
+    grid = seeded_grid()
+    counts = np.array([counts for counts, _ in grid], dtype=np.int64)
+    gamer = np.array([gamer for _, gamer in grid])
+
+    weights, totals, plans = score_devices(counts, gamer)
+
+    for row, (row_counts, row_gamer) in enumerate(grid):
+        expected = calculate_counts(row_counts, row_gamer)
+        assert dict(zip(DEVICE_KEYS, weights[row].tolist())) == expected.device_weights, row_counts
+        assert totals[row] == expected.total_weight, (row_counts, row_gamer)
+        assert PLAN_NAMES[plans[row]] == expected.plan_name, (row_counts, row_gamer)
+
+
+def test_score_batch_matches_calculate_counts():
+    pa = pytest.importorskip("pyarrow")
+    from scoring import score_batch
+
+    grid = seeded_grid()
+    columns = {key: [counts[index] for counts, _ in grid] for index, key in enumerate(DEVICE_KEYS)}
+    columns["gamer"] = [gamer for _, gamer in grid]
+    table = score_batch(pa.RecordBatch.from_pydict(columns))
+
+    for row, case in zip(table.to_pylist(), expected_cases(grid)):
+        expected = case["expected"]
+        assert {key: row[f"{key}_weight"] for key in DEVICE_KEYS} == expected["device_weights"]
+        assert (row["total_weight"], row["plan_name"], row["plan_speed"]) == (
+            expected["total_weight"],
+            expected["plan_name"],
+            expected["plan_speed"],
+        )
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node não instalado")
+def test_plan_rules_js_matches_calculate_counts(tmp_path):
+    from main import build_rules_manifest
+
+    rules = tmp_path / "rules.json"
+    rules.write_bytes(build_rules_manifest()[1])
+    grid = tmp_path / "grid.json"
+    grid.write_text(json.dumps(expected_cases(seeded_grid())))
+
+    for cases in (TESTS_DIR / "plan_cases.json", grid):
+        check = subprocess.run(
+            ["node", str(TESTS_DIR / "plan_rules_check.js"), str(rules), str(cases)], capture_output=True, text=True
+        )
+        assert check.returncode == 0, check.stderr
@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parents[1]
+# Importados só na rota ou no modo que os usa; nenhum pode voltar ao caminho de inicialização.
+LAZY_MODULES = {"alembic", "micks_common.xlsx", "redis", "psycopg", "numpy", "pyarrow", "scoring"}
+# Roda num processo novo: neste, outros testes já importaram metade desses módulos.
+STARTUP = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+import_seconds = time.perf_counter() - started
+
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+asyncio.run(start())
+modules = sorted(sys.modules)
+print(json.dumps({"modules": modules, "import_seconds": import_seconds, "startup_seconds": main.app.state.startup_seconds}))
+"""
+
+
+def is_lazy(module: str) -> bool:
+    return any(module == lazy or module.startswith(f"{lazy}.") for lazy in LAZY_MODULES)
+
+
+def test_startup_skips_lazy_imports(record_property):
+    env = {**os.environ, "MIGRATE_ON_STARTUP": "0"}
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP], cwd=API_DIR, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.splitlines()[-1])
+
+    record_property("import_seconds", round(report["import_seconds"], 3))
+    record_property("startup_seconds", round(report["startup_seconds"], 3))
+    assert not [module for module in report["modules"] if is_lazy(module)]
+
+
+def test_startup_refuses_migrations_in_several_sqlite_workers():
+    # Cada worker do uvicorn roda o lifespan; no SQLite não há lock que serialize as migrações.
+    env = {**os.environ, "MIGRATE_ON_STARTUP": "1", "WEB_CONCURRENCY": "2"}
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP], cwd=API_DIR, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode != 0
+    assert "MIGRATE_ON_STARTUP=1 com WEB_CONCURRENCY > 1" in result.stderr
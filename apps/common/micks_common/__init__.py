@@ -0,0 +1 @@
+"""Módulos usados pela API e pelo web: admissão, tokens de sessão, métricas, SSE e planilhas."""
@@ -0,0 +1,190 @@
+import asyncio
+import bisect
+import itertools
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from prometheus_client import Counter
+from prometheus_client.core import GaugeMetricFamily
+
+
+class RouteLimit:
+    """Limites de uma rota: vagas simultâneas, tamanho da fila e token bucket por IP (rate 0 desliga)."""
+
+    def __init__(self, name: str, priority: int, concurrency: int, queue: int, rate: float, burst: int) -> None:
+        self.name = name
+        self.priority = priority  # menor passa antes na fila
+        self.concurrency = concurrency
+        self.queue = queue
+        self.rate = rate
+        self.burst = burst
+        self.active = 0
+        self.queued = 0
+
+
+class TokenBuckets:
+    # Um bucket por (rota, IP); os IPs mais antigos saem quando passa de max_clients.
+    def __init__(self, max_clients: int) -> None:
+        self._buckets: OrderedDict[tuple[str, str], tuple[float, float]] = OrderedDict()
+        self._max_clients = max_clients
+
+    def take(self, limit: RouteLimit, client: str) -> float:
+        """Consome um token; devolve 0 ou quantos segundos faltam para o próximo."""
+        if limit.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        key = (limit.name, client)
+        tokens, updated = self._buckets.pop(key, (float(limit.burst), now))
+        tokens = min(float(limit.burst), tokens + (now - updated) * limit.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / limit.rate
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self._max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionGate:
+    """Vagas compartilhadas pelas rotas limitadas, com fila por prioridade.
+
+    Uma rota só ocupa até o próprio limite de vagas; quando uma vaga abre, a fila é
+    percorrida da menor prioridade numérica para a maior e, dentro dela, por ordem
+    de chegada. Quem espera mais que timeout segundos desiste.
+    """
+
+    def __init__(self, capacity: int, timeout: float) -> None:
+        self.capacity = capacity
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: list[tuple[int, int, RouteLimit, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    def _can_run(self, limit: RouteLimit) -> bool:
+        return self.active < self.capacity and limit.active < limit.concurrency
+
+    def _start(self, limit: RouteLimit) -> None:
+        self.active += 1
+        limit.active += 1
+
+    async def acquire(self, limit: RouteLimit) -> str | None:
+        """Ocupa uma vaga para limit; devolve None ou o motivo da recusa (queue_full, queue_timeout)."""
+        # Com alguém de prioridade igual ou maior na fila, a requisição nova entra atrás dele.
+        if self._can_run(limit) and not any(priority <= limit.priority for priority, *_ in self._waiters):
+            self._start(limit)
+            return None
+        if limit.queued >= limit.queue:
+            return "queue_full"
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (limit.priority, next(self._sequence), limit, future)
+        bisect.insort(self._waiters, entry)
+        limit.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            # A vaga pode ter sido concedida no mesmo instante do timeout.
+            if not future.done():
+                self._waiters.remove(entry)
+                return "queue_timeout"
+        except asyncio.CancelledError:
+            if future.done():
+                self.release(limit)
+            else:
+                self._waiters.remove(entry)
+            raise
+        finally:
+            limit.queued -= 1
+        return None
+
+    def release(self, limit: RouteLimit) -> None:
+        self.active -= 1
+        limit.active -= 1
+        index = 0
+        while index < len(self._waiters) and self.active < self.capacity:
+            _, _, waiting, future = self._waiters[index]
+            if self._can_run(waiting):
+                del self._waiters[index]
+                self._start(waiting)
+                future.set_result(None)
+            else:
+                index += 1
+
+
+class AdmissionMiddleware:
+    """Middleware ASGI puro: rejeita cedo com 429/503 e Retry-After em vez de enfileirar sem limite.
+
+    Só os POST dos caminhos em limits passam pelo controle; /health, /metrics e o
+    restante das rotas seguem direto.
+    """
+
+    def __init__(
+        self,
+        app: Callable[..., Awaitable[None]],
+        limits: dict[str, RouteLimit],
+        gate: AdmissionGate,
+        buckets: TokenBuckets,
+        shed: Counter,
+        reject_body: Callable[[str], bytes],
+    ) -> None:
+        self.app = app
+        self.limits = limits
+        self.gate = gate
+        self.buckets = buckets
+        self.shed = shed
+        self.reject_body = reject_body
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable, send: Callable) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Atrás de um proxy confiável (FORWARDED_ALLOW_IPS do uvicorn) o client já é o IP original.
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        wait = self.buckets.take(limit, client)
+        if wait:
+            self.shed.labels(limit.name, "rate_limited").inc()
+            await self.reject(send, 429, wait, "Muitas requisições; tente novamente em instantes")
+            return
+
+        reason = await self.gate.acquire(limit)
+        if reason:
+            self.shed.labels(limit.name, reason).inc()
+            await self.reject(send, 503, self.gate.timeout, "Serviço sobrecarregado; tente novamente em instantes")
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.gate.release(limit)
+
+    async def reject(self, send: Callable, status_code: int, retry_after: float, message: str) -> None:
+        body = self.reject_body(message)
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ]
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionCollector:
+    # Lido no scrape: requisições em execução e na fila de cada rota limitada deste worker.
+    def __init__(self, name: str, limits: dict[str, RouteLimit]) -> None:
+        self.name = name
+        self.limits = limits
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            self.name, "Requisições nas rotas com controle de admissão, por estado", labels=["route", "state"]
+        )
+        for limit in {limit.name: limit for limit in self.limits.values()}.values():
+            gauge.add_metric([limit.name, "active"], limit.active)
+            gauge.add_metric([limit.name, "queued"], limit.queued)
+        yield gauge
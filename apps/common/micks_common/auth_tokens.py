@@ -0,0 +1,84 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from functools import lru_cache
+
+# Tokens maiores que isso nem chegam a ser verificados (nem ocupam o cache).
+MAX_TOKEN_LENGTH = 512
+# Valor de exemplo do .env.example: público, nunca pode assinar tokens.
+PLACEHOLDER_SECRET = "trocar-esta-chave"
+
+
+def b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def secret_keys(value: str | None) -> list[str]:
+    """Chaves de AUTH_SECRET_KEY (separadas por vírgula); sem chave própria a app não sobe."""
+    keys = [key.strip() for key in (value or "").split(",") if key.strip()]
+    if not keys or PLACEHOLDER_SECRET in keys:
+        raise RuntimeError(
+            "defina AUTH_SECRET_KEY com uma chave própria, por exemplo: "
+            'python -c "import secrets; print(secrets.token_urlsafe(32))"'
+        )
+    return keys
+
+
+def credentials_match(username: str, password: str, expected_user: str, expected_password: str) -> bool:
+    # Compara os dois campos sempre, em tempo constante, para não vazar qual deles errou.
+    user_ok = hmac.compare_digest(username.encode(), expected_user.encode())
+    password_ok = hmac.compare_digest(password.encode(), expected_password.encode())
+    return user_ok and password_ok
+
+
+class TokenSigner:
+    """Tokens de sessão "<payload>.<assinatura>" com HMAC-SHA256, compartilhados entre web e API.
+
+    A primeira chave assina; as demais só validam, para trocar a chave sem derrubar as
+    sessões abertas. A verificação da assinatura fica em cache por token: a cada
+    requisição resta só conferir a expiração.
+    """
+
+    def __init__(self, secrets: list[str], ttl: int, cache_size: int = 1024) -> None:
+        if not secrets:
+            raise ValueError("informe ao menos uma chave")
+        self.ttl = ttl
+        self._keys = [hmac.new(secret.encode(), digestmod=hashlib.sha256) for secret in secrets]
+        self._claims = lru_cache(maxsize=cache_size)(self._verified_claims)
+
+    def _signature(self, key: "hmac.HMAC", payload: bytes) -> bytes:
+        mac = key.copy()
+        mac.update(payload)
+        return mac.digest()
+
+    def issue(self, subject: str) -> str:
+        claims = {"sub": subject, "exp": int(time.time()) + self.ttl}
+        payload = b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        return f"{payload}.{b64encode(self._signature(self._keys[0], payload.encode()))}"
+
+    def _verified_claims(self, token: str) -> tuple[str, int] | None:
+        payload, _, signature = token.partition(".")
+        # Compara a assinatura já codificada: só existe uma grafia válida para cada token.
+        received = signature.encode()
+        valid = False
+        for key in self._keys:
+            valid |= hmac.compare_digest(b64encode(self._signature(key, payload.encode())).encode(), received)
+        if not valid:
+            return None
+        claims = json.loads(b64decode(payload))
+        return str(claims["sub"]), int(claims["exp"])
+
+    def verify(self, token: str | None) -> str | None:
+        """Devolve o usuário do token, ou None se ele for inválido ou estiver expirado."""
+        if not token or len(token) > MAX_TOKEN_LENGTH:
+            return None
+        claims = self._claims(token)
+        if claims is None or claims[1] <= time.time():
+            return None
+        return claims[0]
@@ -0,0 +1,51 @@
+import os
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest, multiprocess
+from starlette.responses import Response
+
+# Faixas finas no início: a maior parte das etapas fica abaixo de 10 ms.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyMiddleware:
+    """Middleware ASGI puro: mede cada requisição pelo template da rota, não pelo path."""
+
+    def __init__(self, app: Callable[..., Awaitable[None]], histogram: Histogram) -> None:
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "other")
+            self.histogram.labels(scope["method"], route, str(status_code)).observe(time.perf_counter() - started)
+
+
+def metrics_response(*local_collectors: Any) -> Response:
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    # Vários workers: os histogramas de todos os processos vêm dos arquivos em PROMETHEUS_MULTIPROC_DIR;
+    # os coletores locais (pools) descrevem só o worker que atendeu o scrape.
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in local_collectors:
+        registry.register(collector)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,51 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+# Sem cache nem buffer em proxies (o nginx respeita X-Accel-Buffering).
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+# Primeira mensagem do stream: o EventSource espera 3 s antes de reconectar.
+SSE_RETRY = b"retry: 3000\n\n"
+
+
+def format_event(event: str, data: bytes) -> bytes:
+    """Mensagem SSE com um payload de uma linha (JSON compacto)."""
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+def offer(queue: asyncio.Queue, message: bytes, overflow: bytes) -> None:
+    # Cliente lento não segura os demais: a fila dele é trocada por um aviso para recarregar tudo.
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(overflow)
+
+
+async def stream_queue(queue: asyncio.Queue, keepalive: float) -> AsyncIterator[bytes]:
+    yield SSE_RETRY
+    while True:
+        try:
+            yield await asyncio.wait_for(queue.get(), keepalive)
+        except asyncio.TimeoutError:
+            # Comentário SSE: mantém a conexão viva em proxies e revela clientes que já saíram.
+            yield b": keepalive\n\n"
+
+
+async def iter_events(lines: AsyncIterator[str]) -> AsyncIterator[tuple[str, str]]:
+    """Lê um stream SSE linha a linha e devolve (evento, dados); comentários são ignorados."""
+    event, data = "message", []
+    async for line in lines:
+        if not line:
+            if data:
+                yield event, "\n".join(data)
+            event, data = "message", []
+        elif line.startswith(":"):
+            continue
+        else:
+            field, _, value = line.partition(":")
+            value = value.removeprefix(" ")
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
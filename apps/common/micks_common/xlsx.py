@@ -0,0 +1,113 @@
+import io
+import zipfile
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
+from xml.sax.saxutils import escape
+
+SHEET_PATH = "xl/worksheets/sheet1.xml"
+SHEET_HEADER = (
+    "<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?>"
+    "<worksheet xmlns=\"http://schemas.openxmlformats.org/spreadsheetml/2006/main\">"
+    "<sheetData>"
+)
+SHEET_FOOTER = "</sheetData></worksheet>"
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+  <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+  <Default Extension="xml" ContentType="application/xml"/>
+  <Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+  <Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+</Types>"""
+
+RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+  <sheets>
+    <sheet name="Vendas" sheetId="1" r:id="rId1"/>
+  </sheets>
+</workbook>"""
+
+WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+</Relationships>"""
+
+STATIC_PARTS = (
+    ("[Content_Types].xml", CONTENT_TYPES),
+    ("_rels/.rels", RELS),
+    ("xl/workbook.xml", WORKBOOK),
+    ("xl/_rels/workbook.xml.rels", WORKBOOK_RELS),
+)
+
+
+def _excel_cell(value: Any) -> str:
+    if isinstance(value, (int, float)):
+        return f"<c t=\"n\"><v>{value}</v></c>"
+    text = escape(str(value or ""))
+    return f"<c t=\"inlineStr\"><is><t>{text}</t></is></c>"
+
+
+def _excel_row(row_index: int, row: list[Any]) -> str:
+    cells = "".join(_excel_cell(cell) for cell in row)
+    return f"<row r=\"{row_index}\">{cells}</row>"
+
+
+class _ChunkSink(io.RawIOBase):
+    # Destino sem seek: o zipfile passa a gravar data descriptors e não volta no arquivo.
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class XlsxStream:
+    """Monta o .xlsx incrementalmente; cada chamada devolve os bytes já comprimidos."""
+
+    def __init__(self) -> None:
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, "w", zipfile.ZIP_DEFLATED)
+        for name, content in STATIC_PARTS:
+            self._zip.writestr(name, content)
+        self._sheet = self._zip.open(SHEET_PATH, "w", force_zip64=True)
+        self._sheet.write(SHEET_HEADER.encode())
+        self._row_index = 0
+
+    def start(self) -> bytes:
+        return self._sink.drain()
+
+    def write_rows(self, rows: Iterable[list[Any]]) -> bytes:
+        for row in rows:
+            self._row_index += 1
+            self._sheet.write(_excel_row(self._row_index, row).encode())
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._sheet.write(SHEET_FOOTER.encode())
+        self._sheet.close()
+        self._zip.close()
+        return self._sink.drain()
+
+
+async def stream_xlsx(batches: AsyncIterator[Iterable[list[Any]]]) -> AsyncIterator[bytes]:
+    writer = XlsxStream()
+    yield writer.start()
+    async for batch in batches:
+        chunk = writer.write_rows(batch)
+        if chunk:
+            yield chunk
+    yield writer.finish()
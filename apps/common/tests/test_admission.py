@@ -0,0 +1,274 @@
+import asyncio
+import json
+import types
+
+import pytest
+from prometheus_client import CollectorRegistry, Counter
+
+from micks_common import admission
+from micks_common.admission import AdmissionGate, AdmissionMiddleware, RouteLimit, TokenBuckets
+
+
+def contract_limit(**options):
+    return RouteLimit(**{"name": "contract", "priority": 0, "concurrency": 4, "queue": 4, "rate": 0, "burst": 0, **options})
+
+
+def calculate_limit(**options):
+    return RouteLimit(**{"name": "calculate", "priority": 1, "concurrency": 4, "queue": 4, "rate": 0, "burst": 0, **options})
+
+
+async def settle():
+    # Deixa as tasks chegarem ao await da fila (ou acordarem depois de uma vaga).
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio controlado pelo teste no lugar de time.monotonic() do módulo."""
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(admission, "time", types.SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_queued_contract_is_granted_before_queued_calculate():
+    async def scenario():
+        gate = AdmissionGate(capacity=1, timeout=5)
+        contract, calculate = contract_limit(), calculate_limit()
+        assert await gate.acquire(calculate) is None
+
+        granted = []
+
+        async def wait(limit):
+            assert await gate.acquire(limit) is None
+            granted.append(limit.name)
+
+        # O calculate chegou antes, mas o contrato tem prioridade menor (passa na frente).
+        waiting_calculate = asyncio.create_task(wait(calculate))
+        await settle()
+        waiting_contract = asyncio.create_task(wait(contract))
+        await settle()
+        assert (calculate.queued, contract.queued) == (1, 1)
+
+        gate.release(calculate)
+        await settle()
+        assert granted == ["contract"]
+        assert (gate.active, contract.active, calculate.active) == (1, 1, 0)
+
+        gate.release(contract)
+        await settle()
+        assert granted == ["contract", "calculate"]
+        await asyncio.gather(waiting_calculate, waiting_contract)
+        gate.release(calculate)
+        assert gate.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_higher_priority_route_skips_queue_blocked_by_route_limit():
+    async def scenario():
+        gate = AdmissionGate(capacity=2, timeout=5)
+        calculate = calculate_limit(concurrency=1)
+        contract = contract_limit()
+        assert await gate.acquire(calculate) is None
+        waiting = asyncio.create_task(gate.acquire(calculate))
+        await settle()
+
+        # Há vaga no gate, mas não para calculate; o contrato, de prioridade menor, entra direto.
+        assert await gate.acquire(contract) is None
+        assert gate.active == 2
+        gate.release(contract)
+        assert not waiting.done()
+
+        gate.release(calculate)
+        assert await waiting is None
+        gate.release(calculate)
+        assert gate.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_queue_full_is_refused_without_waiting():
+    async def scenario():
+        gate = AdmissionGate(capacity=1, timeout=5)
+        calculate = calculate_limit(queue=1)
+        assert await gate.acquire(calculate) is None
+        waiting = asyncio.create_task(gate.acquire(calculate))
+        await settle()
+
+        assert await gate.acquire(calculate) == "queue_full"
+        assert calculate.queued == 1
+
+        gate.release(calculate)
+        assert await waiting is None
+        gate.release(calculate)
+        assert (gate.active, calculate.active, calculate.queued) == (0, 0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_leaves_the_queue():
+    async def scenario():
+        gate = AdmissionGate(capacity=1, timeout=0.01)
+        calculate = calculate_limit()
+        assert await gate.acquire(calculate) is None
+
+        assert await gate.acquire(calculate) == "queue_timeout"
+        assert calculate.queued == 0
+        assert gate._waiters == []
+
+        gate.release(calculate)
+        assert (gate.active, calculate.active) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_does_not_keep_a_slot():
+    async def scenario():
+        gate = AdmissionGate(capacity=1, timeout=5)
+        calculate = calculate_limit()
+        assert await gate.acquire(calculate) is None
+        waiting = asyncio.create_task(gate.acquire(calculate))
+        await settle()
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert (calculate.queued, gate._waiters) == (0, [])
+
+        gate.release(calculate)
+        assert (gate.active, calculate.active) == (0, 0)
+        assert await gate.acquire(calculate) is None
+        gate.release(calculate)
+
+    asyncio.run(scenario())
+
+
+def test_waiter_cancelled_after_being_granted_gives_the_slot_back():
+    async def scenario():
+        gate = AdmissionGate(capacity=1, timeout=5)
+        calculate = calculate_limit()
+        assert await gate.acquire(calculate) is None
+        waiting = asyncio.create_task(gate.acquire(calculate))
+        await settle()
+
+        # A vaga é concedida e a task é cancelada antes de acordar para usá-la.
+        gate.release(calculate)
+        assert gate.active == 1
+        waiting.cancel()
+        try:
+            granted = await waiting
+        except asyncio.CancelledError:
+            pass
+        else:
+            # O wait_for do Python 3.11 engole o cancelamento quando o futuro já terminou:
+            # quem chamou recebe a vaga e a devolve como o middleware faria.
+            assert granted is None
+            gate.release(calculate)
+
+        assert (gate.active, calculate.active, calculate.queued) == (0, 0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_refills_at_rate(clock):
+    buckets = TokenBuckets(max_clients=10)
+    limit = calculate_limit(rate=2, burst=3)
+
+    assert [buckets.take(limit, "10.0.0.1") for _ in range(3)] == [0, 0, 0]
+    assert buckets.take(limit, "10.0.0.1") == pytest.approx(0.5)
+    # Cada IP tem o próprio bucket.
+    assert buckets.take(limit, "10.0.0.2") == 0
+
+    clock.value += 0.5
+    assert buckets.take(limit, "10.0.0.1") == 0
+    assert buckets.take(limit, "10.0.0.1") == pytest.approx(0.5)
+
+    # Parado por muito tempo, o bucket volta só até burst.
+    clock.value += 60
+    assert [buckets.take(limit, "10.0.0.1") for _ in range(4)] == [0, 0, 0, pytest.approx(0.5)]
+
+
+def test_token_bucket_forgets_oldest_clients(clock):
+    buckets = TokenBuckets(max_clients=2)
+    limit = calculate_limit(rate=1, burst=1)
+
+    for client in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+        assert buckets.take(limit, client) == 0
+    # O primeiro IP saiu do cache e recomeça com o bucket cheio.
+    assert buckets.take(limit, "10.0.0.1") == 0
+    assert buckets.take(limit, "10.0.0.3") == pytest.approx(1)
+
+
+def make_middleware(limit, gate):
+    async def app(scope, receive, send):
+        await release_app.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    release_app = asyncio.Event()
+    shed = Counter("shed", "Requisições recusadas", ["route", "reason"], registry=CollectorRegistry())
+    middleware = AdmissionMiddleware(
+        app,
+        {"/api/calculate": limit},
+        gate,
+        TokenBuckets(max_clients=10),
+        shed,
+        lambda message: json.dumps({"detail": message}).encode(),
+    )
+    return middleware, release_app, shed
+
+
+async def call(middleware, path="/api/calculate", method="POST"):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "client": ("10.0.0.1", 5000), "headers": []}
+    await middleware(scope, receive, send)
+    start, body = messages
+    return start["status"], dict(start["headers"]), json.loads(body["body"])
+
+
+def test_rate_limited_request_gets_429_with_retry_after(clock):
+    async def scenario():
+        limit = calculate_limit(rate=0.25, burst=1)
+        middleware, release_app, shed = make_middleware(limit, AdmissionGate(capacity=4, timeout=5))
+        release_app.set()
+
+        assert (await call(middleware))[0] == 200
+        status, headers, body = await call(middleware)
+        assert status == 429
+        assert headers[b"retry-after"] == b"4"
+        assert body == {"detail": "Muitas requisições; tente novamente em instantes"}
+        assert shed.labels("calculate", "rate_limited")._value.get() == 1
+        # GET e caminhos fora de limits não passam pelo bucket.
+        assert (await call(middleware, method="GET"))[0] == 200
+        assert (await call(middleware, path="/health"))[0] == 200
+
+    asyncio.run(scenario())
+
+
+def test_overloaded_request_gets_503_with_retry_after():
+    async def scenario():
+        limit = calculate_limit(queue=0)
+        gate = AdmissionGate(capacity=1, timeout=2.5)
+        middleware, release_app, shed = make_middleware(limit, gate)
+
+        running = asyncio.create_task(call(middleware))
+        await settle()
+        status, headers, body = await call(middleware)
+        assert status == 503
+        assert headers[b"retry-after"] == b"3"
+        assert body == {"detail": "Serviço sobrecarregado; tente novamente em instantes"}
+        assert shed.labels("calculate", "queue_full")._value.get() == 1
+
+        release_app.set()
+        assert (await running)[0] == 200
+        assert (gate.active, limit.active) == (0, 0)
+
+    asyncio.run(scenario())
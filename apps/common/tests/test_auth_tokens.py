@@ -0,0 +1,62 @@
+import types
+
+import pytest
+
+from micks_common import auth_tokens
+from micks_common.auth_tokens import PLACEHOLDER_SECRET, TokenSigner, b64decode, b64encode, secret_keys
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Relógio controlado pelo teste no lugar de time.time() do módulo."""
+    now = types.SimpleNamespace(value=1_800_000_000.0)
+    monkeypatch.setattr(auth_tokens, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_issued_token_verifies(clock):
+    signer = TokenSigner(["chave-a"], ttl=60)
+
+    assert signer.verify(signer.issue("admin")) == "admin"
+
+
+def test_token_expires_after_ttl(clock):
+    signer = TokenSigner(["chave-a"], ttl=60)
+    token = signer.issue("admin")
+
+    clock.value += 59
+    assert signer.verify(token) == "admin"
+    # A assinatura fica em cache, mas a expiração é conferida a cada chamada.
+    clock.value += 1
+    assert signer.verify(token) is None
+
+
+def test_rotated_key_still_validates_old_tokens(clock):
+    old = TokenSigner(["chave-antiga"], ttl=60).issue("admin")
+    rotated = TokenSigner(["chave-nova", "chave-antiga"], ttl=60)
+
+    assert rotated.verify(old) == "admin"
+    # Tokens novos saem com a primeira chave: quem só conhece a antiga não os aceita.
+    assert TokenSigner(["chave-antiga"], ttl=60).verify(rotated.issue("admin")) is None
+    assert TokenSigner(["chave-nova"], ttl=60).verify(old) is None
+
+
+def test_tampered_token_is_rejected(clock):
+    signer = TokenSigner(["chave-a"], ttl=60)
+    token = signer.issue("admin")
+    payload, signature = token.split(".")
+
+    forged_claims = b64decode(payload).replace(b'"admin"', b'"outro"')
+    assert signer.verify(f"{b64encode(forged_claims)}.{signature}") is None
+    flipped = signature[:-1] + ("A" if signature[-1] != "A" else "B")
+    assert signer.verify(f"{payload}.{flipped}") is None
+    assert signer.verify(payload) is None
+    assert signer.verify("") is None
+    assert signer.verify("x" * (auth_tokens.MAX_TOKEN_LENGTH + 1)) is None
+
+
+def test_secret_keys_refuses_missing_or_placeholder_key():
+    assert secret_keys(" chave-nova , chave-antiga ") == ["chave-nova", "chave-antiga"]
+    for value in (None, "", " , ", PLACEHOLDER_SECRET, f"chave-nova,{PLACEHOLDER_SECRET}"):
+        with pytest.raises(RuntimeError):
+            secret_keys(value)
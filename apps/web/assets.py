@@ -0,0 +1,62 @@
+import gzip
+import hashlib
+import mimetypes
+from pathlib import Path
+from typing import Any
+
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# PNG e afins já vêm comprimidos; gzip só vale para texto.
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".json", ".svg", ".txt"}
+
+
+class HashedStaticFiles(StaticFiles):
+    """StaticFiles que também responde por URLs com o hash do conteúdo (style.3f2a9c1b7d0e.css).
+
+    Os arquivos são lidos e comprimidos uma vez, na inicialização. As URLs com hash
+    são imutáveis e podem ficar em cache por um ano; os caminhos originais continuam
+    servidos pelo StaticFiles com ETag/Last-Modified.
+    """
+
+    def __init__(self, directory: Path, prefix: str = "/static") -> None:
+        super().__init__(directory=str(directory))
+        self.prefix = prefix
+        self.urls: dict[str, str] = {}
+        self.assets: dict[str, tuple[bytes, bytes | None, str]] = {}
+
+        for path in sorted(directory.rglob("*")):
+            if not path.is_file():
+                continue
+            relative = path.relative_to(directory).as_posix()
+            content = path.read_bytes()
+            digest = hashlib.sha256(content).hexdigest()[:12]
+            hashed = relative.removesuffix(path.suffix) + f".{digest}{path.suffix}"
+            compressed = None
+            if path.suffix in COMPRESSIBLE_SUFFIXES:
+                compressed = gzip.compress(content, compresslevel=9, mtime=0)
+                if len(compressed) >= len(content):
+                    compressed = None
+            media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            self.urls[relative] = hashed
+            self.assets[hashed] = (content, compressed, media_type)
+
+    def url(self, relative: str) -> str:
+        # Arquivo ausente na inicialização: cai no caminho original, sem cache longo.
+        return f"{self.prefix}/{self.urls.get(relative, relative)}"
+
+    async def get_response(self, path: str, scope: dict[str, Any]) -> Response:
+        asset = self.assets.get(path)
+        if asset is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        content, compressed, media_type = asset
+        headers = {"Cache-Control": IMMUTABLE_CACHE}
+        if compressed is not None:
+            headers["Vary"] = "Accept-Encoding"
+            accept_encoding = dict(scope["headers"]).get(b"accept-encoding", b"")
+            if b"gzip" in accept_encoding:
+                headers["Content-Encoding"] = "gzip"
+                content = compressed
+        return Response(content, media_type=media_type, headers=headers)
@@ -1,27 +1,321 @@
 from fastapi import FastAPI
-import io
+import asyncio
+import json
+import logging
+import math
 import os
-import zipfile
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager, suppress
+from contextvars import ContextVar
 from pathlib import Path
 from typing import Any
-from xml.sax.saxutils import escape
+from urllib.parse import urlencode
 
 import httpx
-from fastapi import FastAPI, Request, status
+from fastapi import FastAPI, Request, Response, status
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.datastructures import MutableHeaders
 
-app = FastAPI(title="Micks Calculadora WEB")
+from prometheus_client import REGISTRY, Counter, Histogram
+from prometheus_client.core import GaugeMetricFamily
 
-BASE_DIR = Path(__file__).resolve().parent
-templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
-app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
+from micks_common.admission import AdmissionCollector, AdmissionGate, AdmissionMiddleware, RouteLimit, TokenBuckets
+from micks_common.auth_tokens import TokenSigner, credentials_match, secret_keys
+from micks_common.metrics import LATENCY_BUCKETS, LatencyMiddleware, metrics_response
+from micks_common.sse import SSE_HEADERS, format_event, iter_events, offer, stream_queue
+
+from assets import HashedStaticFiles
+
+logger = logging.getLogger("micks.web")
 
 API_BASE_URL = os.getenv("API_BASE_URL", "http://api:3000")
 ADMIN_USER = os.getenv("ADMIN_USER", "admin")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "desafio")
 AUTH_COOKIE = "micks_admin"
+# Mesma chave da API: o token emitido no /login é repassado a ela como Bearer.
+AUTH_SECRET_KEYS = secret_keys(os.getenv("AUTH_SECRET_KEY"))
+AUTH_TOKEN_TTL = int(os.getenv("AUTH_TOKEN_TTL", "28800"))
+AUTH_COOKIE_SECURE = os.getenv("AUTH_COOKIE_SECURE", "0") == "1"
+token_signer = TokenSigner(AUTH_SECRET_KEYS, AUTH_TOKEN_TTL)
+
+API_MAX_CONNECTIONS = int(os.getenv("API_MAX_CONNECTIONS", "100"))
+API_MAX_KEEPALIVE = int(os.getenv("API_MAX_KEEPALIVE", "20"))
+API_KEEPALIVE_EXPIRY = float(os.getenv("API_KEEPALIVE_EXPIRY", "30"))
+API_RETRIES = int(os.getenv("API_RETRIES", "2"))
+API_RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", "0.1"))
+API_TIMEOUTS = {
+    "calculate": float(os.getenv("API_TIMEOUT_CALCULATE", "5.0")),
+    "contract": float(os.getenv("API_TIMEOUT_CONTRACT", "8.0")),
+    "sales": float(os.getenv("API_TIMEOUT_SALES", "8.0")),
+}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+SALES_PAGE_SIZE = int(os.getenv("SALES_PAGE_SIZE", "50"))
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "500"))
+ETAG_CACHE_SIZE = int(os.getenv("ETAG_CACHE_SIZE", "128"))
+RULES_REFRESH_SECONDS = float(os.getenv("RULES_REFRESH_SECONDS", "60"))
+SALES_EVENTS_KEEPALIVE = float(os.getenv("SALES_EVENTS_KEEPALIVE", "15"))
+SALES_EVENTS_QUEUE = int(os.getenv("SALES_EVENTS_QUEUE", "100"))
+SALES_EVENTS_RETRY = float(os.getenv("SALES_EVENTS_RETRY", "3"))
+# Em desenvolvimento, TEMPLATES_AUTO_RELOAD=1 faz o Jinja reler os templates alterados no disco.
+TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "0") == "1"
+
+# Última resposta de cada GET administrativo, reaproveitada quando a API responde 304.
+etag_cache: OrderedDict[str, tuple[str, Any]] = OrderedDict()
+# Manifesto de regras da API (etag, conteúdo, momento da última verificação).
+rules_cache: dict[str, Any] = {"etag": None, "rules": None, "checked_at": float("-inf")}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    # Compila todos os templates antes de aceitar requisições; sem auto_reload o Jinja não volta a consultar o disco.
+    for template_name in TEMPLATE_NAMES:
+        templates.env.get_template(template_name)
+    limits = httpx.Limits(
+        max_connections=API_MAX_CONNECTIONS,
+        max_keepalive_connections=API_MAX_KEEPALIVE,
+        keepalive_expiry=API_KEEPALIVE_EXPIRY,
+    )
+    async with httpx.AsyncClient(base_url=API_BASE_URL, limits=limits, timeout=API_TIMEOUTS["sales"]) as client:
+        app.state.api_client = client
+        app.state.startup_seconds = time.perf_counter() - started
+        yield
+        sales_event_hub.stop()
+
+
+app = FastAPI(title="Micks Calculadora WEB", lifespan=lifespan)
+
+REQUEST_LATENCY = Histogram(
+    "micks_web_request_duration_seconds",
+    "Latência das requisições por rota",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_LATENCY = Histogram(
+    "micks_web_upstream_duration_seconds",
+    "Duração das chamadas à API, incluindo novas tentativas",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "micks_web_stage_duration_seconds",
+    "Duração das etapas internas (renderização de templates, geração do XLSX)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+ADMISSION_SHED = Counter(
+    "micks_web_admission_shed_total", "Requisições recusadas pelo controle de admissão", ["route", "reason"]
+)
+
+# Mesmo controle da API, na frente dela: a contratação passa antes do cálculo, que fica com parte das vagas.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_CONCURRENCY = int(os.getenv("ADMISSION_CONCURRENCY", "32"))
+ADMISSION_QUEUE = int(os.getenv("ADMISSION_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+ADMISSION_CALCULATE_CONCURRENCY = int(os.getenv("ADMISSION_CALCULATE_CONCURRENCY", "24"))
+ADMISSION_CALCULATE_RATE = float(os.getenv("ADMISSION_CALCULATE_RATE", "20"))
+ADMISSION_CALCULATE_BURST = int(os.getenv("ADMISSION_CALCULATE_BURST", "40"))
+ADMISSION_CONTRACT_RATE = float(os.getenv("ADMISSION_CONTRACT_RATE", "1"))
+ADMISSION_CONTRACT_BURST = int(os.getenv("ADMISSION_CONTRACT_BURST", "5"))
+
+admission_limits = {
+    "/calculadora_plano/contract": RouteLimit(
+        "contract", 0, ADMISSION_CONCURRENCY, ADMISSION_QUEUE, ADMISSION_CONTRACT_RATE, ADMISSION_CONTRACT_BURST
+    ),
+    "/calculadora_plano/calculate": RouteLimit(
+        "calculate",
+        1,
+        ADMISSION_CALCULATE_CONCURRENCY,
+        ADMISSION_QUEUE,
+        ADMISSION_CALCULATE_RATE,
+        ADMISSION_CALCULATE_BURST,
+    ),
+}
+if ADMISSION_ENABLED:
+    # Por dentro do LatencyMiddleware: a espera na fila entra na latência medida.
+    app.add_middleware(
+        AdmissionMiddleware,
+        limits=admission_limits,
+        gate=AdmissionGate(ADMISSION_CONCURRENCY, ADMISSION_QUEUE_TIMEOUT),
+        buckets=TokenBuckets(ADMISSION_MAX_CLIENTS),
+        shed=ADMISSION_SHED,
+        # Formato que a página da calculadora já mostra no retorno da contratação.
+        reject_body=lambda message: json.dumps({"ok": False, "message": message}).encode(),
+    )
+admission_collector = AdmissionCollector("micks_web_admission_requests", admission_limits)
+REGISTRY.register(admission_collector)
+app.add_middleware(LatencyMiddleware, histogram=REQUEST_LATENCY)
+
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+READ_PRIMARY_COOKIE = "micks_read_primary"
+# Prazo (epoch) até o qual as leituras da sessão atual vão ao primário da API; uma lista para api_request atualizá-lo.
+read_primary_until: ContextVar[list[float] | None] = ContextVar("read_primary_until", default=None)
+
+
+class ReadYourWritesMiddleware:
+    """Guarda em cookie o X-Read-Primary-Until devolvido pelas edições na API e o reenvia nas leituras seguintes.
+
+    Assim a listagem logo após editar ou excluir não vem de uma réplica atrasada,
+    mesmo que a próxima requisição caia em outro worker do web ou da API.
+    """
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            until = float(Request(scope).cookies.get(READ_PRIMARY_COOKIE, "0"))
+        except ValueError:
+            until = 0.0
+        holder = [until]
+        token = read_primary_until.set(holder)
+
+        async def send_with_cookie(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and holder[0] > until:
+                max_age = max(1, math.ceil(holder[0] - time.time()))
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{READ_PRIMARY_COOKIE}={holder[0]:.3f}; Max-Age={max_age}; Path=/; HttpOnly; SameSite=lax",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            read_primary_until.reset(token)
+
+
+app.add_middleware(ReadYourWritesMiddleware)
+
+
+def read_primary_headers() -> dict[str, str]:
+    holder = read_primary_until.get()
+    if holder and holder[0] > time.time():
+        return {READ_PRIMARY_HEADER: f"{holder[0]:.3f}"}
+    return {}
+
+
+# Enviado aos painéis que podem ter perdido eventos: o navegador recarrega a tabela.
+REFRESH_EVENT = format_event("refresh", b"{}")
+
+
+class SalesEventHub:
+    """Uma conexão SSE com a API por worker, repassada a todos os painéis de vendas abertos nele.
+
+    A linha de cada venda é renderizada uma vez aqui e os navegadores só trocam o HTML.
+    A conexão com a API abre com o primeiro painel e fecha quando o último sai.
+    """
+
+    def __init__(self, queue_size: int) -> None:
+        self.clients: set[asyncio.Queue[bytes]] = set()
+        self.queue_size = queue_size
+        self.task: asyncio.Task | None = None
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue[bytes]]:
+        queue: asyncio.Queue[bytes] = asyncio.Queue(self.queue_size)
+        self.clients.add(queue)
+        # Recria a tarefa se ela terminou por qualquer motivo: sem ela nenhum painel recebe eventos.
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.follow_api())
+        try:
+            yield queue
+        finally:
+            self.clients.discard(queue)
+            if not self.clients:
+                self.stop()
+
+    def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            self.task = None
+
+    def broadcast(self, message: bytes) -> None:
+        for queue in self.clients:
+            offer(queue, message, REFRESH_EVENT)
+
+    async def follow_api(self) -> None:
+        client: httpx.AsyncClient = app.state.api_client
+        # Sem nenhuma linha (nem o keepalive da API) por três intervalos, a conexão é dada como perdida.
+        timeout = httpx.Timeout(API_TIMEOUTS["sales"], read=SALES_EVENTS_KEEPALIVE * 3)
+        connected_before = False
+        failing = False
+        while True:
+            try:
+                # Token do próprio web: a sessão de quem abriu o primeiro painel pode expirar antes das outras.
+                headers = bearer(token_signer.issue(ADMIN_USER))
+                async with client.stream("GET", "/api/sales/events", headers=headers, timeout=timeout) as response:
+                    response.raise_for_status()
+                    if connected_before:
+                        self.broadcast(REFRESH_EVENT)
+                    connected_before = True
+                    failing = False
+                    async for event, data in iter_events(response.aiter_lines()):
+                        try:
+                            message = render_sales_event(event, data)
+                        except Exception:
+                            # Evento malformado ou erro de template: os painéis recarregam a tabela e o stream segue.
+                            logger.exception("evento %r da API não pôde ser repassado", event)
+                            message = REFRESH_EVENT
+                        self.broadcast(message)
+            except (httpx.HTTPError, ValueError) as exc:
+                if not failing:
+                    logger.warning("stream de eventos da API interrompido, reconectando: %s", exc)
+                failing = True
+            except Exception:
+                # Qualquer outra falha também só adia a reconexão; a tarefa não pode terminar.
+                if not failing:
+                    logger.exception("erro no stream de eventos da API, reconectando")
+                failing = True
+            await asyncio.sleep(SALES_EVENTS_RETRY)
+
+
+sales_event_hub = SalesEventHub(SALES_EVENTS_QUEUE)
+
+
+class TimedTemplates(Jinja2Templates):
+    def TemplateResponse(self, *args: Any, **kwargs: Any):
+        with STAGE_LATENCY.labels("template_render").time():
+            return super().TemplateResponse(*args, **kwargs)
+
+
+class ApiPoolCollector:
+    # O httpx não expõe o pool publicamente; lê o do httpcore quando disponível.
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "micks_web_api_pool_connections", "Conexões do cliente httpx com a API por estado", labels=["state"]
+        )
+        pool = getattr(getattr(getattr(app.state, "api_client", None), "_transport", None), "_pool", None)
+        if pool is not None:
+            connections = pool.connections
+            idle = sum(1 for connection in connections if connection.is_idle())
+            gauge.add_metric(["active"], len(connections) - idle)
+            gauge.add_metric(["idle"], idle)
+            gauge.add_metric(["queued"], sum(1 for request in getattr(pool, "_requests", []) if request.is_queued()))
+        yield gauge
+        clients = GaugeMetricFamily("micks_web_sales_event_clients", "Painéis de vendas conectados ao stream SSE")
+        clients.add_metric([], len(sales_event_hub.clients))
+        yield clients
+
+
+pool_collector = ApiPoolCollector()
+REGISTRY.register(pool_collector)
+
+BASE_DIR = Path(__file__).resolve().parent
+templates = TimedTemplates(directory=str(BASE_DIR / "templates"))
+templates.env.auto_reload = TEMPLATES_AUTO_RELOAD
+static_files = HashedStaticFiles(BASE_DIR / "static")
+templates.env.globals["static_url"] = static_files.url
+app.mount("/static", static_files, name="static")
+TEMPLATE_NAMES = set(templates.env.list_templates())
 
 DEVICE_LABELS = {
     "cellphones": "Celulares",
@@ -30,14 +324,58 @@ DEVICE_LABELS = {
     "tv_boxes": "TV Box",
     "others": "Outros",
 }
+# Mesmo limite da API: as contagens são gravadas em SMALLINT.
+DEVICE_COUNT_MAX = 32767
+DEVICE_COUNT_ERROR = f"Quantidade inválida: use um número de 0 a {DEVICE_COUNT_MAX}"
 
 
-EDIT_TEMPLATE = "sale_edit.html"
+def device_count(value: Any) -> int | None:
+    # Campo vazio conta como 0 e negativo vira 0; acima do limite a API recusaria com 422.
+    try:
+        count = max(0, int(value or 0))
+    except ValueError:
+        return None
+    return count if count <= DEVICE_COUNT_MAX else None
+
+
+EDIT_TEMPLATE = "sales_edit.html"
+
+EXPORT_HEADER = [
+    "Data",
+    "Nome",
+    "E-mail",
+    "Telefone",
+    "Celulares",
+    "Computadores",
+    "Smart TVs",
+    "TV Box",
+    "Outros",
+    "Peso total",
+    "Plano",
+    "Velocidade",
+]
+
+
+def export_row(sale: dict[str, Any]) -> list[Any]:
+    devices = sale.get("devices", {})
+    return [
+        sale.get("created_at", ""),
+        sale.get("name", ""),
+        sale.get("email", ""),
+        sale.get("phone", ""),
+        devices.get("cellphones", 0),
+        devices.get("computers", 0),
+        devices.get("smart_tvs", 0),
+        devices.get("tv_boxes", 0),
+        devices.get("others", 0),
+        sale.get("total_weight", 0),
+        sale.get("plan_name", ""),
+        sale.get("plan_speed", ""),
+    ]
 
 
 def render_sale_edit(request: Request, sale: dict[str, Any], error: str | None = None, status_code: int = 200):
-    template_path = BASE_DIR / "templates" / EDIT_TEMPLATE
-    if template_path.exists():
+    if EDIT_TEMPLATE in TEMPLATE_NAMES:
         return templates.TemplateResponse(
             request,
             EDIT_TEMPLATE,
@@ -72,118 +410,221 @@ def render_sale_edit(request: Request, sale: dict[str, Any], error: str | None =
     return HTMLResponse(content=html, status_code=status_code)
 
 
-def is_logged(request: Request) -> bool:
-    return request.cookies.get(AUTH_COOKIE) == "1"
+def render_sales_event(event: str, data: str) -> bytes:
+    payload = json.loads(data)
+    if event in ("created", "updated"):
+        with STAGE_LATENCY.labels("template_render").time():
+            html = templates.env.get_template("_sale_row.html").render(sale=payload, device_labels=DEVICE_LABELS)
+        payload = {"id": payload["id"], "html": html}
+    return format_event(event, json.dumps(payload).encode())
 
 
-def fetch_sales(name: str | None = None, sort_by: str = "date") -> tuple[list[dict[str, Any]], str | None]:
-    params: dict[str, Any] = {"sort_by": sort_by}
+def session_token(request: Request) -> str | None:
+    token = request.cookies.get(AUTH_COOKIE)
+    return token if token_signer.verify(token) else None
+
+
+def bearer(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def api_error(response: httpx.Response) -> str:
+    # A API responde {"detail": "..."}; na validação (422) o detail é a lista de erros do Pydantic.
+    try:
+        detail = response.json().get("detail")
+    except (ValueError, AttributeError):
+        return response.text
+    if isinstance(detail, str):
+        return detail
+    if response.status_code != status.HTTP_422_UNPROCESSABLE_ENTITY or not isinstance(detail, list):
+        return response.text
+    fields = dict.fromkeys(str(error["loc"][-1]) for error in detail if isinstance(error, dict) and error.get("loc"))
+    return f"dados inválidos ({', '.join(fields)})" if fields else "dados inválidos"
+
+
+async def api_request(method: str, path: str, *, route: str, **kwargs: Any) -> httpx.Response:
+    client: httpx.AsyncClient = app.state.api_client
+    # Só repete chamadas idempotentes; POST (contratação) nunca é reenviado.
+    retries = API_RETRIES if method in IDEMPOTENT_METHODS else 0
+    attempt = 0
+    maybe_applied = False
+    kwargs["headers"] = {**kwargs.get("headers", {}), **read_primary_headers()}
+    with UPSTREAM_LATENCY.labels(route, method).time():
+        while True:
+            try:
+                response = await client.request(method, path, timeout=API_TIMEOUTS[route], **kwargs)
+                break
+            except httpx.TransportError as exc:
+                if attempt >= retries:
+                    raise
+                # Sem conexão o pedido nem saiu; nos demais erros a API pode já tê-lo aplicado.
+                maybe_applied = maybe_applied or not isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+                await asyncio.sleep(API_RETRY_BACKOFF * 2**attempt)
+                attempt += 1
+
+    if method == "DELETE" and maybe_applied and response.status_code == status.HTTP_404_NOT_FOUND:
+        # A tentativa que estourou o tempo já tinha excluído: o 404 da repetição confirma a exclusão.
+        response = httpx.Response(status.HTTP_204_NO_CONTENT, request=response.request)
+
+    holder = read_primary_until.get()
+    if holder is not None and READ_PRIMARY_HEADER in response.headers:
+        with suppress(ValueError):
+            holder[0] = max(holder[0], float(response.headers[READ_PRIMARY_HEADER]))
+    return response
+
+
+async def open_api_stream(path: str, token: str, params: dict[str, Any]) -> httpx.Response:
+    # Mede só até os cabeçalhos; o corpo é lido no ritmo de quem consome o stream.
+    client: httpx.AsyncClient = app.state.api_client
+    headers = {**bearer(token), **read_primary_headers()}
+    request = client.build_request("GET", path, params=params, headers=headers, timeout=API_TIMEOUTS["sales"])
+    with UPSTREAM_LATENCY.labels("sales", "GET").time():
+        return await client.send(request, stream=True)
+
+
+async def cached_api_get(path: str, token: str, params: dict[str, Any] | None = None) -> tuple[httpx.Response, Any]:
+    key = str(httpx.URL(path, params=params))
+    cached = etag_cache.get(key)
+    headers = bearer(token)
+    if cached:
+        headers["If-None-Match"] = cached[0]
+    response = await api_request("GET", path, route="sales", params=params, headers=headers)
+
+    if response.status_code == status.HTTP_304_NOT_MODIFIED and cached:
+        etag_cache.move_to_end(key)
+        return response, cached[1]
+    if response.status_code >= 400:
+        return response, None
+
+    data = response.json()
+    etag = response.headers.get("etag")
+    if etag:
+        etag_cache[key] = (etag, data)
+        etag_cache.move_to_end(key)
+        while len(etag_cache) > ETAG_CACHE_SIZE:
+            etag_cache.popitem(last=False)
+    return response, data
+
+
+async def fetch_rules() -> dict[str, Any] | None:
+    if time.monotonic() - rules_cache["checked_at"] < RULES_REFRESH_SECONDS:
+        return rules_cache["rules"]
+
+    rules_cache["checked_at"] = time.monotonic()
+    headers = {"If-None-Match": rules_cache["etag"]} if rules_cache["etag"] else {}
+    try:
+        response = await api_request("GET", "/api/rules", route="calculate", headers=headers)
+    except httpx.RequestError:
+        # Sem a API, segue com o último manifesto (ou o cálculo volta a ser feito no servidor).
+        return rules_cache["rules"]
+
+    if response.status_code == status.HTTP_200_OK:
+        rules_cache.update(etag=response.headers.get("etag"), rules=response.json())
+    return rules_cache["rules"]
+
+
+def date_params(date_from: str | None, date_to: str | None) -> dict[str, str]:
+    # Campos de data vazios do formulário não vão para a API.
+    return {key: value for key, value in (("date_from", date_from), ("date_to", date_to)) if value}
+
+
+async def fetch_sales(
+    token: str,
+    name: str | None = None,
+    sort_by: str = "date",
+    cursor: str | None = None,
+    limit: int = SALES_PAGE_SIZE,
+    date_from: str | None = None,
+    date_to: str | None = None,
+) -> tuple[list[dict[str, Any]], str | None, str | None]:
+    params: dict[str, Any] = {"sort_by": sort_by, "limit": limit, **date_params(date_from, date_to)}
     if name:
         params["name"] = name
+    if cursor:
+        params["cursor"] = cursor
 
     try:
-        with httpx.Client(timeout=8.0, auth=(ADMIN_USER, ADMIN_PASSWORD)) as client:
-            response = client.get(f"{API_BASE_URL}/api/sales", params=params)
-            if response.status_code < 400:
-                return response.json(), None
-            return [], response.text
+        response, page = await cached_api_get("/api/sales", token, params)
+        if response.status_code < 400:
+            return page["items"], page["next_cursor"], None
+        return [], None, api_error(response)
     except httpx.RequestError as exc:
-        return [], str(exc)
+        return [], None, str(exc)
+
+
+async def fetch_stats(token: str) -> dict[str, Any] | None:
+    # Os cartões de resumo são opcionais: se a API falhar, o painel segue só com a listagem.
+    try:
+        response, stats = await cached_api_get("/api/sales/stats", token, {"days": 30})
+    except httpx.RequestError:
+        return None
+    return stats if response.status_code < 400 else None
 
 
-def fetch_sale(sale_id: int) -> tuple[dict[str, Any] | None, str | None, int]:
+async def fetch_sale(token: str, sale_id: int) -> tuple[dict[str, Any] | None, str | None, int]:
     try:
-        with httpx.Client(timeout=8.0, auth=(ADMIN_USER, ADMIN_PASSWORD)) as client:
-            response = client.get(f"{API_BASE_URL}/api/sales/{sale_id}")
-            if response.status_code < 400:
-                return response.json(), None, response.status_code
-            return None, response.text, response.status_code
+        response, sale = await cached_api_get(f"/api/sales/{sale_id}", token)
+        if response.status_code < 400:
+            return sale, None, response.status_code
+        return None, api_error(response), response.status_code
     except httpx.RequestError as exc:
         return None, str(exc), status.HTTP_502_BAD_GATEWAY
 
 
-def update_sale(sale_id: int, payload: dict[str, Any]) -> tuple[bool, str | None, int]:
+async def update_sale(token: str, sale_id: int, payload: dict[str, Any]) -> tuple[bool, str | None, int]:
     try:
-        with httpx.Client(timeout=8.0, auth=(ADMIN_USER, ADMIN_PASSWORD)) as client:
-            response = client.put(f"{API_BASE_URL}/api/sales/{sale_id}", json=payload)
-            if response.status_code < 400:
-                return True, None, response.status_code
-            return False, response.text, response.status_code
+        response = await api_request("PUT", f"/api/sales/{sale_id}", route="sales", json=payload, headers=bearer(token))
+        if response.status_code < 400:
+            return True, None, response.status_code
+        return False, api_error(response), response.status_code
     except httpx.RequestError as exc:
         return False, str(exc), status.HTTP_502_BAD_GATEWAY
 
 
-def delete_sale(sale_id: int) -> tuple[bool, str | None, int]:
+async def delete_sale(token: str, sale_id: int) -> tuple[bool, str | None, int]:
     try:
-        with httpx.Client(timeout=8.0, auth=(ADMIN_USER, ADMIN_PASSWORD)) as client:
-            response = client.delete(f"{API_BASE_URL}/api/sales/{sale_id}")
-            if response.status_code < 400:
-                return True, None, response.status_code
-            return False, response.text, response.status_code
+        response = await api_request("DELETE", f"/api/sales/{sale_id}", route="sales", headers=bearer(token))
+        if response.status_code < 400:
+            return True, None, response.status_code
+        return False, api_error(response), response.status_code
     except httpx.RequestError as exc:
         return False, str(exc), status.HTTP_502_BAD_GATEWAY
 
 
-def _excel_cell(value: Any) -> str:
-    if isinstance(value, (int, float)):
-        return f"<c t=\"n\"><v>{value}</v></c>"
-    text = escape(str(value or ""))
-    return f"<c t=\"inlineStr\"><is><t>{text}</t></is></c>"
-
-
-def build_xlsx(rows: list[list[Any]]) -> bytes:
-    sheet_rows = []
-    for row_index, row in enumerate(rows, start=1):
-        cells = "".join(_excel_cell(cell) for cell in row)
-        sheet_rows.append(f"<row r=\"{row_index}\">{cells}</row>")
+async def bulk_delete_sales(token: str, ids: list[int]) -> tuple[dict[str, Any] | None, str | None]:
+    try:
+        response = await api_request(
+            "POST", "/api/sales/bulk-delete", route="sales", json={"ids": ids}, headers=bearer(token)
+        )
+    except httpx.RequestError as exc:
+        return None, str(exc)
+    if response.status_code < 400:
+        return response.json(), None
+    return None, api_error(response)
 
-    sheet_xml = (
-        "<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?>"
-        "<worksheet xmlns=\"http://schemas.openxmlformats.org/spreadsheetml/2006/main\">"
-        "<sheetData>"
-        + "".join(sheet_rows)
-        + "</sheetData></worksheet>"
-    )
 
-    content_types = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
-  <Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
-  <Default Extension="xml" ContentType="application/xml"/>
-  <Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
-  <Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
-</Types>"""
-
-    rels = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
-  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
-</Relationships>"""
-
-    workbook = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
-  <sheets>
-    <sheet name="Vendas" sheetId="1" r:id="rId1"/>
-  </sheets>
-</workbook>"""
-
-    workbook_rels = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
-  <Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
-</Relationships>"""
-
-    buffer = io.BytesIO()
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr("[Content_Types].xml", content_types)
-        zf.writestr("_rels/.rels", rels)
-        zf.writestr("xl/workbook.xml", workbook)
-        zf.writestr("xl/_rels/workbook.xml.rels", workbook_rels)
-        zf.writestr("xl/worksheets/sheet1.xml", sheet_xml)
-    return buffer.getvalue()
+async def bulk_update_sales(
+    token: str, ids: list[int], devices: dict[str, Any]
+) -> tuple[dict[str, Any] | None, str | None]:
+    try:
+        response = await api_request(
+            "PATCH", "/api/sales/bulk", route="sales", json={"ids": ids, "devices": devices}, headers=bearer(token)
+        )
+    except httpx.RequestError as exc:
+        return None, str(exc)
+    if response.status_code < 400:
+        return response.json(), None
+    return None, api_error(response)
 
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": "web"}
-    return {"status": "ok", "service": "web", "api_base_url": API_BASE_URL}
+    return {"status": "ok", "service": "web", "startup_seconds": round(getattr(app.state, "startup_seconds", 0.0), 4)}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response(pool_collector, admission_collector)
 
 
 @app.get("/")
@@ -192,27 +633,48 @@ def root_redirect():
 
 
 @app.get("/calculadora_plano", response_class=HTMLResponse)
-def calculator_page(request: Request):
-    return templates.TemplateResponse(request, "calculator.html", {})
+async def calculator_page(request: Request):
+    return templates.TemplateResponse(request, "calculator.html", {"rules": await fetch_rules()})
+
+
+def client_headers(request: Request) -> dict[str, str]:
+    # A API aplica o limite por IP ao cliente original (aceito com FORWARDED_ALLOW_IPS no uvicorn dela).
+    return {"X-Forwarded-For": request.client.host} if request.client else {}
+
+
+def retry_after_headers(response: httpx.Response) -> dict[str, str]:
+    return {"Retry-After": response.headers["retry-after"]} if "retry-after" in response.headers else {}
 
 
 @app.post("/calculadora_plano/calculate")
 async def calculator_result(request: Request):
     payload = await request.json()
-    with httpx.Client(timeout=5.0) as client:
-        response = client.post(f"{API_BASE_URL}/api/calculate", json=payload)
-    return JSONResponse(content=response.json(), status_code=response.status_code)
+    response = await api_request(
+        "POST", "/api/calculate", route="calculate", json=payload, headers=client_headers(request)
+    )
+    return JSONResponse(
+        content=response.json(), status_code=response.status_code, headers=retry_after_headers(response)
+    )
 
 
 @app.post("/calculadora_plano/contract")
 async def contract_plan(request: Request):
     payload = await request.json()
-    with httpx.Client(timeout=8.0) as client:
-        response = client.post(f"{API_BASE_URL}/api/contract", json=payload)
+    response = await api_request("POST", "/api/contract", route="contract", json=payload, headers=client_headers(request))
 
+    if response.status_code in (status.HTTP_429_TOO_MANY_REQUESTS, status.HTTP_503_SERVICE_UNAVAILABLE):
+        return JSONResponse(
+            {"ok": False, "message": "Muitas contratações no momento; tente novamente em instantes"},
+            status_code=response.status_code,
+            headers=retry_after_headers(response),
+        )
     if response.status_code >= 400:
-        return JSONResponse({"ok": False, "message": response.text}, status_code=response.status_code)
-    return JSONResponse({"ok": True, "message": "Contratação registrada com sucesso!"})
+        return JSONResponse({"ok": False, "message": api_error(response)}, status_code=response.status_code)
+
+    # Resultado oficial da API, para a página conferir com o cálculo feito no navegador.
+    sale = response.json()["sale"]
+    plan = {key: sale[key] for key in ("device_weights", "total_weight", "plan_name", "plan_speed")}
+    return JSONResponse({"ok": True, "message": "Contratação registrada com sucesso!", "plan": plan})
 
 
 @app.get("/login", response_class=HTMLResponse)
@@ -223,9 +685,17 @@ def login_page(request: Request):
 @app.post("/login")
 async def login_submit(request: Request):
     body = await request.json()
-    if body.get("username") == ADMIN_USER and body.get("password") == ADMIN_PASSWORD:
+    username, password = str(body.get("username", "")), str(body.get("password", ""))
+    if credentials_match(username, password, ADMIN_USER, ADMIN_PASSWORD):
         response = JSONResponse({"ok": True})
-        response.set_cookie(AUTH_COOKIE, "1", httponly=True, samesite="lax")
+        response.set_cookie(
+            AUTH_COOKIE,
+            token_signer.issue(username),
+            max_age=AUTH_TOKEN_TTL,
+            httponly=True,
+            samesite="lax",
+            secure=AUTH_COOKIE_SECURE,
+        )
         return response
     return JSONResponse({"ok": False, "message": "Usuário ou senha inválidos."}, status_code=401)
 
@@ -239,33 +709,77 @@ def logout():
 
 @app.get("/vendas", response_class=HTMLResponse)
 @app.get("/venda", response_class=HTMLResponse, include_in_schema=False)
-def sales_page(request: Request, name: str | None = None, sort_by: str = "date"):
-    if not is_logged(request):
+async def sales_page(
+    request: Request,
+    name: str | None = None,
+    sort_by: str = "date",
+    cursor: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+):
+    token = session_token(request)
+    if not token:
         return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
 
-    sales, error = fetch_sales(name=name, sort_by=sort_by)
+    # Filtro, ordenação e paginação via HTMX trocam só a tabela; os cartões de resumo não mudam.
+    partial = request.headers.get("HX-Request") == "true" and "HX-History-Restore-Request" not in request.headers
+    filters = {"name": name, "sort_by": sort_by, "date_from": date_from, "date_to": date_to}
+    if partial:
+        sales, next_cursor, error = await fetch_sales(token, cursor=cursor, **filters)
+        stats = None
+    else:
+        (sales, next_cursor, error), stats = await asyncio.gather(
+            fetch_sales(token, cursor=cursor, **filters),
+            fetch_stats(token),
+        )
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         request,
-        "sales.html",
+        "_sales_table.html" if partial else "sales.html",
         {
             "sales": sales,
+            "stats": stats,
             "error": error,
             "notice": request.query_params.get("notice", ""),
             "name": name or "",
             "sort_by": sort_by,
+            "date_from": date_from or "",
+            "date_to": date_to or "",
+            "cursor": cursor,
+            "next_cursor": next_cursor,
             "device_labels": DEVICE_LABELS,
+            "partial": partial,
         },
     )
+    response.headers["Vary"] = "HX-Request"
+    return response
+
+
+@app.get("/vendas/events")
+async def sales_events(request: Request):
+    token = session_token(request)
+    if not token:
+        # 401 encerra o EventSource de vez; um redirect seria seguido e reconectado em loop.
+        return Response(status_code=status.HTTP_401_UNAUTHORIZED)
+
+    async def stream() -> AsyncIterator[bytes]:
+        async with sales_event_hub.subscribe() as queue:
+            async for chunk in stream_queue(queue, SALES_EVENTS_KEEPALIVE):
+                if not token_signer.verify(token):
+                    return
+                yield chunk
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 @app.get("/vendas/{sale_id}/editar", response_class=HTMLResponse)
 @app.get("/venda/{sale_id}/editar", response_class=HTMLResponse, include_in_schema=False)
-def edit_sale_page(request: Request, sale_id: int):
-    if not is_logged(request):
+async def edit_sale_page(request: Request, sale_id: int):
+    token = session_token(request)
+    if not token:
         return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
 
-    sale, error, code = fetch_sale(sale_id)
+    sale, error, code = await fetch_sale(token, sale_id)
     if error:
         if code == status.HTTP_404_NOT_FOUND:
             return RedirectResponse(url="/vendas?notice=Venda+não+encontrada", status_code=status.HTTP_302_FOUND)
@@ -277,34 +791,27 @@ def edit_sale_page(request: Request, sale_id: int):
 @app.post("/vendas/{sale_id}/editar")
 @app.post("/venda/{sale_id}/editar", include_in_schema=False)
 async def edit_sale_submit(request: Request, sale_id: int):
-    if not is_logged(request):
+    token = session_token(request)
+    if not token:
         return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
 
     form = await request.form()
 
-    def int_field(key: str) -> int:
-        try:
-            return max(0, int(form.get(key, 0) or 0))
-        except ValueError:
-            return 0
-
+    counts = {key: device_count(form.get(key, 0)) for key in DEVICE_LABELS}
     payload = {
         "name": str(form.get("name", "")),
         "email": str(form.get("email", "")),
         "phone": str(form.get("phone", "")),
-        "devices": {
-            "cellphones": int_field("cellphones"),
-            "computers": int_field("computers"),
-            "smart_tvs": int_field("smart_tvs"),
-            "tv_boxes": int_field("tv_boxes"),
-            "others": int_field("others"),
-            "gamer": form.get("gamer") == "on",
-        },
+        "devices": {**counts, "gamer": form.get("gamer") == "on"},
     }
 
-    ok, error, _ = update_sale(sale_id, payload)
+    if None in counts.values():
+        sale, _, _ = await fetch_sale(token, sale_id)
+        return render_sale_edit(request, sale or {"id": sale_id, **payload}, error=DEVICE_COUNT_ERROR, status_code=400)
+
+    ok, error, _ = await update_sale(token, sale_id, payload)
     if not ok:
-        sale, _, _ = fetch_sale(sale_id)
+        sale, _, _ = await fetch_sale(token, sale_id)
         return render_sale_edit(
             request,
             sale or {"id": sale_id, **payload},
@@ -315,13 +822,77 @@ async def edit_sale_submit(request: Request, sale_id: int):
     return RedirectResponse(url="/vendas?notice=Venda+atualizada+com+sucesso", status_code=status.HTTP_302_FOUND)
 
 
+def selected_ids(form: Any) -> list[int]:
+    return [int(value) for value in form.getlist("ids") if str(value).isdigit()]
+
+
+def bulk_redirect(form: Any, notice: str) -> RedirectResponse:
+    # Volta ao painel com os filtros que estavam aplicados quando a ação foi enviada.
+    params = {key: form.get(key) for key in ("name", "sort_by", "date_from", "date_to") if form.get(key)}
+    return RedirectResponse(url=f"/vendas?{urlencode({**params, 'notice': notice})}", status_code=status.HTTP_302_FOUND)
+
+
+def bulk_notice(count: int, action: str, result: dict[str, Any]) -> str:
+    notice = f"{count} venda {action}" if count == 1 else f"{count} vendas {action}s"
+    missing = len(result.get("not_found", []))
+    if missing:
+        notice += " (1 não encontrada)" if missing == 1 else f" ({missing} não encontradas)"
+    return notice
+
+
+@app.post("/vendas/editar")
+async def bulk_edit_submit(request: Request):
+    token = session_token(request)
+    if not token:
+        return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+
+    form = await request.form()
+    ids = selected_ids(form)
+    if not ids:
+        return bulk_redirect(form, "Nenhuma venda selecionada")
+
+    action = form.get("action")
+    if action in ("gamer", "not_gamer"):
+        devices: dict[str, Any] = {"gamer": action == "gamer"}
+    elif action == "devices" and form.get("device") in DEVICE_LABELS:
+        count = device_count(form.get("count", 0))
+        if count is None:
+            return bulk_redirect(form, DEVICE_COUNT_ERROR)
+        devices = {str(form["device"]): count}
+    else:
+        return bulk_redirect(form, "Ação inválida")
+
+    result, error = await bulk_update_sales(token, ids, devices)
+    if result is None:
+        return bulk_redirect(form, f"Erro ao atualizar vendas: {error}")
+    return bulk_redirect(form, bulk_notice(len(result["updated"]), "atualizada", result))
+
+
+@app.post("/vendas/excluir")
+async def bulk_delete_submit(request: Request):
+    token = session_token(request)
+    if not token:
+        return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
+
+    form = await request.form()
+    ids = selected_ids(form)
+    if not ids:
+        return bulk_redirect(form, "Nenhuma venda selecionada")
+
+    result, error = await bulk_delete_sales(token, ids)
+    if result is None:
+        return bulk_redirect(form, f"Erro ao excluir vendas: {error}")
+    return bulk_redirect(form, bulk_notice(len(result["deleted"]), "excluída", result))
+
+
 @app.post("/vendas/{sale_id}/excluir")
 @app.post("/venda/{sale_id}/excluir", include_in_schema=False)
-def delete_sale_submit(request: Request, sale_id: int):
-    if not is_logged(request):
+async def delete_sale_submit(request: Request, sale_id: int):
+    token = session_token(request)
+    if not token:
         return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
 
-    ok, error, code = delete_sale(sale_id)
+    ok, error, code = await delete_sale(token, sale_id)
     if not ok:
         if code == status.HTTP_404_NOT_FOUND:
             return RedirectResponse(url="/vendas?notice=Venda+não+encontrada", status_code=status.HTTP_302_FOUND)
@@ -332,55 +903,65 @@ def delete_sale_submit(request: Request, sale_id: int):
 
 @app.get("/vendas/export.xlsx")
 @app.get("/venda/export.xlsx", include_in_schema=False)
-def export_sales(request: Request, name: str | None = None, sort_by: str = "date"):
-    if not is_logged(request):
+async def export_sales(
+    request: Request,
+    name: str | None = None,
+    sort_by: str = "date",
+    date_from: str | None = None,
+    date_to: str | None = None,
+):
+    token = session_token(request)
+    if not token:
         return RedirectResponse(url="/login", status_code=status.HTTP_302_FOUND)
 
-    sales, error = fetch_sales(name=name, sort_by=sort_by)
-    if error:
-        return JSONResponse({"detail": f"Erro ao exportar vendas: {error}"}, status_code=502)
-
-    rows: list[list[Any]] = [
-        [
-            "Data",
-            "Nome",
-            "E-mail",
-            "Telefone",
-            "Celulares",
-            "Computadores",
-            "Smart TVs",
-            "TV Box",
-            "Outros",
-            "Peso total",
-            "Plano",
-            "Velocidade",
-        ]
-    ]
-
-    for sale in sales:
-        devices = sale.get("devices", {})
-        rows.append(
-            [
-                sale.get("created_at", ""),
-                sale.get("name", ""),
-                sale.get("email", ""),
-                sale.get("phone", ""),
-                devices.get("cellphones", 0),
-                devices.get("computers", 0),
-                devices.get("smart_tvs", 0),
-                devices.get("tv_boxes", 0),
-                devices.get("others", 0),
-                sale.get("total_weight", 0),
-                sale.get("plan_name", ""),
-                sale.get("plan_speed", ""),
-            ]
-        )
+    params: dict[str, Any] = {"format": "ndjson", "sort_by": sort_by, **date_params(date_from, date_to)}
+    if name:
+        params["name"] = name
+    try:
+        upstream = await open_api_stream("/api/sales/export", token, params=params)
+    except httpx.RequestError as exc:
+        return JSONResponse({"detail": f"Erro ao exportar vendas: {exc}"}, status_code=502)
+    if upstream.status_code >= 400:
+        detail = (await upstream.aread()).decode(errors="replace")
+        await upstream.aclose()
+        return JSONResponse({"detail": f"Erro ao exportar vendas: {detail}"}, status_code=502)
+
+    async def batches() -> AsyncIterator[list[list[Any]]]:
+        # Linhas NDJSON da API convertidas conforme chegam, sem paginar nem juntar tudo em memória.
+        batch: list[list[Any]] = [EXPORT_HEADER]
+        try:
+            async for line in upstream.aiter_lines():
+                if line:
+                    batch.append(export_row(json.loads(line)))
+                if len(batch) >= EXPORT_PAGE_SIZE:
+                    yield batch
+                    batch = []
+        finally:
+            await upstream.aclose()
+        yield batch
+
+    async def xlsx_chunks() -> AsyncIterator[bytes]:
+        # Só o tempo de montar/comprimir a planilha; a espera pela API fica no histograma de upstream.
+        from micks_common.xlsx import XlsxStream  # só a exportação usa o gerador de planilhas
+
+        writer = XlsxStream()
+        build_seconds = 0.0
+        yield writer.start()
+        async for batch in batches():
+            started = time.perf_counter()
+            chunk = writer.write_rows(batch)
+            build_seconds += time.perf_counter() - started
+            if chunk:
+                yield chunk
+        started = time.perf_counter()
+        chunk = writer.finish()
+        STAGE_LATENCY.labels("xlsx_build").observe(build_seconds + time.perf_counter() - started)
+        yield chunk
 
-    content = build_xlsx(rows)
     filename = "vendas_micks.xlsx"
     headers_response = {"Content-Disposition": f'attachment; filename="{filename}"'}
     return StreamingResponse(
-        io.BytesIO(content),
+        xlsx_chunks(),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers=headers_response,
     )
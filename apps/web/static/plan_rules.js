@@ -0,0 +1,54 @@
+// Reproduz calculate_counts da API a partir do manifesto publicado em /api/rules.
+(function (root) {
+  // round() do Python: arredonda o valor binário exato, com empate para o par.
+  function roundHalfEven(value, decimals) {
+    if (!Number.isFinite(value) || Math.abs(value) >= 1e21) return value;
+    const negative = value < 0;
+    const [intPart, fraction] = Math.abs(value).toFixed(100).split(".");
+    const kept = fraction.slice(0, decimals);
+    const rest = fraction.slice(decimals);
+
+    let digits = BigInt(intPart + kept);
+    const first = rest.charCodeAt(0) - 48;
+    const tail = /[1-9]/.test(rest.slice(1));
+    if (first > 5 || (first === 5 && (tail || digits % 2n === 1n))) digits += 1n;
+
+    const text = digits.toString().padStart(decimals + 1, "0");
+    const rounded = Number(`${text.slice(0, text.length - decimals)}.${text.slice(text.length - decimals)}`);
+    return negative ? -rounded : rounded;
+  }
+
+  function planIndex(rules, totalWeight) {
+    let index = 0;
+    for (const plan of rules.plans.slice(1)) {
+      if (plan.inclusive ? totalWeight >= plan.min_weight : totalWeight > plan.min_weight) index += 1;
+      else break;
+    }
+    return index;
+  }
+
+  function calculatePlan(rules, devices) {
+    const decimals = rules.rounding.decimals;
+    const deviceWeights = {};
+    let total = 0;
+    for (const key of rules.device_order) {
+      deviceWeights[key] = roundHalfEven(devices[key] * rules.device_weights[key], decimals);
+    }
+    // Mesma ordem do sum() do Python, para o arredondamento intermediário coincidir.
+    for (const key of rules.device_order) total += deviceWeights[key];
+    let totalWeight = roundHalfEven(total, decimals);
+    if (devices.gamer) totalWeight = roundHalfEven(totalWeight * rules.gamer_multiplier, decimals);
+
+    const plan = rules.plans[planIndex(rules, totalWeight)];
+    return {
+      device_weights: deviceWeights,
+      total_weight: totalWeight,
+      plan_name: plan.name,
+      plan_speed: plan.speed,
+    };
+  }
+
+  const api = { roundHalfEven, planIndex, calculatePlan };
+  if (typeof module !== "undefined" && module.exports) module.exports = api;
+  else root.PlanRules = api;
+})(this);
@@ -0,0 +1,51 @@
+// Atualiza a tabela de /vendas com os eventos do stream SSE, sem recarregar a página.
+(function () {
+  if (!window.EventSource) return;
+
+  const source = new EventSource("/vendas/events");
+  let lost = false;
+
+  function refreshTable() {
+    // Mesma requisição do filtro via HTMX: volta só o fragmento da tabela com os filtros atuais.
+    htmx.ajax("GET", window.location.pathname + window.location.search, "#sales-table");
+  }
+
+  function rowFromHtml(html) {
+    const template = document.createElement("template");
+    template.innerHTML = html.trim();
+    return template.content.firstElementChild;
+  }
+
+  function patchRow(event, insert) {
+    const data = JSON.parse(event.data);
+    const rows = document.getElementById("sales-rows");
+    const current = document.getElementById(`sale-${data.id}`);
+    const row = rowFromHtml(data.html);
+    if (current) {
+      current.replaceWith(row);
+    } else if (insert && rows && rows.dataset.liveInsert === "true") {
+      // Só na primeira página ordenada por data e sem filtros a venda nova entra no topo.
+      rows.querySelector(".empty-row")?.remove();
+      rows.prepend(row);
+    } else {
+      return;
+    }
+    row.classList.add("row-flash");
+  }
+
+  source.addEventListener("created", (event) => patchRow(event, true));
+  source.addEventListener("updated", (event) => patchRow(event, false));
+  source.addEventListener("deleted", (event) => {
+    document.getElementById(`sale-${JSON.parse(event.data).id}`)?.remove();
+  });
+  source.addEventListener("refresh", refreshTable);
+
+  // Reconectou depois de uma queda: os eventos do intervalo se perderam, então recarrega a tabela.
+  source.addEventListener("error", () => {
+    lost = true;
+  });
+  source.addEventListener("open", () => {
+    if (lost) refreshTable();
+    lost = false;
+  });
+})();
@@ -0,0 +1,46 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+# main lê a configuração ao importar: o ambiente dos testes precisa vir antes de qualquer import dele.
+os.environ.update(
+    {
+        "AUTH_SECRET_KEY": "chave-dos-testes",
+        "API_BASE_URL": "http://api",
+        "API_RETRY_BACKOFF": "0",
+        "ADMISSION_ENABLED": "0",
+    }
+)
+
+
+@pytest.fixture(scope="session")
+def web():
+    import main
+
+    return main
+
+
+@pytest.fixture
+def fake_api(web):
+    """Troca o cliente da API por um MockTransport; cada teste passa o handler que faz o papel da API."""
+
+    def install(handler) -> None:
+        web.app.state.api_client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://api")
+
+    yield install
+    web.etag_cache.clear()
+    if hasattr(web.app.state, "api_client"):
+        asyncio.run(web.app.state.api_client.aclose())
+        del web.app.state.api_client
+
+
+@pytest.fixture
+def browser(web):
+    """Navegador já logado no painel; sem lifespan, o cliente da API vem do fake_api."""
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=web.app), base_url="http://web")
+    response = asyncio.run(client.post("/login", json={"username": "admin", "password": "desafio"}))
+    assert response.status_code == 200, response.text
+    yield client
+    asyncio.run(client.aclose())
@@ -0,0 +1,39 @@
+import asyncio
+
+import httpx
+
+EMAIL_ERROR = {
+    "detail": [
+        {"type": "value_error", "loc": ["body", "email"], "msg": "value is not a valid email address", "input": "x"}
+    ]
+}
+
+
+def test_contract_shows_readable_validation_error(web, fake_api, browser):
+    fake_api(lambda request: httpx.Response(422, json=EMAIL_ERROR))
+    contract = {"name": "Ana", "email": "x", "phone": "11999990000", "devices": {"cellphones": 1}}
+
+    response = asyncio.run(browser.post("/calculadora_plano/contract", json=contract))
+
+    assert response.status_code == 422
+    assert response.json() == {"ok": False, "message": "dados inválidos (email)"}
+
+
+def test_contract_shows_api_detail(web, fake_api, browser):
+    fake_api(lambda request: httpx.Response(400, json={"detail": "Falha ao registrar a venda"}))
+
+    response = asyncio.run(browser.post("/calculadora_plano/contract", json={}))
+
+    assert response.json()["message"] == "Falha ao registrar a venda"
+
+
+def test_bulk_edit_rejects_count_above_api_limit(web, fake_api, browser):
+    calls = []
+    fake_api(lambda request: calls.append(request) or httpx.Response(200, json={"updated": [1], "not_found": []}))
+    form = {"ids": "1", "action": "devices", "device": "cellphones", "count": str(web.DEVICE_COUNT_MAX + 1)}
+
+    response = asyncio.run(browser.post("/vendas/editar", data=form))
+
+    assert response.status_code == 302
+    assert "Quantidade+inv%C3%A1lida" in response.headers["location"]
+    assert calls == []
@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+
+
+def test_session_cookie_is_forwarded_as_bearer(web, fake_api, browser):
+    authorizations = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        authorizations.append(request.headers.get("authorization"))
+        if request.url.path == "/api/sales":
+            return httpx.Response(200, json={"items": [], "next_cursor": None})
+        return httpx.Response(503)
+
+    fake_api(handler)
+    assert asyncio.run(browser.get("/vendas")).status_code == 200
+
+    token = browser.cookies[web.AUTH_COOKIE]
+    assert web.token_signer.verify(token) == "admin"
+    assert authorizations and set(authorizations) == {f"Bearer {token}"}
+
+
+def test_tampered_session_cookie_goes_to_login(web, fake_api, browser):
+    calls = []
+    fake_api(lambda request: calls.append(request) or httpx.Response(200))
+    payload, _, signature = browser.cookies[web.AUTH_COOKIE].partition(".")
+    browser.cookies.set(web.AUTH_COOKIE, f"{payload}.{signature[::-1]}")
+
+    response = asyncio.run(browser.get("/vendas"))
+
+    assert (response.status_code, response.headers["location"]) == (302, "/login")
+    assert calls == []
+
+
+def test_wrong_password_sets_no_cookie(web):
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=web.app), base_url="http://web") as client:
+            response = await client.post("/login", json={"username": "admin", "password": "errada"})
+            return response, client.cookies
+
+    response, cookies = asyncio.run(scenario())
+    assert response.status_code == 401
+    assert web.AUTH_COOKIE not in cookies
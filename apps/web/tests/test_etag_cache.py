@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+
+SALE = {
+    "id": 5,
+    "name": "ANA SOUZA",
+    "email": "ana@x.com",
+    "phone": "11999990000",
+    "devices": {"cellphones": 1, "computers": 0, "smart_tvs": 0, "tv_boxes": 0, "others": 0},
+    "gamer": False,
+    "device_weights": {"cellphones": 0.8, "computers": 0.0, "smart_tvs": 0.0, "tv_boxes": 0.0, "others": 0.0},
+    "total_weight": 0.8,
+    "plan_name": "Prata",
+    "plan_speed": "100 Mb",
+    "created_at": "2026-10-01T12:00:00Z",
+}
+
+
+def test_304_reuses_cached_sale_until_api_sends_a_new_version(web, fake_api, browser):
+    # A API guarda a versão atual; uma escrita nela troca o ETag, como o cache por geração.
+    current = {"etag": '"v1"', "sale": SALE}
+    sent_etags: list[str | None] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/sales/5"
+        sent_etags.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == current["etag"]:
+            return httpx.Response(304, headers={"ETag": current["etag"]})
+        return httpx.Response(200, json=current["sale"], headers={"ETag": current["etag"]})
+
+    fake_api(handler)
+
+    async def scenario():
+        first = await browser.get("/vendas/5/editar")
+        assert first.status_code == 200
+        assert "ANA SOUZA" in first.text
+
+        # 304 sem corpo: a página sai com a venda guardada da resposta anterior.
+        cached = await browser.get("/vendas/5/editar")
+        assert cached.status_code == 200
+        assert "ANA SOUZA" in cached.text
+
+        current.update(etag='"v2"', sale={**SALE, "name": "ANA EDITADA"})
+        fresh = await browser.get("/vendas/5/editar")
+        assert "ANA EDITADA" in fresh.text
+        assert "ANA SOUZA" not in fresh.text
+        assert (await browser.get("/vendas/5/editar")).status_code == 200
+
+    asyncio.run(scenario())
+    assert sent_etags == [None, '"v1"', '"v1"', '"v2"']
+    assert web.etag_cache["/api/sales/5"] == ('"v2"', {**SALE, "name": "ANA EDITADA"})
+
+
+def test_error_responses_are_not_cached(web, fake_api, browser):
+    sent_etags: list[str | None] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent_etags.append(request.headers.get("if-none-match"))
+        return httpx.Response(404, json={"detail": "Venda não encontrada"}, headers={"ETag": '"v1"'})
+
+    fake_api(handler)
+
+    async def scenario():
+        for _ in range(2):
+            response = await browser.get("/vendas/5/editar")
+            assert response.status_code == 302
+            assert response.headers["location"].startswith("/vendas?notice=Venda")
+
+    asyncio.run(scenario())
+    assert sent_etags == [None, None]
+    assert web.etag_cache == {}
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import httpx
+
+SALE = {
+    "id": 5,
+    "name": "ANA EDITADA",
+    "email": "ana@x.com",
+    "phone": "11999990000",
+    "devices": {"cellphones": 1, "computers": 0, "smart_tvs": 0, "tv_boxes": 0, "others": 0, "gamer": False},
+}
+
+
+def test_edit_cookie_sends_next_read_to_primary(web, fake_api, browser):
+    until = time.time() + 5
+    listing_headers: list[httpx.Headers] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "PUT":
+            return httpx.Response(200, json=SALE, headers={web.READ_PRIMARY_HEADER: f"{until:.3f}"})
+        if request.url.path == "/api/sales":
+            listing_headers.append(request.headers)
+            return httpx.Response(200, json={"items": [], "next_cursor": None})
+        return httpx.Response(503)
+
+    fake_api(handler)
+    edit = {"name": "Ana Editada", "email": "ana@x.com", "phone": "11999990000", "cellphones": "1"}
+
+    async def scenario():
+        response = await browser.post("/vendas/5/editar", data=edit)
+        assert response.status_code == 302
+        assert float(browser.cookies[web.READ_PRIMARY_COOKIE]) == round(until, 3)
+        assert (await browser.get("/vendas")).status_code == 200
+
+        # Sem o cookie (outro navegador, ou prazo vencido) a leitura segue para a réplica.
+        browser.cookies.delete(web.READ_PRIMARY_COOKIE)
+        assert (await browser.get("/vendas")).status_code == 200
+
+    asyncio.run(scenario())
+    assert [headers.get(web.READ_PRIMARY_HEADER) for headers in listing_headers] == [f"{until:.3f}", None]
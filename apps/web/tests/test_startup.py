@@ -0,0 +1,38 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+WEB_DIR = Path(__file__).resolve().parents[1]
+# Importados só na rota ou no modo que os usa; nenhum pode voltar ao caminho de inicialização.
+LAZY_MODULES = {"micks_common.xlsx"}
+# Roda num processo novo: neste, outros testes já importaram metade desses módulos.
+STARTUP = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+import_seconds = time.perf_counter() - started
+
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+asyncio.run(start())
+modules = sorted(sys.modules)
+print(json.dumps({"modules": modules, "import_seconds": import_seconds, "startup_seconds": main.app.state.startup_seconds}))
+"""
+
+
+def is_lazy(module: str) -> bool:
+    return any(module == lazy or module.startswith(f"{lazy}.") for lazy in LAZY_MODULES)
+
+
+def test_startup_skips_lazy_imports(record_property):
+    # O ambiente do conftest (chave de teste, API fictícia) passa ao processo filho.
+    result = subprocess.run([sys.executable, "-c", STARTUP], cwd=WEB_DIR, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.splitlines()[-1])
+
+    record_property("import_seconds", round(report["import_seconds"], 3))
+    record_property("startup_seconds", round(report["startup_seconds"], 3))
+    assert not [module for module in report["modules"] if is_lazy(module)]
@@ -0,0 +1,34 @@
+import asyncio
+
+import httpx
+
+NOT_FOUND = {"detail": "Venda não encontrada"}
+
+
+def delete_after(web, fake_api, first_error: type[httpx.TransportError]):
+    # A primeira tentativa falha com first_error; ReadTimeout chega depois de a API já ter excluído.
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.method)
+        if len(calls) == 1:
+            raise first_error("falha simulada", request=request)
+        return httpx.Response(404, json=NOT_FOUND)
+
+    fake_api(handler)
+    return asyncio.run(web.delete_sale("token", 7)), calls
+
+
+def test_retried_delete_after_read_timeout_counts_404_as_deleted(web, fake_api):
+    result, calls = delete_after(web, fake_api, httpx.ReadTimeout)
+
+    assert calls == ["DELETE", "DELETE"]
+    assert result == (True, None, 204)
+
+
+def test_retried_delete_after_connect_error_keeps_404(web, fake_api):
+    # Sem conexão a primeira tentativa não chegou à API: o 404 é da venda, não da repetição.
+    result, calls = delete_after(web, fake_api, httpx.ConnectError)
+
+    assert calls == ["DELETE", "DELETE"]
+    assert result == (False, "Venda não encontrada", 404)
@@ -0,0 +1,593 @@
+"""Benchmarks offline da calculadora, da contratação e do painel de vendas.
+
+As duas aplicações rodam no mesmo processo (ASGI, sem rede), o banco é um SQLite
+temporário ou o PostgreSQL indicado em --database-url e os e-mails vão para um
+servidor SMTP local que só conta as mensagens.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import secrets
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+API_DIR = ROOT / "apps" / "api"
+WEB_DIR = ROOT / "apps" / "web"
+ADMIN_AUTH = ("bench", "bench")
+DEVICE_KEYS = ("cellphones", "computers", "smart_tvs", "tv_boxes", "others")
+FIRST_NAMES = ["ANA", "BRUNO", "CARLA", "DIEGO", "ELISA", "FABIO", "GABRIELA", "HUGO", "IARA", "JOAO"]
+LAST_NAMES = ["SILVA", "SOUZA", "COSTA", "OLIVEIRA", "PEREIRA", "LIMA", "ALVES", "RIBEIRO"]
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """SMTP mínimo no lugar do MailHog: aceita tudo e só conta as mensagens."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), SmtpHandler)
+        self.messages = 0
+        self._lock = threading.Lock()
+
+    def count(self) -> None:
+        with self._lock:
+            self.messages += 1
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self) -> None:
+        self.reply("220 bench ESMTP")
+        while line := self.rfile.readline():
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250-bench")
+                self.reply("250 8BITMIME")
+            elif command.startswith("DATA"):
+                self.reply("354 fim com <CRLF>.<CRLF>")
+                while (data := self.rfile.readline()) and data != b".\r\n":
+                    pass
+                self.server.count()
+                self.reply("250 OK")
+            elif command.startswith("QUIT"):
+                self.reply("221 tchau")
+                return
+            else:
+                self.reply("250 OK")
+
+
+def load_app(name: str, directory: Path):
+    # As duas apps têm um main.py; cada uma entra em sys.modules com nome próprio.
+    sys.path.insert(0, str(directory))
+    spec = importlib.util.spec_from_file_location(name, directory / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank: o menor valor com pelo menos pct% das amostras até ele.
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(scenario: str, latencies: list[float], errors: int, elapsed: float, **extra: Any) -> dict[str, Any]:
+    values = sorted(latencies)
+    result = {
+        "scenario": scenario,
+        "requests": len(values),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+    result.update(extra)
+    print(
+        f"{scenario:<34} {result['requests']:>7} req  {result['rps']:>9.1f} rps  "
+        f"p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms  erros {errors}",
+        file=sys.stderr,
+    )
+    return result
+
+
+async def run_load(
+    scenario: str,
+    send: Callable[[int], Awaitable[Any]],
+    total: int,
+    concurrency: int,
+    rate: float | None = None,
+    **extra: Any,
+) -> dict[str, Any]:
+    """Dispara `total` chamadas com no máximo `concurrency` em voo.
+
+    Com `rate` a carga é aberta (chegadas a intervalos fixos) e a latência conta a
+    partir do horário previsto, para que filas no cliente não escondam atrasos.
+    """
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        scheduled = start + index / rate if rate else None
+        if scheduled is not None:
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        async with semaphore:
+            began = scheduled if scheduled is not None else time.perf_counter()
+            try:
+                ok = await send(index)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - began)
+            if ok is False:
+                errors += 1
+
+    await asyncio.gather(*(one(index) for index in range(total)))
+    return summarize(scenario, latencies, errors, time.perf_counter() - start, concurrency=concurrency, rate=rate, **extra)
+
+
+def micro(name: str, func: Callable[[], Any], min_time: float) -> dict[str, Any]:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = max(3, int(min_time / max(timer.timeit(number) / number, 1e-9) / number))
+    best = min(timer.repeat(repeat=min(runs, 7), number=number)) / number
+    print(f"{name:<34} {best * 1e6:>12.3f} µs/op  {1 / best:>14.0f} ops/s", file=sys.stderr)
+    return {"scenario": name, "us_per_op": round(best * 1e6, 4), "ops_per_s": round(1 / best, 1)}
+
+
+def random_devices(rng: random.Random, gamer: bool | None = None) -> dict[str, Any]:
+    devices: dict[str, Any] = {key: rng.randint(0, 4) for key in DEVICE_KEYS}
+    devices["gamer"] = rng.random() < 0.2 if gamer is None else gamer
+    return devices
+
+
+def run_micro(api, min_time: float) -> list[dict[str, Any]]:
+    import plans
+    from micks_common import xlsx
+
+    rng = random.Random(1)
+    fixed = api.DeviceInput(cellphones=3, computers=1, smart_tvs=2, tv_boxes=1, others=4, gamer=True)
+    inputs = [api.DeviceInput(**random_devices(rng)) for _ in range(1024)]
+    counts = [tuple(rng.randint(0, 50) for _ in DEVICE_KEYS) for _ in range(1024)]
+    uncached = api.calculate_counts.__wrapped__
+    rows = [[datetime(2026, 1, 1, tzinfo=timezone.utc).isoformat(), f"CLIENTE {i}", "c@x.com", "11999990000", 1, 2, 3, 0, 1, 3.5, "Diamante", "800 Mb"] for i in range(1000)]
+    sale = api.Sale(id=42, name="ANA SILVA", created_at=datetime(2026, 1, 1, tzinfo=timezone.utc))
+    cursor = api.encode_cursor("date", sale)
+
+    next_input = itertools.cycle(inputs).__next__
+    next_counts = itertools.cycle(counts).__next__
+
+    def xlsx_stream(pages: int) -> None:
+        writer = xlsx.XlsxStream()
+        writer.start()
+        for _ in range(pages):
+            writer.write_rows(rows)
+        writer.finish()
+
+    return [
+        micro("calculate_plan (mesma entrada)", lambda: api.calculate_plan(fixed), min_time),
+        micro("calculate_plan (1024 entradas)", lambda: api.calculate_plan(next_input()), min_time),
+        micro("calculate_counts (sem cache)", lambda: uncached(next_counts(), False), min_time),
+        micro("plan_index", lambda: plans.plan_index(2.5), min_time),
+        micro("XlsxStream (1k linhas)", lambda: xlsx_stream(1), min_time),
+        micro("XlsxStream (10k linhas)", lambda: xlsx_stream(10), min_time),
+        micro("encode_cursor", lambda: api.encode_cursor("date", sale), min_time),
+        micro("decode_cursor", lambda: api.decode_cursor("date", cursor), min_time),
+    ]
+
+
+def startup_result(name: str, seconds: list[float], **extra: Any) -> dict[str, Any]:
+    values = sorted(seconds)
+    result = {
+        "scenario": name,
+        "runs": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1),
+        **extra,
+    }
+    print(f"{name:<34} {len(values):>7} exec  p50 {result['p50_ms']:>8.1f}  max {result['max_ms']:>8.1f} ms", file=sys.stderr)
+    return result
+
+
+def measure_import(directory: Path) -> float:
+    # Processo novo a cada medida: é o custo que cada worker paga ao subir.
+    code = "import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=directory, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def measure_ready(directory: Path, workers: int, env: dict[str, str], timeout: float = 60.0) -> float:
+    """Tempo entre disparar o uvicorn e o primeiro 200 do /health."""
+    import httpx
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers)]
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        command + ["--log-level", "warning"], cwd=directory, env={**os.environ, **env}, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"{directory.name} não respondeu em {timeout:.0f}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def run_startup(api, runs: int) -> list[dict[str, Any]]:
+    # Banco já migrado, como em produção depois do `manage.py migrate`.
+    api.run_migrations()
+    results = []
+    for label, directory in (("api", API_DIR), ("web", WEB_DIR)):
+        results.append(startup_result(f"startup import {label}", [measure_import(directory) for _ in range(runs)]))
+
+    cases = [
+        ("api", API_DIR, 1, {"MIGRATE_ON_STARTUP": "0"}),
+        ("api com migrate", API_DIR, 1, {"MIGRATE_ON_STARTUP": "1"}),
+        ("api", API_DIR, 2, {"MIGRATE_ON_STARTUP": "0"}),
+        ("web", WEB_DIR, 1, {}),
+        ("web", WEB_DIR, 2, {}),
+    ]
+    for label, directory, workers, env in cases:
+        seconds = [measure_ready(directory, workers, env) for _ in range(runs)]
+        results.append(startup_result(f"startup ready {label} x{workers}", seconds, workers=workers))
+    return results
+
+
+def seed_sales(api, target: int, rng: random.Random) -> float:
+    from sqlalchemy import func, insert, select
+
+    with api.SessionLocal() as db:
+        existing = db.scalar(select(func.count(api.Sale.id)))
+    missing = target - existing
+    if missing <= 0:
+        return 0.0
+
+    started = time.perf_counter()
+    base = datetime.now(timezone.utc) - timedelta(days=365)
+    step = timedelta(days=365) / target
+    chunk_size = 10_000
+    with api.engine.begin() as connection:
+        for offset in range(existing, target, chunk_size):
+            rows = []
+            for index in range(offset, min(offset + chunk_size, target)):
+                devices = random_devices(rng)
+                result = api.calculate_counts(tuple(devices[key] for key in DEVICE_KEYS), devices["gamer"])
+                rows.append(
+                    {
+                        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {index}",
+                        "email": f"cliente{index}@example.com",
+                        "phone": f"119{index:08d}",
+                        **devices,
+                        "total_weight": result.total_weight,
+                        "plan_name": result.plan_name,
+                        "created_at": base + step * index,
+                    }
+                )
+            connection.execute(insert(api.Sale), rows)
+        # A carga vai direto na tabela; o rollup do /api/sales/stats é refeito no fim.
+        api.rebuild_sales_stats(connection)
+    return time.perf_counter() - started
+
+
+async def timed_request(client, method: str, url: str, **kwargs: Any) -> tuple[float, int, int]:
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    return time.perf_counter() - started, response.status_code, len(response.content)
+
+
+async def run_scenarios(api, web, sink: SmtpSink, args: argparse.Namespace) -> list[dict[str, Any]]:
+    import httpx
+
+    rng = random.Random(7)
+    results: list[dict[str, Any]] = []
+    api_transport = httpx.ASGITransport(app=api.app)
+
+    async with api.app.router.lifespan_context(api.app), web.app.router.lifespan_context(web.app):
+        async with (
+            httpx.AsyncClient(
+                transport=api_transport,
+                base_url="http://api",
+                headers={"Authorization": f"Bearer {api.token_signer.issue(ADMIN_AUTH[0])}"},
+                timeout=None,
+            ) as api_client,
+            httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=web.app),
+                base_url="http://web",
+                cookies={web.AUTH_COOKIE: web.token_signer.issue(ADMIN_AUTH[0])},
+                timeout=None,
+            ) as web_client,
+        ):
+            # O proxy do web fala com a API em processo, sem passar pela rede.
+            upstream = web.app.state.api_client
+            web.app.state.api_client = httpx.AsyncClient(transport=api_transport, base_url="http://api")
+            try:
+                if "calculate" in args.scenarios:
+                    results.append(await calculate_scenario(web_client, rng, args))
+                if "contract" in args.scenarios:
+                    results.extend(await contract_scenario(api, api_client, sink, rng, args))
+                if "bulk" in args.scenarios:
+                    results.append(await bulk_scenario(api, api_client, rng, args))
+                if "sales" in args.scenarios:
+                    for rows in args.rows:
+                        results.extend(await sales_scenario(api, api_client, web_client, rng, rows, args))
+            finally:
+                await web.app.state.api_client.aclose()
+                web.app.state.api_client = upstream
+    return results
+
+
+async def calculate_scenario(web_client, rng: random.Random, args: argparse.Namespace) -> dict[str, Any]:
+    # Cada "tecla" muda um contador do formulário e pede um novo cálculo ao proxy.
+    state = random_devices(rng, gamer=False)
+
+    async def send(_: int) -> bool:
+        key = rng.choice(DEVICE_KEYS)
+        state[key] = max(0, state[key] + rng.choice((-1, 1)))
+        response = await web_client.post("/calculadora_plano/calculate", json=dict(state))
+        return response.status_code == 200
+
+    return await run_load("calculate via web", send, args.calc_requests, args.concurrency, args.calc_rate)
+
+
+async def contract_scenario(api, api_client, sink: SmtpSink, rng: random.Random, args: argparse.Namespace) -> list[dict[str, Any]]:
+    async def send(index: int) -> bool:
+        payload = {
+            "name": f"Cliente Bench {index}",
+            "email": f"bench{index}@example.com",
+            "phone": f"1198{index:07d}",
+            "devices": random_devices(rng),
+        }
+        response = await api_client.post("/api/contract", json=payload)
+        return response.status_code == 201
+
+    results = []
+    sent_before = sink.messages
+    total = args.bursts * args.burst_size
+    for burst in range(args.bursts):
+        results.append(
+            await run_load(
+                f"contract burst {burst + 1}/{args.bursts}",
+                lambda index, burst=burst: send(burst * args.burst_size + index),
+                args.burst_size,
+                args.burst_size,
+            )
+        )
+
+    # Tempo até o worker do outbox entregar os dois e-mails de cada contratação.
+    started = time.perf_counter()
+    while sink.messages - sent_before < total * 2 and time.perf_counter() - started < args.outbox_timeout:
+        await asyncio.sleep(0.05)
+    results.append(
+        {
+            "scenario": "outbox drain",
+            "emails_expected": total * 2,
+            "emails_delivered": sink.messages - sent_before,
+            "elapsed_s": round(time.perf_counter() - started, 4),
+        }
+    )
+    await api.sales_cache.invalidate()
+    return results
+
+
+async def bulk_scenario(api, api_client, rng: random.Random, args: argparse.Namespace) -> dict[str, Any]:
+    lines = [
+        json.dumps(
+            {
+                "name": f"Cliente Lote {index}",
+                "email": f"lote{index}@example.com",
+                "phone": f"1197{index:07d}",
+                "devices": random_devices(rng),
+            }
+        )
+        for index in range(args.bulk_rows)
+    ]
+    body = ("\n".join(lines) + "\n").encode()
+    elapsed, status_code, _ = await timed_request(
+        api_client, "POST", "/api/contracts/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    result = summarize("contracts bulk", [elapsed], int(status_code != 200), elapsed, rows=args.bulk_rows)
+    result["rows_per_s"] = round(args.bulk_rows / elapsed, 1)
+    await api.sales_cache.invalidate()
+    return result
+
+
+async def sales_scenario(api, api_client, web_client, rng: random.Random, rows: int, args: argparse.Namespace) -> list[dict[str, Any]]:
+    seed_seconds = await asyncio.to_thread(seed_sales, api, rows, rng)
+    await api.sales_cache.invalidate()
+    print(f"-- {rows} vendas (seed {seed_seconds:.1f}s)", file=sys.stderr)
+    results: list[dict[str, Any]] = []
+
+    def listing(params: dict[str, Any]) -> Callable[[int], Awaitable[bool]]:
+        async def send(_: int) -> bool:
+            response = await api_client.get("/api/sales", params=params)
+            return response.status_code == 200
+
+        return send
+
+    for label, params in (
+        ("por data", {"sort_by": "date"}),
+        ("por nome", {"sort_by": "name"}),
+        ("filtro por nome", {"name": rng.choice(LAST_NAMES).lower()}),
+    ):
+        results.append(
+            await run_load(f"sales list {label}", listing(params), args.list_requests, args.concurrency, rows=rows)
+        )
+
+    # Paginação profunda: segue o cursor por várias páginas, como quem rola o painel.
+    latencies: list[float] = []
+    errors = 0
+    started = time.perf_counter()
+    cursor = None
+    for _ in range(args.pages):
+        params = {"sort_by": "date", **({"cursor": cursor} if cursor else {})}
+        began = time.perf_counter()
+        response = await api_client.get("/api/sales", params=params)
+        latencies.append(time.perf_counter() - began)
+        if response.status_code != 200:
+            errors += 1
+            break
+        cursor = response.json()["next_cursor"]
+        if not cursor:
+            break
+    results.append(summarize("sales keyset pages", latencies, errors, time.perf_counter() - started, rows=rows))
+
+    async def web_page(_: int) -> bool:
+        response = await web_client.get("/vendas")
+        return response.status_code == 200
+
+    results.append(await run_load("web /vendas", web_page, args.list_requests, args.concurrency, rows=rows))
+
+    for export_format in ("csv", "xlsx"):
+        elapsed, status_code, size = await timed_request(api_client, "GET", "/api/sales/export", params={"format": export_format})
+        result = summarize(f"export {export_format}", [elapsed], int(status_code != 200), elapsed, rows=rows, bytes=size)
+        result["rows_per_s"] = round(rows / elapsed, 1)
+        results.append(result)
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: list[dict[str, Any]], baseline_path: Path) -> None:
+    baseline = {(item["scenario"], item.get("rows")): item for item in json.loads(baseline_path.read_text())["results"]}
+    print(f"\nComparação com {baseline_path}:", file=sys.stderr)
+    for item in current:
+        previous = baseline.get((item["scenario"], item.get("rows")))
+        if not previous:
+            continue
+        for metric in ("us_per_op", "p50_ms", "p95_ms", "p99_ms", "rps"):
+            if metric in item and previous.get(metric):
+                change = (item[metric] - previous[metric]) / previous[metric] * 100
+                label = f"{item['scenario']} ({item['rows']} vendas)" if item.get("rows") else item["scenario"]
+                print(f"  {label:<48} {metric:<10} {previous[metric]:>12} -> {item[metric]:>12} ({change:+.1f}%)", file=sys.stderr)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks offline da calculadora e do painel de vendas.")
+    parser.add_argument("--scenarios", default="micro,startup,calculate,contract,bulk,sales", help="lista separada por vírgula")
+    parser.add_argument("--database-url", help="PostgreSQL local; padrão: SQLite temporário")
+    parser.add_argument("--rows", default="10000", help="tamanhos da base de vendas, ex.: 10000,100000,1000000")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--calc-requests", type=int, default=2000)
+    parser.add_argument("--calc-rate", type=float, default=500.0, help="requisições/s da digitação simulada (0 = sem limite)")
+    parser.add_argument("--bursts", type=int, default=5)
+    parser.add_argument("--burst-size", type=int, default=50)
+    parser.add_argument("--bulk-rows", type=int, default=5000, help="linhas enviadas ao /api/contracts/bulk")
+    parser.add_argument("--outbox-timeout", type=float, default=30.0)
+    parser.add_argument("--list-requests", type=int, default=500)
+    parser.add_argument("--pages", type=int, default=50, help="páginas seguidas no cenário de paginação")
+    parser.add_argument("--sales-cache", default="none", choices=["none", "memory"], help="cache de listagem da API")
+    parser.add_argument(
+        "--admission", action="store_true", help="mantém o controle de admissão (rajadas vindas de um IP são recusadas)"
+    )
+    parser.add_argument("--min-time", type=float, default=0.2, help="tempo mínimo por micro-benchmark (s)")
+    parser.add_argument("--startup-runs", type=int, default=5, help="repetições de cada medida de inicialização")
+    parser.add_argument("--output", type=Path, help="grava o resultado em JSON neste arquivo (padrão: stdout)")
+    parser.add_argument("--compare", type=Path, help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args()
+    args.scenarios = {name.strip() for name in args.scenarios.split(",") if name.strip()}
+    args.rows = [int(value) for value in args.rows.split(",") if value.strip()]
+    args.calc_rate = args.calc_rate or None
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    workdir = tempfile.TemporaryDirectory(prefix="micks-bench-")
+    sink = SmtpSink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+    # As apps leem a configuração ao importar; tudo precisa estar no ambiente antes.
+    os.environ.update(
+        {
+            "DATABASE_URL": args.database_url or f"sqlite:///{workdir.name}/bench.db",
+            "MAILHOG_SMTP_HOST": "127.0.0.1",
+            "MAILHOG_SMTP_PORT": str(sink.server_address[1]),
+            "OUTBOX_POLL_INTERVAL": "0.05",
+            "SALES_CACHE_BACKEND": args.sales_cache,
+            "ADMISSION_ENABLED": "1" if args.admission else "0",
+            "ADMIN_USER": ADMIN_AUTH[0],
+            "ADMIN_PASSWORD": ADMIN_AUTH[1],
+            "AUTH_SECRET_KEY": secrets.token_urlsafe(32),
+            "API_BASE_URL": "http://api",
+        }
+    )
+    api = load_app("api_main", API_DIR)
+    web = load_app("web_main", WEB_DIR)
+
+    results: list[dict[str, Any]] = []
+    try:
+        if "micro" in args.scenarios:
+            results.extend(run_micro(api, args.min_time))
+        if "startup" in args.scenarios:
+            results.extend(run_startup(api, args.startup_runs))
+        if args.scenarios & {"calculate", "contract", "bulk", "sales"}:
+            results.extend(asyncio.run(run_scenarios(api, web, sink, args)))
+    finally:
+        sink.shutdown()
+        api.engine.dispose()
+        workdir.cleanup()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": api.engine.dialect.name,
+            "args": {key: sorted(value) if isinstance(value, set) else str(value) if isinstance(value, Path) else value for key, value in vars(args).items()},
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
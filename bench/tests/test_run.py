@@ -0,0 +1,61 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import run
+
+BENCH_DIR = Path(__file__).resolve().parents[1]
+# Tamanhos mínimos: o teste confere que os cenários rodam sem erro, não mede nada.
+SMALL_RUN = [
+    "--scenarios", "calculate,contract,bulk,sales",
+    "--rows", "200",
+    "--calc-requests", "20",
+    "--calc-rate", "0",
+    "--bursts", "1",
+    "--burst-size", "5",
+    "--bulk-rows", "20",
+    "--list-requests", "10",
+    "--pages", "2",
+]
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+
+    assert run.percentile(values, 50) == 50.0
+    assert run.percentile(values, 99) == 99.0
+    assert run.percentile([7.0], 95) == 7.0
+    assert run.percentile([], 95) == 0.0
+
+
+def test_micro_reports_time_per_operation():
+    result = run.micro("soma", lambda: sum(range(100)), min_time=0.01)
+
+    assert result["scenario"] == "soma"
+    assert result["us_per_op"] > 0
+    assert result["ops_per_s"] > 0
+
+
+def test_small_run_has_no_errors_and_compares_with_baseline(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"results": [{"scenario": "contracts bulk", "rows": 20, "rps": 1.0}]}))
+    output = tmp_path / "result.json"
+
+    completed = subprocess.run(
+        [sys.executable, "run.py", *SMALL_RUN, "--output", str(output), "--compare", str(baseline)],
+        cwd=BENCH_DIR,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+
+    assert completed.returncode == 0, completed.stderr
+    report = json.loads(output.read_text())
+    assert report["meta"]["database"] == "sqlite"
+    results = {item["scenario"]: item for item in report["results"]}
+    assert {"calculate via web", "contract burst 1/1", "contracts bulk", "sales keyset pages", "export xlsx"} <= set(results)
+    assert [name for name, item in results.items() if item.get("errors")] == []
+    # Todos os e-mails das contratações passaram pelo outbox até o SMTP local.
+    assert results["outbox drain"]["emails_delivered"] == results["outbox drain"]["emails_expected"] == 10
+    assert "contracts bulk" in completed.stderr.split("Comparação com")[1]